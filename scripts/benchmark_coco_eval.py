@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark the native COCO evaluator against pycocotools' COCOeval.
+
+Both evaluators score the same COCO detection results (e.g. the
+predictions_coco.json written by "yolo predictions.py") against a COCO
+ground truth JSON. The script reports the time of each, the speedup and the
+largest difference between their 12 summary metrics.
+
+Usage:
+    python scripts/benchmark_coco_eval.py --gt merged_cleaned_dataset/merged_coco.json \\
+        --results predictions_coco.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from coco_eval import CocoEvaluator, detections_from_results
+
+try:
+    from pycocotools.coco import COCO
+    from pycocotools.cocoeval import COCOeval
+except ImportError:
+    COCOeval = None
+
+
+def run_native(gt, results):
+    """Evaluate with CocoEvaluator, including the GT preparation."""
+    evaluator = CocoEvaluator.from_coco(gt)
+    return evaluator.evaluate(*detections_from_results(results)).stats
+
+
+def run_pycocotools(gt, results):
+    """Evaluate with COCOeval, including loading GT and results."""
+    # COCO/COCOeval print progress and modify the dictionaries they are given
+    with contextlib.redirect_stdout(io.StringIO()):
+        coco_gt = COCO()
+        coco_gt.dataset = json.loads(json.dumps(gt))
+        coco_gt.createIndex()
+        coco_dt = coco_gt.loadRes(json.loads(json.dumps(results)))
+        coco_eval = COCOeval(coco_gt, coco_dt, "bbox")
+        coco_eval.evaluate()
+        coco_eval.accumulate()
+        coco_eval.summarize()
+    return coco_eval.stats
+
+
+def best_time(fn, repeat):
+    """Fastest of repeat runs, with the result of the last one."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--gt", required=True, help="COCO ground truth JSON")
+    parser.add_argument("--results", required=True, help="COCO detection results JSON")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per evaluator (best time is reported)")
+    args = parser.parse_args()
+
+    with open(args.gt) as f:
+        gt = json.load(f)
+    with open(args.results) as f:
+        results = json.load(f)
+    print(f"{len(gt['images'])} images, {len(gt['annotations'])} annotations, {len(results)} detections")
+
+    native_time, native_stats = best_time(lambda: run_native(gt, results), args.repeat)
+    print(f"CocoEvaluator: {native_time:.3f}s")
+
+    if COCOeval is None:
+        print("pycocotools is not installed, skipping the COCOeval comparison")
+        return
+    if not results:
+        print("No detections, skipping the COCOeval comparison (loadRes needs at least one)")
+        return
+
+    reference_time, reference_stats = best_time(lambda: run_pycocotools(gt, results), args.repeat)
+    print(f"COCOeval:      {reference_time:.3f}s")
+    print(f"Speedup:       {reference_time / native_time:.1f}x")
+    print(f"Max |stats difference|: {np.abs(np.asarray(native_stats) - reference_stats).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
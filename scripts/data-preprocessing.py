@@ -14,15 +14,34 @@ Original file is located at
 # Import all the necessary libraries
 
 import os
+import sys
 import json
-import shutil
 import csv
-import random
 import yaml
-from PIL import Image
-from tqdm import tqdm
 from shutil import copy2
 
+# Shared helpers live in the repo's src/ folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from image_validation import validate_images
+from annotation_validation import validate_annotations
+from class_mapping import ClassMapping
+from coco_stream import CocoJsonWriter, JsonArraySpool, iter_annotations, iter_chunks, iter_images, load_categories
+from materialize import materialize
+from build_manifest import BuildManifest, file_fingerprint, input_digest
+from yolo_labels import image_sizes, write_label_files, yolo_label_texts
+from label_shards import SHARD_SUFFIX, shard_from_coco, write_label_shard
+from dataset_split import stratified_split, write_split_list
+from label_stats import label_statistics, split_statistics, write_label_statistics, write_split_summary
+
+# How images are placed into output folders: "copy", "hardlink", "reflink" or
+# "symlink". Link modes fall back to a copy when the filesystem refuses them.
+materialize_mode = "hardlink"
+
+# Reruns only rebuild outputs whose inputs changed (see .build_manifest.json in
+# each output folder). Set hash_image_contents to also compare image bytes
+# instead of trusting size + mtime.
+hash_image_contents = False
+
 # Part A: Load the dataset and clean the data to generate a validated, cleaned JSON file (cleaned_dataset)
 
 images_dir = "yrikka-btt-aistudio-2025/BTT_Data/852a64c6-4bd3-495f-8ff7-f5cc85e34316/images"
@@ -33,150 +52,105 @@ os.makedirs(os.path.join(out_dir, "images"), exist_ok=True)
 # -----------------------------
 # Canonical classes + mapping
 # -----------------------------
-canonical_classes = ["potted plant", "chair", "cup", "vase", "book"]
-class_mapping = {
-    "##ted": "potted plant",
-    "pot plant": "potted plant",
-    "cup vase": "vase",
-    "pot": "potted plant",
-    "vase potted plant": "potted plant"
-}
+# Exact, normalized, wordpiece and (optional) fuzzy rules live in
+# configs/class_mapping.yaml, shared with the notebook
+class_mapping_config = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "configs", "class_mapping.yaml")
+class_mapping = ClassMapping.from_config(class_mapping_config)
+canonical_classes = class_mapping.canonical_classes
 
 # -----------------------------
-# Load COCO JSON
+# Stream the COCO JSON
 # -----------------------------
-with open(coco_json_path) as f:
-    coco = json.load(f)
-
-# Build category name → new ID mapping
-name_to_new_id = {cls: i for i, cls in enumerate(canonical_classes)}
+# Cleaning never loads the whole file: images and annotations are read and
+# validated clean_chunk_size entries at a time, and the cleaned JSON and
+# report are written as they go. Memory holds the image size index plus one
+# chunk, however many annotations the corpus has.
+clean_chunk_size = 10000
 
 # If original COCO categories exist, build lookup
-category_id_to_name = {cat["id"]: cat["name"] for cat in coco.get("categories", [])}
+category_id_to_name = {cat["id"]: cat["name"] for cat in load_categories(coco_json_path)}
 
 # -----------------------------------------------------------------------------------------
 # Create a dictionary storing image width and height for validating image boundaries later
 # -----------------------------------------------------------------------------------------
+# Existence/size checks run over chunks of images in a thread pool; results
+# and messages come back in the same order as the serial loop. Set
+# full_decode_check to also decode every image and catch truncated PNGs.
+full_decode_check = False
 image_id_to_info = {}
-for img in coco["images"]:
-    file_name = img["file_name"]
-    file_path = os.path.join(images_dir, file_name)
-
-    if not os.path.exists(file_path):
-        print(f"Missing file: {file_name}")
-        continue
-
-    try:
-        with Image.open(file_path) as im:
-            width, height = im.size
-    except Exception as e:
-        print(f"Cannot open {file_name}: {e}")
-        continue
-
-    image_id_to_info[img["id"]] = {
-        "file_name": file_name,
-        "path": file_path,
-        "width": width,
-        "height": height
-    }
-
-# -----------------------------
-# Validate the annotations
-# -----------------------------
-valid_annotations = []
-valid_image_ids = set()
-dropped_rows = []
-
-for ann in tqdm(coco["annotations"], desc="Validating annotations"):
-    image_id = ann["image_id"]
-
-    # a) Make sure every annotation points to an existing image
-    if image_id not in image_id_to_info:
-        dropped_rows.append(["Missing image", image_id, ann["id"], ann.get("bbox", "")])
-        continue
-
-    # Retrieve image information (width and height) from the pre-built dictionary
-    info = image_id_to_info[image_id]
-    img_w, img_h = info["width"], info["height"]
-    x, y, w, h = ann["bbox"]
+for images_chunk in iter_chunks(iter_images(coco_json_path), clean_chunk_size):
+    chunk_info, image_messages = validate_images(
+        images_chunk, images_dir, max_workers=8, verify=full_decode_check)
+    image_id_to_info.update(chunk_info)
+    for message in image_messages:
+        print(message)
 
-    # b) Drop invalid bbox with zero or negative width/height
-    if w <= 0 or h <= 0:
-        dropped_rows.append(["Zero/negative box", image_id, ann["id"], ann["bbox"]])
-        continue
-
-    # c) Clip boxes to image bounds
-    x = max(0, min(x, img_w))
-    y = max(0, min(y, img_h))
-    w = max(1, min(w, img_w - x))
-    h = max(1, min(h, img_h - y))
-
-    # Drop if box became invalid after clipping
-    if w <= 0 or h <= 0:
-        dropped_rows.append(["Box outside image after clipping", image_id, ann["id"], [x, y, w, h]])
-        continue
+report_path = os.path.join(out_dir, "dropped_report.csv")
+with open(report_path, "w", newline="") as report_file, JsonArraySpool(indent=2, dir=out_dir) as annotation_spool:
+    report = csv.writer(report_file)
+    report.writerow(["Reason", "ImageID", "AnnotationID", "Details"])
+
+    # -----------------------------
+    # Validate the annotations
+    # -----------------------------
+    # Each chunk's boxes are checked as one array: missing image, zero/negative
+    # size, clipping to image bounds and class remapping. Valid annotations get
+    # the clipped bbox and the 0-based canonical category id (YOLO requires
+    # 0-based class IDs) and are spooled to disk until the images are written.
+    valid_image_ids = set()
+    num_dropped_annotations = 0
+    for annotations_chunk in iter_chunks(iter_annotations(coco_json_path), clean_chunk_size):
+        chunk_valid, chunk_image_ids, chunk_dropped = validate_annotations(
+            annotations_chunk, image_id_to_info, category_id_to_name, class_mapping)
+        annotation_spool.extend(chunk_valid)
+        valid_image_ids.update(chunk_image_ids)
+        report.writerows(chunk_dropped)
+        num_dropped_annotations += len(chunk_dropped)
+
+    # -----------------------------
+    # Build cleaned categories
+    # -----------------------------
+    cleaned_categories = [{"id": i, "name": cls} for i, cls in enumerate(canonical_classes)]
+
+    # --------------------------------------------------------------
+    # Save cleaned COCO JSON, keeping only images with valid annotations
+    # --------------------------------------------------------------
+    with open(os.path.join(out_dir, "cleaned_coco.json"), "w") as f:
+        cleaned_writer = CocoJsonWriter(f, indent=2)
+        num_valid_images = cleaned_writer.write_array(
+            "images", (img for img in iter_images(coco_json_path) if img["id"] in valid_image_ids))
+        num_valid_annotations = cleaned_writer.write_array("annotations", annotation_spool)
+        cleaned_writer.write_value("categories", cleaned_categories)
+        cleaned_writer.close()
 
-    # d) Map noisy class names to 5 canonical classes
-    class_name = category_id_to_name.get(ann["category_id"], "Unknown")
-    mapped_class = class_mapping.get(class_name, class_name)
-    if mapped_class not in canonical_classes:
-        dropped_rows.append(["Unmapped class", image_id, ann["id"], class_name])
+    # Report dropped images with no valid annotations
+    num_dropped_images = 0
+    for img in iter_images(coco_json_path):
+        if img["id"] not in valid_image_ids:
+            report.writerow(["No valid annotations", img["id"], "", img["file_name"]])
+            num_dropped_images += 1
+
+# ----------------------------------------------------------------
+# Link (or copy) valid images that are new or changed since last run
+# ----------------------------------------------------------------
+cleaned_manifest = BuildManifest(out_dir)
+for image_id, info in image_id_to_info.items():
+    if image_id not in valid_image_ids:
         continue
+    src = info["path"]
+    dst = os.path.join(out_dir, "images", info["file_name"])
+    digest = input_digest(file_fingerprint(src, hash_image_contents), materialize_mode)
+    if not cleaned_manifest.is_current(dst, digest):
+        materialize(src, dst, materialize_mode)
+        cleaned_manifest.record(dst, digest)
 
-    # Reassign category ID to 0-4 (as YOLO requires 0-based class IDs)
-    ann["category_id"] = name_to_new_id[mapped_class]
-    ann["bbox"] = [x, y, w, h]
-
-    valid_annotations.append(ann)
-    valid_image_ids.add(image_id)
-
-# -----------------------------
-# Keep only valid images
-# -----------------------------
-valid_images = [img for img in coco["images"] if img["id"] in valid_image_ids]
-dropped_images = [img for img in coco["images"] if img["id"] not in valid_image_ids]
-
-# -----------------------------
-# Build cleaned categories
-# -----------------------------
-cleaned_categories = [{"id": i, "name": cls} for i, cls in enumerate(canonical_classes)]
-
-# -----------------------------
-# Save cleaned COCO JSON
-# -----------------------------
-cleaned_coco = {
-    "images": valid_images,
-    "annotations": valid_annotations,
-    "categories": cleaned_categories
-}
-
-with open(os.path.join(out_dir, "cleaned_coco.json"), "w") as f:
-    json.dump(cleaned_coco, f, indent=2)
-
-# -----------------------------
-# Copy valid images
-# -----------------------------
-for img in valid_images:
-    src = os.path.join(images_dir, img["file_name"])
-    dst = os.path.join(out_dir, "images", img["file_name"])
-    if os.path.exists(src):
-        shutil.copy2(src, dst)
-
-# --------------------------------------------------------------------------
-# Saving CSV report to record how many invalid annotations were dropped
-# --------------------------------------------------------------------------
-report_path = os.path.join(out_dir, "dropped_report.csv")
-with open(report_path, "w", newline="") as f:
-    writer = csv.writer(f)
-    writer.writerow(["Reason", "ImageID", "AnnotationID", "Details"])
-    for row in dropped_rows:
-        writer.writerow(row)
-    # Report dropped images with no valid annotations
-    for img in dropped_images:
-        writer.writerow(["No valid annotations", img["id"], "", img["file_name"]])
+# Images that are no longer valid are removed from the cleaned folder
+stale_outputs = cleaned_manifest.remove_stale([os.path.join(out_dir, "images")])
+cleaned_manifest.save()
+print(f"Removed {len(stale_outputs)} stale images from {out_dir}")
 
-print(f"Cleaned dataset saved: {len(valid_images)} images, {len(valid_annotations)} annotations")
-print(f"Dropped {len(dropped_rows) + len(dropped_images)} items (see dropped_report.csv)")
+print(f"Cleaned dataset saved: {num_valid_images} images, {num_valid_annotations} annotations")
+print(f"Dropped {num_dropped_annotations + num_dropped_images} items (see dropped_report.csv)")
 
 # --------------------------------------------------------------------------
 # Saving CSV report to record how source categories were mapped to canonical
@@ -187,11 +161,22 @@ csv_path = os.path.join("cleaned_dataset", "class_mapping.csv")
 with open(csv_path, "w") as f:
     writer = csv.writer(f)
     writer.writerow(["Original Class", "Mapped Class"])
-    for k, v in class_mapping.items():
-        writer.writerow([k, v])
+    for source, target in class_mapping.exact.items():
+        writer.writerow([source, target])
 
 print(f"Category mapping CSV saved to {csv_path}")
 
+# How each category name seen in this dataset was resolved, and by which rule
+resolution_path = os.path.join("cleaned_dataset", "category_resolution.csv")
+with open(resolution_path, "w") as f:
+    writer = csv.writer(f)
+    writer.writerow(["Original Class", "Mapped Class", "Rule"])
+    for name in sorted(set(category_id_to_name.values())):
+        mapped, rule = class_mapping.resolve_with_rule(name)
+        writer.writerow([name, mapped or "", rule])
+
+print(f"Category resolution CSV saved to {resolution_path}")
+
 #Part B: Converting Coco to YOLO format (yolo_dataset)
 
 cleaned_dir = "cleaned_dataset"
@@ -202,19 +187,23 @@ images_dir = os.path.join(cleaned_dir, "images")
 cleaned_json_path = os.path.join(cleaned_dir, "cleaned_coco.json")
 class_mapping_csv = os.path.join(cleaned_dir, "class_mapping.csv")
 
-# Train/val folders
-train_img_dir = os.path.join(yolo_dir, "train", "images")
-train_label_dir = os.path.join(yolo_dir, "train", "labels")
-val_img_dir = os.path.join(yolo_dir, "val", "images")
-val_label_dir = os.path.join(yolo_dir, "val", "labels")
-
-# ------------------------------------------------------------
-# Clear old folders to avoid duplicates from the previous runs
-# -------------------------------------------------------------
-for folder in [train_img_dir, train_label_dir, val_img_dir, val_label_dir]:
-    if os.path.exists(folder):
-        shutil.rmtree(folder)
+# All images and labels live in one folder each; train/val are list files
+# naming the images of each split, so re-splitting never moves any data
+yolo_img_dir = os.path.join(yolo_dir, "images")
+yolo_label_dir = os.path.join(yolo_dir, "labels")
+train_list_path = os.path.join(yolo_dir, "train.txt")
+val_list_path = os.path.join(yolo_dir, "val.txt")
+
+# Per-split folders written by earlier versions of this script
+legacy_dirs = [os.path.join(yolo_dir, split, kind) for split in ("train", "val") for kind in ("images", "labels")]
+
+# ------------------------------------------------------------------------
+# Outputs from previous runs are kept and only rebuilt when their inputs
+# change; anything a run no longer produces is deleted at the end
+# ------------------------------------------------------------------------
+for folder in [yolo_img_dir, yolo_label_dir]:
     os.makedirs(folder, exist_ok=True)
+yolo_manifest = BuildManifest(yolo_dir)
 
 # -----------------------------
 # Load cleaned COCO JSON
@@ -227,61 +216,101 @@ image_id_to_ann = {}
 for ann in coco["annotations"]:
     image_id_to_ann.setdefault(ann["image_id"], []).append(ann)
 
-# ----------------------------------------
-# Split images into train (80%) and val (20%)
-# ----------------------------------------
-all_images = coco["images"]
-random.shuffle(all_images)
-split_idx = int(len(all_images) * 0.8)
-train_images = all_images[:split_idx]
-val_images = all_images[split_idx:]
-
-# ----------------------------------------
-# Function to convert COCO bbox to YOLO format
-# ----------------------------------------
-def coco_to_yolo_bbox(bbox, img_w, img_h):
-    """
-    bbox: [x_min, y_min, width, height]
-    returns: [x_center, y_center, width, height] normalized 0-1
-    """
-    x, y, w, h = bbox
-    x_center = (x + w / 2) / img_w
-    y_center = (y + h / 2) / img_h
-    w_norm = w / img_w
-    h_norm = h / img_h
-    return [x_center, y_center, w_norm, h_norm]
+# Settings every label file depends on
+label_config = {"class_mapping": class_mapping.to_dict()}
 
 # -----------------------------
 # Process images and generate YOLO labels
 # -----------------------------
-for subset, images_list, img_dst_dir, label_dst_dir in [
-    ("train", train_images, train_img_dir, train_label_dir),
-    ("val", val_images, val_img_dir, val_label_dir)
-]:
-    print(f"Processing {subset} set ({len(images_list)} images)...")
-
-    for img in images_list:
-        img_id = img["id"]
-        img_file = img["file_name"]
-        img_path = os.path.join(images_dir, img_file)
-
-        # Copy image to YOLO folder
-        copy2(img_path, os.path.join(img_dst_dir, img_file))
-
-        # Read image size
-        with Image.open(img_path) as im:
-            img_w, img_h = im.size
-
-        # Prepare YOLO label file
-        label_file = os.path.splitext(img_file)[0] + ".txt"
-        dst_label = os.path.join(label_dst_dir, label_file)
-
-        # Write annotations in YOLO format
-        with open(dst_label, "w") as f:
-            for ann in image_id_to_ann.get(img_id, []):
-                cls_id = ann["category_id"]  # already mapped 0-4
-                x_c, y_c, w_n, h_n = coco_to_yolo_bbox(ann["bbox"], img_w, img_h)
-                f.write(f"{cls_id} {x_c} {y_c} {w_n} {h_n}\n")
+all_images = coco["images"]
+print(f"Processing {len(all_images)} images...")
+
+label_images, label_paths, label_digests = [], [], []
+for img in all_images:
+    img_id = img["id"]
+    img_file = img["file_name"]
+    img_path = os.path.join(images_dir, img_file)
+    img_fingerprint = file_fingerprint(img_path, hash_image_contents)
+    anns = image_id_to_ann.get(img_id, [])
+
+    # Link (or copy) image into the YOLO folder
+    dst_img = os.path.join(yolo_img_dir, img_file)
+    img_digest = input_digest(img_fingerprint, materialize_mode)
+    if not yolo_manifest.is_current(dst_img, img_digest):
+        materialize(img_path, dst_img, materialize_mode)
+        yolo_manifest.record(dst_img, img_digest)
+
+    # Prepare YOLO label file
+    label_file = os.path.splitext(img_file)[0] + ".txt"
+    dst_label = os.path.join(yolo_label_dir, label_file)
+    label_digest = input_digest(img, anns, img_fingerprint, label_config)
+    if not yolo_manifest.is_current(dst_label, label_digest):
+        label_images.append(img)
+        label_paths.append(dst_label)
+        label_digests.append(label_digest)
+
+# Convert the new/changed labels in one batch (category ids are already
+# mapped 0-4) using the image sizes known from the COCO entries, and
+# write them from a thread pool
+label_texts = yolo_label_texts(label_images, coco["annotations"], image_sizes(label_images, images_dir))
+write_label_files(label_paths, label_texts, max_workers=8)
+for dst_label, label_digest in zip(label_paths, label_digests):
+    yolo_manifest.record(dst_label, label_digest)
+
+print(f"  {len(label_paths)} label files written, {len(all_images) - len(label_paths)} unchanged")
+
+# ------------------------------------------------------------------
+# Delete images and labels that are no longer present, plus the old
+# per-split folders
+# ------------------------------------------------------------------
+stale_outputs = yolo_manifest.remove_stale([yolo_img_dir, yolo_label_dir] + legacy_dirs)
+yolo_manifest.save()
+print(f"Removed {len(stale_outputs)} stale files from {yolo_dir}")
+for folder in legacy_dirs:
+    if os.path.isdir(folder) and not os.listdir(folder):
+        os.removedirs(folder)  # also drops the emptied train/ and val/ parents
+
+# ----------------------------------------------------------------------------
+# Split images into train (80%) and val (20%), stratified by rarest class and
+# scene/lighting/occlusion context with a fixed seed
+# ----------------------------------------------------------------------------
+split_seed = 42
+train_ids, val_ids = stratified_split(all_images, coco["annotations"], val_fraction=0.2, seed=split_seed)
+image_by_id = {img["id"]: img for img in all_images}
+train_images = [image_by_id[img_id] for img_id in train_ids.tolist()]
+val_images = [image_by_id[img_id] for img_id in val_ids.tolist()]
+
+for list_path, images_list in [(train_list_path, train_images), (val_list_path, val_images)]:
+    write_split_list(list_path, [os.path.join(yolo_img_dir, img["file_name"]) for img in images_list])
+
+# ---------------------------------------------------------------------------
+# Pack each split's labels into one shard file (float32 boxes, int16 classes)
+# so large splits load with one sequential read instead of one file per image.
+# Shards are built from the annotations already in memory, so no label file
+# is read back, even on reruns that left every label unchanged
+# ---------------------------------------------------------------------------
+for split, images_list in [("train", train_images), ("val", val_images)]:
+    shard = shard_from_coco(images_list, coco["annotations"], image_sizes(images_list, images_dir))
+    write_label_shard(os.path.join(yolo_dir, f"{split}_labels{SHARD_SUFFIX}"), shard)
+    print(f"{split} labels packed: {len(shard)} images, {shard.num_boxes} boxes")
+
+# --------------------------------------------------------------------------
+# Save label statistics for each image and split (number of labels, labels
+# per class, box-area histogram), computed from the annotations the labels
+# were written from rather than by re-reading the label files
+# --------------------------------------------------------------------------
+split_totals = {}
+for split, images_list in [("train", train_images), ("val", val_images)]:
+    stats = label_statistics(images_list, coco["annotations"], num_classes=len(canonical_classes))
+    written = write_label_statistics(
+        stats, canonical_classes,
+        csv_path=os.path.join(yolo_dir, f"{split}_labels_count.csv"),
+        npz_path=os.path.join(yolo_dir, f"{split}_labels_stats.npz"),
+        parquet_path=os.path.join(yolo_dir, f"{split}_labels_stats.parquet"))
+    split_totals[split] = split_statistics(stats)
+    print(f"{split} label statistics saved: {', '.join(written)}")
+
+write_split_summary(split_totals, canonical_classes, os.path.join(yolo_dir, "labels_split_summary.csv"))
 
 # -----------------------------
 # Copy class_mapping.csv
@@ -294,10 +323,10 @@ if os.path.exists(class_mapping_csv):
 # Generate data.yaml for YOLO
 # -----------------------------
 data_yaml = {
-    'train': os.path.join(yolo_dir, "train", "images"),
-    'val': os.path.join(yolo_dir, "val", "images"),
-    'nc': 5,
-    'names': ["potted plant", "chair", "cup", "vase", "book"]
+    'train': train_list_path,
+    'val': val_list_path,
+    'nc': len(canonical_classes),
+    'names': canonical_classes
 }
 
 yaml_path = os.path.join(yolo_dir, "data.yaml")
@@ -307,37 +336,3 @@ with open(yaml_path, "w") as f:
 print(f"YOLO dataset ready in '{yolo_dir}'")
 print(f"Train images: {len(train_images)}, Val images: {len(val_images)}")
 print(f"Data YAML: {yaml_path}")
-
-# --------------------------------------------------------------------------
-# Save CSV file recording the number of labels (annotations) for each image
-# --------------------------------------------------------------------------
-
-splits = ["train", "val"]  # your dataset splits
-
-for split in splits:
-    images_dir = os.path.join(yolo_dir, split, "images")
-    labels_dir = os.path.join(yolo_dir, split, "labels")  # YOLO label txt files
-    output_csv = os.path.join(yolo_dir, f"{split}_labels_count.csv")
-
-    image_files = [f for f in os.listdir(images_dir) if f.endswith((".jpg", ".png"))]
-    data = []
-
-    for image_file in image_files:
-        label_file = os.path.splitext(image_file)[0] + ".txt"
-        label_path = os.path.join(labels_dir, label_file)
-
-        if os.path.exists(label_path):
-            with open(label_path, "r") as f:
-                num_labels = sum(1 for line in f if line.strip())
-        else:
-            num_labels = 0
-
-        data.append([image_file, num_labels])
-
-    # Save CSV
-    with open(output_csv, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["image_id", "num_labels"])
-        writer.writerows(data)
-
-    print(f"{split} CSV saved as {output_csv}")
@@ -14,20 +14,35 @@ from ultralytics import YOLO
 model = YOLO("yolo11n.pt")
 
 from ultralytics import YOLO
-import os, shutil, csv, json
-from collections import defaultdict
+import os, sys, shutil, csv, json
+
+# Shared helpers live in the repo's src/ folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from materialize import materialize
+from image_index import ImageIndex
+from prediction_cache import PredictionCache, cached_prediction_records, list_images
+from prediction_stream import iter_error_rows
+from coco_eval import CocoEvaluator, detections_from_records, detections_to_results
+
+# How images are placed into output folders: "copy", "hardlink", "reflink" or "symlink"
+materialize_mode = "hardlink"
 
 # -----------------------------
 # Step 1. Run YOLO Predictions
 # -----------------------------
-model = YOLO("yolo11n.pt")
+model_weights = "yolo11n.pt"
+model = YOLO(model_weights)
 
-results = model.predict(
-    source="cleaned_dataset/images",
-    save=True,
-    conf=0.25,
-    classes=[58, 56, 41, 75, 73]
-)
+# Predictions are cached per (weights, image contents, conf, classes, imgsz)
+# in .prediction_cache/, so reruns with another iou_threshold, class mapping
+# or GT only run the model on new or changed images. Inference streams one
+# result at a time as Step 4 consumes them.
+prediction_cache = PredictionCache(model_weights, conf=0.25, classes=[58, 56, 41, 75, 73], imgsz=640)
+image_paths = list_images("cleaned_dataset/images")
+
+# Annotated images are only written by running the model, so saving them
+# predicts every image; set this to False to reuse the cached predictions
+save_predictions = True
 
 # -----------------------------
 # Step 2. Class Mapping
@@ -47,128 +62,69 @@ canonical_names = ["potted plant", "chair", "cup", "vase", "book"]
 with open("cleaned_dataset/cleaned_coco.json") as f:
     gt = json.load(f)
 
-image_id_to_ann = defaultdict(list)
-for ann in gt["annotations"]:
-    image_id_to_ann[ann["image_id"]].append(ann)
-
-image_id_to_name = {img["id"]: img["file_name"] for img in gt["images"]}
+# File name -> image id and image id -> annotations, built once and shared by
+# the matching loop, the JSON export and the copy step
+gt_index = ImageIndex.from_coco(gt)
 
 # -----------------------------
-# Step 4. IOU Function
+# Step 4. Compare Predictions vs GT, streaming the report
 # -----------------------------
-def iou(boxA, boxB):
-    xA = max(boxA[0], boxB[0])
-    yA = max(boxA[1], boxB[1])
-    xB = min(boxA[0] + boxA[2], boxB[0] + boxB[2])
-    yB = min(boxA[1] + boxA[3], boxB[1] + boxB[3])
-    interW = max(0, xB - xA)
-    interH = max(0, yB - yA)
-    inter = interW * interH
-    areaA = boxA[2] * boxA[3]
-    areaB = boxB[2] * boxB[3]
-    union = areaA + areaB - inter
-    return inter / union if union > 0 else 0
-
-# -----------------------------
-# Step 5. Compare Predictions vs GT
-# -----------------------------
-misclassified_images = set()
-report_rows = []
+# Each result is reduced to its boxes and released right away; records are
+# matched against GT in small batches and rows are written as they come
+misclassified_image_ids = set()
 iou_threshold = 0.5
 
-for result in results:
-    file_name = os.path.basename(result.path)
-
-    # Match GT image id
-    image_id = None
-    for img in gt["images"]:
-        if img["file_name"] == file_name:
-            image_id = img["id"]
-            break
-    if image_id is None:
-        continue
-
-    gt_anns = image_id_to_ann[image_id]
-    gt_boxes = [(ann["bbox"], ann["category_id"]) for ann in gt_anns]
-
-    # Predictions
-    preds = []
-    for box in result.boxes:
-        coco_id = int(box.cls.cpu().numpy()[0])
-        if coco_id in coco_to_canonical:
-            pred_class = coco_to_canonical[coco_id]
-            xyxy = box.xyxy.cpu().numpy()[0]
-            w, h = xyxy[2] - xyxy[0], xyxy[3] - xyxy[1]
-            preds.append(([float(xyxy[0]), float(xyxy[1]), float(w), float(h)], pred_class))
-
-    matched_preds = set()
-
-    # Check GT objects against predictions
-    for gt_box, gt_cls in gt_boxes:
-        found = False
-        for i, (pred_box, pred_cls) in enumerate(preds):
-            if i in matched_preds:
-                continue
-            if iou(gt_box, pred_box) >= iou_threshold:
-                found = True
-                matched_preds.add(i)
-                if pred_cls != gt_cls:
-                    misclassified_images.add(file_name)
-                    report_rows.append([
-                        file_name, "Wrong Class",
-                        canonical_names[gt_cls], canonical_names[pred_cls],
-                        round(iou(gt_box, pred_box), 3)
-                    ])
-                break
-        if not found:
-            misclassified_images.add(file_name)
-            report_rows.append([
-                file_name, "Missed Detection",
-                canonical_names[gt_cls], "None", 0.0
-            ])
-
-    # Also check for extra predictions not matched to any GT
-    for i, (pred_box, pred_cls) in enumerate(preds):
-        if i not in matched_preds:
-            misclassified_images.add(file_name)
-            report_rows.append([
-                file_name, "Missing Annotation",
-                "None", canonical_names[pred_cls], 0.0
-            ])
+with open("misclassified_report.csv", "w", newline="") as f:
+    writer = csv.writer(f)
+    writer.writerow(["Image", "Reason", "GroundTruth", "Prediction", "IOU"])
+    records = cached_prediction_records(model, image_paths, prediction_cache, coco_to_canonical,
+                                        save=save_predictions)
+    for image_id, row in iter_error_rows(records, gt_index, iou_threshold, canonical_names):
+        misclassified_image_ids.add(image_id)
+        writer.writerow(row)
+
+print(f"Predictions: {prediction_cache.hits} images cached, {prediction_cache.misses} predicted")
 
 # -----------------------------
-# Step 6. Save Outputs
+# Step 5. Save Outputs
 # -----------------------------
 
 # Misclassified COCO JSON
-misclassified_gt = {
-    "images": [img for img in gt["images"] if img["file_name"] in misclassified_images],
-    "annotations": [ann for ann in gt["annotations"]
-                    if image_id_to_name[ann["image_id"]] in misclassified_images],
-    "categories": gt["categories"]
-}
+misclassified_gt = gt_index.subset(misclassified_image_ids)
 with open("misclassified_coco.json", "w") as f:
     json.dump(misclassified_gt, f, indent=2)
 
-# Copy misclassified images
+# Link (or copy) misclassified images
 out_dir = "misclassified_images"
 os.makedirs(out_dir, exist_ok=True)
 for img in misclassified_gt["images"]:
     src = os.path.join("cleaned_dataset/images", img["file_name"])
     dst = os.path.join(out_dir, img["file_name"])
     if os.path.exists(src):
-        shutil.copy2(src, dst)
-
-# CSV Report
-with open("misclassified_report.csv", "w", newline="") as f:
-    writer = csv.writer(f)
-    writer.writerow(["Image", "Reason", "GroundTruth", "Prediction", "IOU"])
-    writer.writerows(report_rows)
+        materialize(src, dst, materialize_mode)
 
 print(f"✅ Saved {len(misclassified_gt['images'])} misclassified/missed images")
 print("📁 misclassified_images/ folder created")
 print("📄 misclassified_report.csv generated")
 
+# -----------------------------
+# Step 6. COCO Metrics (AP/AR)
+# -----------------------------
+# Scores the cached predictions (no second inference run) against the GT JSON
+# with COCO's protocol: AP@[.5:.95], AP50, AP75, per-size AP and AR. Only
+# detections above the cache's conf threshold are included.
+records = cached_prediction_records(model, image_paths, prediction_cache, coco_to_canonical)
+detections = detections_from_records(records, gt_index)
+
+with open("predictions_coco.json", "w") as f:
+    json.dump(detections_to_results(*detections), f)
+
+coco_metrics = CocoEvaluator.from_coco(gt).evaluate(*detections)
+coco_metrics.summarize()
+for category_id, ap in coco_metrics.per_class_ap().items():
+    print(f"  AP@[.5:.95] {canonical_names[category_id]:<14} {ap:.3f}")
+print("📄 predictions_coco.json generated")
+
 import shutil
 from google.colab import files
 
@@ -0,0 +1,162 @@
+"""
+Binary sidecar cache for BTT dataset indexes.
+
+Parsing a large coco.json takes seconds, and every training or evaluation
+worker pays it again. This module persists the AnnotationStore, ContextIndex
+and LabelIndex of a dataset as plain ``.npy`` files (plus a small JSON file for
+strings) in a directory keyed by the coco.json size and either its mtime or
+its content hash. Later loads ``np.load`` the arrays with ``mmap_mode='r'``, which
+is near-instant and lets worker processes share the same page-cache pages.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from annotation_store import AnnotationStore
+from context_index import ContextIndex
+from label_index import LabelIndex
+
+
+# Bump when the on-disk layout changes so stale caches are ignored
+CACHE_VERSION = 2
+META_FILE = "meta.json"
+
+
+def file_digest(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-1 of a file's contents.
+
+    Args:
+        path: File to hash
+        chunk_size: Bytes read per iteration
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(coco_path: Union[str, Path], hash_contents: bool = False) -> str:
+    """
+    Build the cache key for a coco.json file.
+
+    Args:
+        coco_path: Path to the COCO JSON file
+        hash_contents: Key on the file contents instead of its mtime. This
+                       survives mtime changes (e.g. from copies) and catches
+                       same-size edits within the mtime resolution, but reads
+                       the whole file
+
+    Returns:
+        Key string that changes whenever the file does
+    """
+    stat = os.stat(coco_path)
+    parts = [f"v{CACHE_VERSION}", str(stat.st_size)]
+    parts.append(file_digest(coco_path) if hash_contents else str(stat.st_mtime_ns))
+    return hashlib.sha1("-".join(parts).encode()).hexdigest()[:16]
+
+
+def default_cache_root(coco_path: Union[str, Path]) -> Path:
+    """Sidecar cache directory next to a coco.json file."""
+    return Path(coco_path).parent / ".coco_cache"
+
+
+def save_indexes(cache_dir: Union[str, Path], store: AnnotationStore,
+                 context_index: ContextIndex, label_index: LabelIndex):
+    """
+    Write dataset indexes to a cache directory.
+
+    The directory is written under a temporary name and renamed into place, so
+    concurrent readers never see a partial cache. Other keys next to it, left
+    by earlier versions of the same coco.json, are removed.
+
+    Args:
+        cache_dir: Target directory, usually ``<cache root>/<cache key>``
+        store: Annotation store to persist
+        context_index: Context index to persist
+        label_index: Label index to persist
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{cache_dir.name}-", dir=cache_dir.parent))
+    os.chmod(tmp_dir, 0o755)
+
+    try:
+        arrays = {f"store.{name}": array for name, array in store.to_arrays().items()}
+        arrays['context.offsets'] = context_index.offsets
+        arrays['context.image_rows'] = context_index.image_rows
+        arrays['label.matrix'] = label_index.matrix
+        arrays['label.occurrences'] = label_index.occurrences
+        for name, array in arrays.items():
+            np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(array))
+
+        meta = {
+            'version': CACHE_VERSION,
+            'file_names': store.file_names,
+            'category_names': store.category_names,
+            'context_keys': context_index.keys,
+            'context_types': context_index.types,
+            'num_images': context_index.num_images,
+            'labels': label_index.labels,
+        }
+        with open(tmp_dir / META_FILE, 'w') as f:
+            json.dump(meta, f)
+
+        os.replace(tmp_dir, cache_dir)
+    except OSError:
+        # Another process won the race, or the directory is read-only
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+
+    for sibling in cache_dir.parent.iterdir():
+        if sibling != cache_dir and not sibling.name.startswith('.'):
+            shutil.rmtree(sibling, ignore_errors=True)
+
+
+def load_indexes(cache_dir: Union[str, Path], mmap: bool = True
+                 ) -> Optional[Tuple[AnnotationStore, ContextIndex, LabelIndex]]:
+    """
+    Read dataset indexes from a cache directory.
+
+    Args:
+        cache_dir: Directory written by ``save_indexes``
+        mmap: Memory-map the arrays read-only instead of reading them
+
+    Returns:
+        Tuple (store, context_index, label_index), or None if there is no
+        usable cache in the directory
+    """
+    cache_dir = Path(cache_dir)
+    meta_path = cache_dir / META_FILE
+    if not meta_path.exists():
+        return None
+
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    if meta.get('version') != CACHE_VERSION:
+        return None
+
+    mmap_mode = 'r' if mmap else None
+
+    def load(name):
+        return np.load(cache_dir / f"{name}.npy", mmap_mode=mmap_mode)
+
+    store = AnnotationStore.from_arrays(
+        {name: load(f"store.{name}") for name in AnnotationStore.ARRAY_FIELDS},
+        meta['file_names'], meta['category_names'])
+    context_index = ContextIndex([tuple(key) for key in meta['context_keys']],
+                                 load('context.offsets'), load('context.image_rows'),
+                                 meta['num_images'], meta['context_types'])
+    label_index = LabelIndex(meta['labels'], load('label.matrix'), load('label.occurrences'))
+    return store, context_index, label_index
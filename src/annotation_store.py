@@ -0,0 +1,327 @@
+"""
+Columnar in-memory annotation store for BTT datasets.
+
+This module turns a COCO-format dataset into a set of NumPy arrays (image ids,
+image sizes, annotation bboxes and category ids) together with CSR-style offset
+indexes from images and categories to their annotations, so that queries over
+large merged corpora become array operations instead of dict walks.
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+def csr_index(keys: np.ndarray, num_keys: int):
+    """
+    Group row indices by an integer key in [0, num_keys).
+
+    Rows whose key is negative are left out of the index.
+
+    Returns:
+        Tuple (offsets, rows) where rows[offsets[k]:offsets[k + 1]] are the
+        row indices with key k, in their original order
+    """
+    valid = np.flatnonzero(keys >= 0)
+    order = valid[np.argsort(keys[valid], kind='stable')]
+    counts = np.bincount(keys[valid], minlength=num_keys)
+    offsets = np.zeros(num_keys + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets, order.astype(np.int64)
+
+
+def _as_number(value) -> float:
+    """Convert a stored size back to an int when it is integral, like the JSON it came from."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class AnnotationStore:
+    """
+    Columnar view of one COCO dataset.
+
+    Images are addressed by their row in ``image_ids`` and annotations by their
+    row in ``ann_ids``. ``image_ann_offsets``/``image_ann_rows`` map an image row
+    to its annotation rows, ``category_ann_offsets``/``category_ann_rows`` do the
+    same for a row in ``category_ids``.
+    """
+
+    # Every array attribute, including the derived indexes, so a store can be
+    # persisted and restored without recomputing anything
+    ARRAY_FIELDS = (
+        'image_ids', 'image_widths', 'image_heights',
+        'ann_ids', 'ann_image_ids', 'ann_bboxes', 'ann_category_ids', 'category_ids',
+        '_image_id_order', '_sorted_image_ids', '_category_id_order', '_sorted_category_ids',
+        'ann_image_rows', 'ann_category_rows',
+        'image_ann_offsets', 'image_ann_rows', 'category_ann_offsets', 'category_ann_rows',
+    )
+
+    def __init__(self, image_ids: np.ndarray, image_widths: np.ndarray, image_heights: np.ndarray,
+                 file_names: List[str], ann_ids: np.ndarray, ann_image_ids: np.ndarray,
+                 ann_bboxes: np.ndarray, ann_category_ids: np.ndarray,
+                 category_ids: np.ndarray, category_names: List[str]):
+        """
+        Initialize the store from already columnar data.
+
+        Args:
+            image_ids: (N,) image ids
+            image_widths: (N,) float64 image widths, 0 where unknown
+            image_heights: (N,) float64 image heights, 0 where unknown
+            file_names: N image filenames
+            ann_ids: (M,) annotation ids
+            ann_image_ids: (M,) image id of each annotation
+            ann_bboxes: (M, 4) COCO ``[x, y, w, h]`` boxes
+            ann_category_ids: (M,) category id of each annotation
+            category_ids: (C,) category ids
+            category_names: C category names
+        """
+        self.image_ids = image_ids
+        self.image_widths = image_widths
+        self.image_heights = image_heights
+        self.file_names = file_names
+        self.ann_ids = ann_ids
+        self.ann_image_ids = ann_image_ids
+        self.ann_bboxes = ann_bboxes
+        self.ann_category_ids = ann_category_ids
+        self.category_ids = category_ids
+        self.category_names = category_names
+
+        # Sorted id lookups so ids can be resolved to rows with searchsorted
+        self._image_id_order = np.argsort(image_ids, kind='stable')
+        self._sorted_image_ids = image_ids[self._image_id_order]
+        self._category_id_order = np.argsort(category_ids, kind='stable')
+        self._sorted_category_ids = category_ids[self._category_id_order]
+
+        self.ann_image_rows = self.image_rows(ann_image_ids)
+        self.ann_category_rows = self.category_rows(ann_category_ids)
+
+        self.image_ann_offsets, self.image_ann_rows = csr_index(self.ann_image_rows, len(image_ids))
+        self.category_ann_offsets, self.category_ann_rows = csr_index(
+            self.ann_category_rows, len(category_ids))
+
+    @classmethod
+    def from_coco(cls, data: Dict) -> "AnnotationStore":
+        """
+        Build a store from a loaded COCO dictionary.
+
+        Args:
+            data: COCO dictionary as returned by ``json.load``
+
+        Returns:
+            AnnotationStore over the dataset
+        """
+        return cls.from_records(data.get('images', []), data.get('annotations', []),
+                                data.get('categories', []))
+
+    @classmethod
+    def from_records(cls, images: Iterable[Dict], annotations: Iterable[Dict],
+                     categories: Iterable[Dict]) -> "AnnotationStore":
+        """
+        Build a store from iterables of COCO image, annotation and category entries.
+
+        Each iterable is consumed once, so generators can be passed directly.
+        Widths and heights are kept as float64, since COCO files may store
+        them as floats (e.g. 640.0). Boxes with fewer than 4 values are
+        padded with zeros so every annotation keeps its own row.
+
+        Args:
+            images: COCO image entries
+            annotations: COCO annotation entries
+            categories: COCO category entries
+
+        Returns:
+            AnnotationStore over the records
+        """
+        builder = AnnotationStoreBuilder()
+        for img in images:
+            builder.add_image(img)
+        for ann in annotations:
+            builder.add_annotation(ann)
+        for cat in categories:
+            builder.add_category(cat)
+        return builder.build()
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], file_names: List[str],
+                    category_names: List[str]) -> "AnnotationStore":
+        """
+        Restore a store from the output of ``to_arrays`` without recomputing indexes.
+
+        Args:
+            arrays: Mapping of every name in ``ARRAY_FIELDS`` to its array
+                    (memory-mapped arrays work as-is)
+            file_names: Image filenames
+            category_names: Category names
+
+        Returns:
+            AnnotationStore over the arrays
+        """
+        store = cls.__new__(cls)
+        for name in cls.ARRAY_FIELDS:
+            setattr(store, name, arrays[name])
+        store.file_names = file_names
+        store.category_names = category_names
+        return store
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Get every array attribute of the store, keyed by name."""
+        return {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+
+    @property
+    def num_images(self) -> int:
+        """Number of images in the store."""
+        return len(self.image_ids)
+
+    @property
+    def num_annotations(self) -> int:
+        """Number of annotations in the store."""
+        return len(self.ann_ids)
+
+    @staticmethod
+    def _lookup(sorted_ids: np.ndarray, order: np.ndarray, query) -> np.ndarray:
+        """Resolve ids to rows through a sorted order, -1 where not present."""
+        query = np.asarray(query, dtype=np.int64)
+        if len(sorted_ids) == 0:
+            return np.full(query.shape, -1, dtype=np.int64)
+        pos = np.searchsorted(sorted_ids, query)
+        pos = np.minimum(pos, len(sorted_ids) - 1)
+        rows = order[pos].astype(np.int64)
+        rows[sorted_ids[pos] != query] = -1
+        return rows
+
+    def image_rows(self, image_ids) -> np.ndarray:
+        """
+        Resolve image ids to image rows.
+
+        Args:
+            image_ids: Array-like of image ids
+
+        Returns:
+            Array of image rows, -1 for ids not in the store
+        """
+        return self._lookup(self._sorted_image_ids, self._image_id_order, image_ids)
+
+    def category_rows(self, category_ids) -> np.ndarray:
+        """
+        Resolve category ids to category rows.
+
+        Args:
+            category_ids: Array-like of category ids
+
+        Returns:
+            Array of category rows, -1 for ids not in the store
+        """
+        return self._lookup(self._sorted_category_ids, self._category_id_order, category_ids)
+
+    def annotations_for_image(self, image_id: int) -> np.ndarray:
+        """
+        Get annotation rows belonging to an image.
+
+        Args:
+            image_id: COCO image id
+
+        Returns:
+            Array of annotation rows (empty if the image is unknown)
+        """
+        row = int(self.image_rows([image_id])[0])
+        if row < 0:
+            return np.empty(0, dtype=np.int64)
+        return self.image_ann_rows[self.image_ann_offsets[row]:self.image_ann_offsets[row + 1]]
+
+    def annotations_for_category(self, category_id: int) -> np.ndarray:
+        """
+        Get annotation rows belonging to a category.
+
+        Args:
+            category_id: COCO category id
+
+        Returns:
+            Array of annotation rows (empty if the category is unknown)
+        """
+        row = int(self.category_rows([category_id])[0])
+        if row < 0:
+            return np.empty(0, dtype=np.int64)
+        return self.category_ann_rows[self.category_ann_offsets[row]:self.category_ann_offsets[row + 1]]
+
+    def annotation_counts_per_image(self) -> np.ndarray:
+        """Number of annotations for every image row."""
+        return np.diff(self.image_ann_offsets)
+
+    def annotation_counts_per_category(self) -> Dict[str, int]:
+        """Number of annotations for every category, keyed by category name."""
+        counts = np.diff(self.category_ann_offsets)
+        return {name: int(count) for name, count in zip(self.category_names, counts)}
+
+    def image_entry(self, row: int, data: Optional[Dict] = None) -> Dict:
+        """
+        Get the image entry for an image row.
+
+        Args:
+            row: Image row
+            data: Optional COCO dictionary the store was built from; when given,
+                  the original entry is returned
+
+        Returns:
+            Image entry dictionary
+        """
+        if data is not None:
+            return data['images'][row]
+        return {
+            'id': int(self.image_ids[row]),
+            'file_name': self.file_names[row],
+            'width': _as_number(self.image_widths[row]),
+            'height': _as_number(self.image_heights[row]),
+        }
+
+
+class AnnotationStoreBuilder:
+    """
+    Incrementally build an AnnotationStore, one COCO entry at a time.
+
+    Images, annotations and categories may be added in any interleaving, so
+    a single streaming pass over a COCO file can feed the builder.
+    """
+
+    def __init__(self):
+        self.image_ids, self.widths, self.heights = array('q'), array('d'), array('d')
+        self.file_names: List[str] = []
+        self.ann_ids, self.ann_image_ids, self.ann_category_ids = array('q'), array('q'), array('q')
+        self.bboxes = array('d')
+        self.category_ids: List[int] = []
+        self.category_names: List[str] = []
+
+    def add_image(self, img: Dict):
+        """Add a COCO image entry."""
+        self.image_ids.append(img['id'])
+        self.widths.append(img.get('width') or 0)
+        self.heights.append(img.get('height') or 0)
+        self.file_names.append(img.get('file_name', ''))
+
+    def add_annotation(self, ann: Dict):
+        """Add a COCO annotation entry."""
+        self.ann_ids.append(ann.get('id', -1))
+        self.ann_image_ids.append(ann['image_id'])
+        self.ann_category_ids.append(ann.get('category_id', -1))
+        bbox = list((ann.get('bbox') or (0.0, 0.0, 0.0, 0.0))[:4])
+        self.bboxes.extend(bbox + [0.0] * (4 - len(bbox)))
+
+    def add_category(self, cat: Dict):
+        """Add a COCO category entry."""
+        self.category_ids.append(cat['id'])
+        self.category_names.append(cat.get('name', ''))
+
+    def build(self) -> AnnotationStore:
+        """Finish the store."""
+        return AnnotationStore(
+            image_ids=np.frombuffer(self.image_ids, dtype=np.int64).copy(),
+            image_widths=np.frombuffer(self.widths, dtype=np.float64).copy(),
+            image_heights=np.frombuffer(self.heights, dtype=np.float64).copy(),
+            file_names=self.file_names,
+            ann_ids=np.frombuffer(self.ann_ids, dtype=np.int64).copy(),
+            ann_image_ids=np.frombuffer(self.ann_image_ids, dtype=np.int64).copy(),
+            ann_bboxes=np.frombuffer(self.bboxes, dtype=np.float64).reshape(-1, 4).copy(),
+            ann_category_ids=np.frombuffer(self.ann_category_ids, dtype=np.int64).copy(),
+            category_ids=np.asarray(self.category_ids, dtype=np.int64),
+            category_names=self.category_names,
+        )
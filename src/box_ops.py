@@ -0,0 +1,187 @@
+"""
+Vectorized box operations for comparing predictions with ground truth.
+
+``iou_matrix`` computes the IoU of every pair of two box sets in one NumPy
+pass, ``batched_iou`` does the same for the same-image pairs of many images
+at once, ``padded_iou`` fills fixed-size per-group matrices for batched
+evaluation, and ``greedy_match`` replays the scalar GT -> prediction matching
+loop on a precomputed matrix. IoU values use the same operation order as the
+scalar helper they replace, so they are bit-identical to it.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+XYWH = "xywh"  # COCO: [x_min, y_min, width, height]
+XYXY = "xyxy"  # [x_min, y_min, x_max, y_max]
+BOX_FORMATS = (XYWH, XYXY)
+
+
+def _as_boxes(boxes) -> np.ndarray:
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+
+def _corners_and_areas(boxes: np.ndarray, box_format: str) -> Tuple[np.ndarray, ...]:
+    """Split (N, 4) boxes into x1, y1, x2, y2 and area columns."""
+    if box_format not in BOX_FORMATS:
+        raise ValueError(f"Unknown box format {box_format!r}, expected one of {BOX_FORMATS}")
+    x1, y1, c, d = boxes.T
+    if box_format == XYWH:
+        return x1, y1, x1 + c, y1 + d, c * d
+    return x1, y1, c, d, (c - x1) * (d - y1)
+
+
+def _pair_iou(a: Tuple[np.ndarray, ...], b: Tuple[np.ndarray, ...],
+              crowd_b: Optional[np.ndarray] = None) -> np.ndarray:
+    """IoU of broadcastable corner/area columns."""
+    ax1, ay1, ax2, ay2, area_a = a
+    bx1, by1, bx2, by2, area_b = b
+    inter_w = np.maximum(0, np.minimum(ax2, bx2) - np.maximum(ax1, bx1))
+    inter_h = np.maximum(0, np.minimum(ay2, by2) - np.maximum(ay1, by1))
+    inter = inter_w * inter_h
+    union = area_a + area_b - inter
+    if crowd_b is not None:
+        # Like COCO's iscrowd: a crowd region b scores the share of box a it covers
+        union = np.where(crowd_b, area_a, union)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(union > 0, inter / union, 0.0)
+
+
+def iou_matrix(boxes_a, boxes_b, box_format: str = XYWH, crowd_b=None) -> np.ndarray:
+    """
+    Compute the IoU of every pair of boxes.
+
+    Args:
+        boxes_a: (N, 4) boxes, e.g. ground truth
+        boxes_b: (M, 4) boxes, e.g. predictions
+        box_format: 'xywh' (COCO) or 'xyxy'
+        crowd_b: Optional (M,) flags; for crowd boxes of b the union is the
+                 area of box a, as in COCO evaluation
+
+    Returns:
+        (N, M) float64 array; pairs whose union is empty get 0
+    """
+    a = _corners_and_areas(_as_boxes(boxes_a), box_format)
+    b = _corners_and_areas(_as_boxes(boxes_b), box_format)
+    crowd_b = None if crowd_b is None else np.asarray(crowd_b, dtype=bool).reshape(1, -1)
+    return _pair_iou(tuple(col[:, None] for col in a), tuple(col[None, :] for col in b), crowd_b)
+
+
+def batched_iou(boxes_a, offsets_a: Sequence[int], boxes_b, offsets_b: Sequence[int],
+                box_format: str = XYWH) -> List[np.ndarray]:
+    """
+    Compute per-image IoU matrices for many images in one pass.
+
+    Boxes of all images are concatenated; image i owns rows
+    offsets[i]:offsets[i + 1] of each set. Only same-image pairs are computed.
+
+    Args:
+        boxes_a: (N, 4) boxes of all images, e.g. ground truth
+        offsets_a: (num_images + 1,) row offsets into boxes_a
+        boxes_b: (M, 4) boxes of all images, e.g. predictions
+        offsets_b: (num_images + 1,) row offsets into boxes_b
+        box_format: 'xywh' (COCO) or 'xyxy'
+
+    Returns:
+        One (n_i, m_i) IoU matrix per image, equal to ``iou_matrix`` of that
+        image's boxes
+    """
+    offsets_a = np.asarray(offsets_a, dtype=np.int64)
+    offsets_b = np.asarray(offsets_b, dtype=np.int64)
+    if len(offsets_a) != len(offsets_b):
+        raise ValueError("offsets_a and offsets_b must describe the same images")
+    counts_a = np.diff(offsets_a)
+    counts_b = np.diff(offsets_b)
+    pair_counts = counts_a * counts_b
+
+    # For every same-image pair, the row of box a and of box b (row-major per image)
+    pair_image = np.repeat(np.arange(len(counts_a)), pair_counts)
+    pair_start = np.zeros(len(pair_counts) + 1, dtype=np.int64)
+    np.cumsum(pair_counts, out=pair_start[1:])
+    local = np.arange(pair_start[-1]) - pair_start[pair_image]
+    m = counts_b[pair_image]
+    rows_a = offsets_a[pair_image] + local // np.maximum(m, 1)
+    rows_b = offsets_b[pair_image] + local % np.maximum(m, 1)
+
+    a = _corners_and_areas(_as_boxes(boxes_a), box_format)
+    b = _corners_and_areas(_as_boxes(boxes_b), box_format)
+    ious = _pair_iou(tuple(col[rows_a] for col in a), tuple(col[rows_b] for col in b))
+
+    return [ious[pair_start[i]:pair_start[i + 1]].reshape(counts_a[i], counts_b[i])
+            for i in range(len(counts_a))]
+
+
+def padded_iou(boxes_a, index_a, boxes_b, index_b, box_format: str = XYWH,
+               crowd_b=None) -> np.ndarray:
+    """
+    Compute IoU matrices of many groups padded to a common size.
+
+    Group g pairs boxes_a[index_a[g]] with boxes_b[index_b[g]]; negative
+    indices mark padding.
+
+    Args:
+        boxes_a: (N, 4) boxes, e.g. detections
+        index_a: (G, P) rows of boxes_a per group, -1 for padding
+        boxes_b: (M, 4) boxes, e.g. ground truth
+        index_b: (G, Q) rows of boxes_b per group, -1 for padding
+        box_format: 'xywh' (COCO) or 'xyxy'
+        crowd_b: Optional (M,) crowd flags of boxes_b, see ``iou_matrix``
+
+    Returns:
+        (G, P, Q) float64 array, 0 wherever either side is padding
+    """
+    index_a = np.asarray(index_a, dtype=np.int64).reshape(len(index_a), -1)
+    index_b = np.asarray(index_b, dtype=np.int64).reshape(len(index_b), -1)
+    boxes_a, boxes_b = _as_boxes(boxes_a), _as_boxes(boxes_b)
+    if not len(boxes_a) or not len(boxes_b):
+        return np.zeros(index_a.shape + index_b.shape[1:])
+
+    rows_a = np.maximum(index_a, 0)[:, :, None]
+    rows_b = np.maximum(index_b, 0)[:, None, :]
+    a = _corners_and_areas(boxes_a, box_format)
+    b = _corners_and_areas(boxes_b, box_format)
+    if crowd_b is not None:
+        crowd_b = np.asarray(crowd_b, dtype=bool)[rows_b]
+    ious = _pair_iou(tuple(col[rows_a] for col in a), tuple(col[rows_b] for col in b), crowd_b)
+    return np.where((index_a >= 0)[:, :, None] & (index_b >= 0)[:, None, :], ious, 0.0)
+
+
+def greedy_match(ious: np.ndarray, threshold: float, first_only: bool = True,
+                 pred_order: Optional[Sequence[int]] = None) -> Tuple[List[List[int]], List[int]]:
+    """
+    Greedily match ground truth boxes (rows) to predictions (columns).
+
+    Ground truth boxes are visited in row order. Each one takes the
+    unmatched predictions with IoU >= threshold: the first in column order
+    when first_only, otherwise all of them. A prediction is matched at most
+    once.
+
+    Args:
+        ious: (N, M) IoU matrix
+        threshold: Minimum IoU for a match
+        first_only: Match at most one prediction per ground truth box
+        pred_order: Column visiting order (default: column order), e.g.
+                    predictions sorted by descending confidence
+
+    Returns:
+        Tuple (gt_matches, unmatched_preds): the matched prediction columns
+        of every ground truth row (empty when it was missed), and the
+        columns left unmatched, in column order
+    """
+    ious = np.asarray(ious)
+    num_preds = ious.shape[1]
+    order = np.arange(num_preds) if pred_order is None else np.asarray(pred_order, dtype=np.int64)
+    candidates = ious[:, order] >= threshold
+    matched = np.zeros(num_preds, dtype=bool)
+
+    gt_matches = []
+    for row in candidates:
+        columns = order[row & ~matched[order]]
+        if first_only:
+            columns = columns[:1]
+        matched[columns] = True
+        gt_matches.append(columns.tolist())
+
+    return gt_matches, np.flatnonzero(~matched).tolist()
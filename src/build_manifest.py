@@ -0,0 +1,164 @@
+"""
+Content-addressed manifest for incremental dataset builds.
+
+Each output file of a build (cleaned image, YOLO image, YOLO label) is
+recorded together with a digest of everything it was produced from: the
+COCO entries involved, the source file's size/mtime (and optionally content
+hash) and the class mapping. On the next run, outputs whose digest is
+unchanged are skipped, changed ones are rebuilt, and outputs that are no
+longer produced are deleted. The train/val split does not change any of these
+outputs (the split list files are rewritten on every run), so the split seed
+is not part of any digest.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Union
+
+from annotation_cache import file_digest
+
+
+# Bump when the meaning of recorded digests changes so everything rebuilds
+MANIFEST_VERSION = 1
+MANIFEST_FILE = ".build_manifest.json"
+
+
+def input_digest(*parts) -> str:
+    """
+    Digest a set of JSON-serializable build inputs.
+
+    Args:
+        *parts: Inputs of one output (COCO entries, fingerprints, settings)
+
+    Returns:
+        Hex digest that changes whenever any input does
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def file_fingerprint(path: Union[str, Path], hash_contents: bool = False) -> List:
+    """
+    Fingerprint a source file for change detection.
+
+    Args:
+        path: Source file
+        hash_contents: Also hash the contents, which catches edits that keep
+                       size and mtime but reads the whole file
+
+    Returns:
+        [size, mtime_ns] or [size, mtime_ns, sha1]
+    """
+    stat = os.stat(path)
+    fingerprint = [stat.st_size, stat.st_mtime_ns]
+    if hash_contents:
+        fingerprint.append(file_digest(path))
+    return fingerprint
+
+
+class BuildManifest:
+    """
+    Record of the outputs under a build directory and the inputs they came from.
+
+    Usage per run: call ``is_current`` for every output the run would
+    produce, rebuild the ones that are not and ``record`` them, then
+    ``remove_stale`` and ``save``.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        """
+        Load the manifest of a build directory, if any.
+
+        Args:
+            root: Build output directory; output paths are stored relative to it
+        """
+        self.root = Path(root)
+        self.path = self.root / MANIFEST_FILE
+        self.outputs: Dict[str, str] = {}
+        self._seen: Set[str] = set()
+
+        if self.path.exists():
+            try:
+                with open(self.path) as f:
+                    manifest = json.load(f)
+            except ValueError:
+                manifest = {}
+            if manifest.get("version") == MANIFEST_VERSION:
+                self.outputs = manifest.get("outputs", {})
+
+    def _key(self, output: Union[str, Path]) -> str:
+        return Path(os.path.relpath(output, self.root)).as_posix()
+
+    def is_current(self, output: Union[str, Path], digest: str) -> bool:
+        """
+        Check whether an output exists and was built from the same inputs.
+
+        The output is marked as produced by this run either way.
+
+        Args:
+            output: Output file path
+            digest: Digest of its inputs (see ``input_digest``)
+
+        Returns:
+            True if the output can be kept as is
+        """
+        key = self._key(output)
+        self._seen.add(key)
+        return self.outputs.get(key) == digest and os.path.lexists(output)
+
+    def record(self, output: Union[str, Path], digest: str):
+        """
+        Record a freshly built output.
+
+        Args:
+            output: Output file path
+            digest: Digest of its inputs
+        """
+        key = self._key(output)
+        self._seen.add(key)
+        self.outputs[key] = digest
+
+    def remove_stale(self, directories: Iterable[Union[str, Path]] = ()) -> List[str]:
+        """
+        Delete outputs that this run did not produce.
+
+        Args:
+            directories: Output directories that only hold build outputs; files
+                         in them that were never recorded (e.g. left by a
+                         build without a manifest) are deleted as well
+
+        Returns:
+            Relative paths of the deleted outputs
+        """
+        stale = set(self.outputs) - self._seen
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if not entry.is_dir(follow_symlinks=False):
+                        key = self._key(entry.path)
+                        if key not in self._seen:
+                            stale.add(key)
+
+        for key in sorted(stale):
+            path = self.root / key
+            if os.path.lexists(path):
+                os.remove(path)
+            self.outputs.pop(key, None)
+        return sorted(stale)
+
+    def save(self):
+        """Write the manifest atomically."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=MANIFEST_FILE, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": MANIFEST_VERSION, "outputs": self.outputs}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
@@ -0,0 +1,242 @@
+"""
+Configurable mapping of noisy category names to canonical classes.
+
+Rules are loaded from a YAML/JSON config (see ``configs/class_mapping.yaml``)
+and applied in order: exact name, normalized name (case and whitespace),
+"##" wordpiece fragments, then fuzzy similarity. Name resolution happens once per
+source category: ``compile`` turns a dataset's categories into a
+category-id -> canonical-id lookup array, so remapping any number of
+annotations is a single fancy-index operation.
+"""
+
+import difflib
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import yaml
+except ImportError:  # only needed for YAML configs
+    yaml = None
+
+
+DEFAULT_CONFIG = Path(__file__).resolve().parent.parent / "configs" / "class_mapping.yaml"
+
+WORDPIECE_PREFIX = "##"
+_WHITESPACE = re.compile(r"\s+")
+
+
+class CategoryLookup:
+    """
+    Compiled category-id -> canonical class id lookup for one dataset.
+
+    ``lookup[category_id]`` is the 0-based canonical class id, or -1 when the
+    category is unmapped or unknown.
+    """
+
+    def __init__(self, lookup: np.ndarray, rules: Dict[int, Tuple[str, Optional[str], str]]):
+        """
+        Args:
+            lookup: Dense int64 array indexed by source category id
+            rules: {category_id: (source name, canonical name or None, rule)}
+        """
+        self.lookup = lookup
+        self.rules = rules
+
+    def remap(self, category_ids: Union[np.ndarray, Iterable[int]]) -> np.ndarray:
+        """
+        Map source category ids to canonical class ids.
+
+        Args:
+            category_ids: Source category id per annotation
+
+        Returns:
+            int64 array of canonical class ids, -1 where unmapped
+        """
+        category_ids = np.asarray(category_ids, dtype=np.int64)
+        in_range = (category_ids >= 0) & (category_ids < len(self.lookup))
+        return np.where(in_range, self.lookup[np.where(in_range, category_ids, 0)], -1)
+
+
+class ClassMapping:
+    """
+    Resolves source category names to canonical class names.
+    """
+
+    def __init__(self, canonical_classes: List[str], exact: Optional[Dict[str, str]] = None,
+                 lowercase: bool = True, collapse_whitespace: bool = True, wordpieces: bool = True,
+                 fuzzy_cutoff: Optional[float] = None):
+        """
+        Initialize the mapping.
+
+        Args:
+            canonical_classes: Canonical class names, in class id order
+            exact: Source name -> canonical name rules
+            lowercase: Ignore case in normalized matching
+            collapse_whitespace: Ignore repeated/leading/trailing whitespace
+            wordpieces: Match names starting with "##" (wordpiece fragments)
+                        against the end of canonical words
+            fuzzy_cutoff: Minimum difflib similarity for fuzzy matches; None
+                          disables fuzzy matching
+
+        Raises:
+            ValueError: If an exact rule targets a name that is not canonical
+        """
+        self.canonical_classes = list(canonical_classes)
+        self.exact = dict(exact or {})
+        self.lowercase = lowercase
+        self.collapse_whitespace = collapse_whitespace
+        self.wordpieces = wordpieces
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        unknown = sorted(set(self.exact.values()) - set(self.canonical_classes))
+        if unknown:
+            raise ValueError(f"Mapping targets are not canonical classes: {unknown}")
+
+        self.class_ids = {name: i for i, name in enumerate(self.canonical_classes)}
+
+        # Normalized lookup table: canonical names first, exact rules override
+        self._normalized = {self.normalize(name): name for name in self.canonical_classes}
+        for source, target in self.exact.items():
+            self._normalized[self.normalize(source)] = target
+        self._cache: Dict[str, Tuple[Optional[str], str]] = {}
+
+    @classmethod
+    def from_dict(cls, config: Dict) -> 'ClassMapping':
+        """
+        Build a mapping from a parsed config.
+
+        Args:
+            config: Dictionary with 'canonical_classes' and optional 'exact',
+                    'normalize' and 'fuzzy' sections
+
+        Returns:
+            ClassMapping instance
+        """
+        normalize = config.get("normalize") or {}
+        fuzzy = config.get("fuzzy") or {}
+        return cls(
+            config["canonical_classes"],
+            exact=config.get("exact"),
+            lowercase=normalize.get("lowercase", True),
+            collapse_whitespace=normalize.get("collapse_whitespace", True),
+            wordpieces=normalize.get("wordpieces", True),
+            fuzzy_cutoff=fuzzy.get("cutoff", 0.9) if fuzzy.get("enabled", False) else None,
+        )
+
+    @classmethod
+    def from_config(cls, path: Union[str, Path] = DEFAULT_CONFIG) -> 'ClassMapping':
+        """
+        Load a mapping from a YAML or JSON config file.
+
+        Args:
+            path: Config file; .json is read with json, anything else as YAML
+
+        Returns:
+            ClassMapping instance
+        """
+        with open(path) as f:
+            if Path(path).suffix == ".json":
+                config = json.load(f)
+            elif yaml is None:
+                raise ImportError("PyYAML is required to read YAML class mapping configs")
+            else:
+                config = yaml.safe_load(f)
+        return cls.from_dict(config)
+
+    def to_dict(self) -> Dict:
+        """Config dictionary equivalent to this mapping."""
+        return {
+            "canonical_classes": self.canonical_classes,
+            "exact": self.exact,
+            "normalize": {"lowercase": self.lowercase, "collapse_whitespace": self.collapse_whitespace,
+                          "wordpieces": self.wordpieces},
+            "fuzzy": {"enabled": self.fuzzy_cutoff is not None, "cutoff": self.fuzzy_cutoff},
+        }
+
+    def normalize(self, name: str) -> str:
+        """Normalize a category name for matching."""
+        if self.collapse_whitespace:
+            name = _WHITESPACE.sub(" ", name).strip()
+        if self.lowercase:
+            name = name.lower()
+        return name
+
+    def _resolve_fragment(self, fragment: str) -> Optional[str]:
+        """Canonical class with exactly one word ending in a wordpiece fragment."""
+        matches = {name for name in self.canonical_classes
+                   if any(word.endswith(fragment) for word in self.normalize(name).split())}
+        return matches.pop() if len(matches) == 1 else None
+
+    def resolve_with_rule(self, name: str) -> Tuple[Optional[str], str]:
+        """
+        Resolve a source name and report which rule matched.
+
+        Args:
+            name: Source category name
+
+        Returns:
+            Tuple (canonical name or None, rule) with rule one of 'exact',
+            'normalized', 'wordpiece', 'fuzzy' or 'unmapped'
+        """
+        if name in self._cache:
+            return self._cache[name]
+
+        if name in self.exact:
+            result = self.exact[name], "exact"
+        elif name in self.class_ids:
+            result = name, "exact"
+        else:
+            key = self.normalize(name)
+            fragment = ""
+            if self.wordpieces and name.strip().startswith(WORDPIECE_PREFIX):
+                fragment = self.normalize(name.strip()[len(WORDPIECE_PREFIX):])
+            if key in self._normalized:
+                result = self._normalized[key], "normalized"
+            elif fragment and self._resolve_fragment(fragment):
+                result = self._resolve_fragment(fragment), "wordpiece"
+            else:
+                result = None, "unmapped"
+                if self.fuzzy_cutoff is not None and key:
+                    close = difflib.get_close_matches(key, list(self._normalized), n=1,
+                                                      cutoff=self.fuzzy_cutoff)
+                    if close:
+                        result = self._normalized[close[0]], "fuzzy"
+
+        self._cache[name] = result
+        return result
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        Resolve a source category name.
+
+        Args:
+            name: Source category name
+
+        Returns:
+            Canonical class name, or None if no rule matches
+        """
+        return self.resolve_with_rule(name)[0]
+
+    def compile(self, category_id_to_name: Dict[int, str]) -> CategoryLookup:
+        """
+        Compile the mapping for one dataset's categories.
+
+        Args:
+            category_id_to_name: Source category id -> name
+
+        Returns:
+            CategoryLookup from source category id to canonical class id
+        """
+        size = max((cat_id for cat_id in category_id_to_name if cat_id >= 0), default=-1) + 1
+        lookup = np.full(size, -1, dtype=np.int64)
+        rules = {}
+        for cat_id, name in category_id_to_name.items():
+            canonical, rule = self.resolve_with_rule(name)
+            rules[cat_id] = (name, canonical, rule)
+            if canonical is not None and cat_id >= 0:
+                lookup[cat_id] = self.class_ids[canonical]
+        return CategoryLookup(lookup, rules)
@@ -0,0 +1,576 @@
+"""
+Vectorized COCO-style bounding box evaluation.
+
+pycocotools' ``COCOeval`` matches detections to ground truth with nested
+Python loops over images, categories, area ranges, IoU thresholds,
+detections and GT boxes. ``CocoEvaluator`` follows the same protocol (score
+ordered greedy matching, crowd and out-of-range GT ignored, 101-point
+interpolated precision, 1/10/100 max detections) with NumPy instead:
+
+* detections and GT of every (image, category) pair are gathered into
+  padded arrays, bucketed by size so little padding is wasted;
+* all pairs, area ranges and IoU thresholds are matched at once, looping
+  only over the detection rank;
+* precision/recall curves of each category come from cumulative sums over
+  its score ordered detections.
+
+The resulting precision, recall and score arrays have COCOeval's layout and
+values, so ``stats`` equals ``COCOeval.stats``.
+"""
+
+import json
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from box_ops import XYWH, padded_iou
+from image_index import ImageIndex
+from prediction_stream import PredictionRecord
+
+
+IOU_THRESHOLDS = np.linspace(.5, 0.95, int(np.round((0.95 - .5) / .05)) + 1, endpoint=True)
+RECALL_THRESHOLDS = np.linspace(.0, 1.00, int(np.round((1.00 - .0) / .01)) + 1, endpoint=True)
+MAX_DETS = (1, 10, 100)
+AREA_RANGES = {
+    "all": (0 ** 2, 1e5 ** 2),
+    "small": (0 ** 2, 32 ** 2),
+    "medium": (32 ** 2, 96 ** 2),
+    "large": (96 ** 2, 1e5 ** 2),
+}
+
+# Upper bound on the elements of one padded (area x group x det x GT) IoU block
+MATCH_BLOCK_SIZE = 1 << 22
+
+# (image ids, category ids, (N, 4) float64 COCO xywh boxes, scores)
+DetectionArrays = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def _empty_detections() -> DetectionArrays:
+    return (np.empty(0, np.int64), np.empty(0, np.int64), np.empty((0, 4), np.float64),
+            np.empty(0, np.float64))
+
+
+def detections_from_results(results: Iterable[Dict]) -> DetectionArrays:
+    """
+    Convert COCO detection results (as written for ``COCO.loadRes``) to arrays.
+
+    Args:
+        results: Dictionaries with 'image_id', 'category_id', 'bbox' and 'score'
+
+    Returns:
+        Tuple (image_ids, category_ids, boxes, scores)
+    """
+    results = list(results)
+    if not results:
+        return _empty_detections()
+    return (np.array([det["image_id"] for det in results], dtype=np.int64),
+            np.array([det["category_id"] for det in results], dtype=np.int64),
+            np.array([det["bbox"] for det in results], dtype=np.float64).reshape(-1, 4),
+            np.array([det["score"] for det in results], dtype=np.float64))
+
+
+def detections_from_records(records: Iterable[PredictionRecord], gt_index: ImageIndex) -> DetectionArrays:
+    """
+    Collect prediction records (e.g. from ``cached_prediction_records``) into arrays.
+
+    Args:
+        records: Prediction records whose class ids are dataset category ids;
+                 ones for images unknown to gt_index are skipped
+        gt_index: Ground truth images, used to resolve file names to image ids
+
+    Returns:
+        Tuple (image_ids, category_ids, boxes, scores)
+    """
+    image_ids, category_ids, boxes, scores = [], [], [], []
+    for file_name, record_boxes, classes, record_scores in records:
+        image_id = gt_index.image_id(file_name)
+        if image_id is None:
+            continue
+        image_ids.append(np.full(len(classes), image_id, dtype=np.int64))
+        category_ids.append(np.asarray(classes, dtype=np.int64))
+        boxes.append(np.asarray(record_boxes, dtype=np.float64).reshape(-1, 4))
+        scores.append(np.asarray(record_scores, dtype=np.float64))
+    if not image_ids:
+        return _empty_detections()
+    return np.concatenate(image_ids), np.concatenate(category_ids), np.concatenate(boxes), np.concatenate(scores)
+
+
+def detections_to_results(image_ids, category_ids, boxes, scores) -> List[Dict]:
+    """
+    Convert detection arrays to COCO results, e.g. to save them as JSON.
+
+    Returns:
+        List of dictionaries with 'image_id', 'category_id', 'bbox' and 'score'
+    """
+    return [{"image_id": image_id, "category_id": category_id, "bbox": bbox, "score": score}
+            for image_id, category_id, bbox, score in zip(np.asarray(image_ids).tolist(),
+                                                          np.asarray(category_ids).tolist(),
+                                                          np.asarray(boxes, dtype=np.float64).tolist(),
+                                                          np.asarray(scores, dtype=np.float64).tolist())]
+
+
+def _lookup(sorted_ids: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Position of each value in sorted_ids, or -1 when absent."""
+    if not len(sorted_ids):
+        return np.full(len(values), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(sorted_ids, values), len(sorted_ids) - 1)
+    return np.where(sorted_ids[positions] == values, positions, -1)
+
+
+def _group_runs(sorted_keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Unique keys of a sorted array with the start and length of their runs."""
+    return np.unique(sorted_keys, return_index=True, return_counts=True)
+
+
+def _pad_width(counts: np.ndarray) -> np.ndarray:
+    """Next power of two of each count (0 stays 0), used to bucket groups by size."""
+    widths = np.left_shift(1, np.ceil(np.log2(np.maximum(counts, 1))).astype(np.int64))
+    return np.where(counts > 0, widths, 0)
+
+
+def _best_match(ious: np.ndarray, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Highest-IoU candidate along the last axis, the last one on ties.
+
+    This is the GT that COCOeval's "iou >= best so far" scan ends on.
+    """
+    values = np.where(candidates, ious, -np.inf)
+    # argmax returns the first maximum, so search the reversed GT axis
+    last = values.shape[-1] - 1 - np.argmax(values[..., ::-1], axis=-1)
+    return last, np.take_along_axis(values, last[..., None], axis=-1)[..., 0] > -np.inf
+
+
+class CocoEvalResult:
+    """
+    Accumulated COCO evaluation, laid out like ``COCOeval.eval``.
+
+    Attributes:
+        precision: (T, R, K, A, M) interpolated precision at each recall
+                   threshold; -1 where a category has no GT in the area range
+        recall: (T, K, A, M) final recall; -1 like precision
+        scores: (T, R, K, A, M) detection score at each recall threshold
+        iou_thresholds: (T,) IoU thresholds
+        recall_thresholds: (R,) recall thresholds
+        category_ids: (K,) evaluated category ids, sorted
+        category_names: Category id -> name
+        area_names: (A,) area range names
+        max_dets: (M,) max detections per image
+    """
+
+    def __init__(self, precision: np.ndarray, recall: np.ndarray, scores: np.ndarray,
+                 iou_thresholds: np.ndarray, recall_thresholds: np.ndarray, category_ids: np.ndarray,
+                 category_names: Dict[int, str], area_names: Sequence[str], max_dets: Sequence[int]):
+        self.precision = precision
+        self.recall = recall
+        self.scores = scores
+        self.iou_thresholds = iou_thresholds
+        self.recall_thresholds = recall_thresholds
+        self.category_ids = category_ids
+        self.category_names = category_names
+        self.area_names = list(area_names)
+        self.max_dets = list(max_dets)
+
+    def _iou_index(self, iou_threshold: Optional[float]) -> Union[slice, List[int]]:
+        if iou_threshold is None:
+            return slice(None)
+        matches = np.flatnonzero(np.isclose(self.iou_thresholds, iou_threshold))
+        if not len(matches):
+            raise ValueError(f"IoU threshold {iou_threshold} was not evaluated")
+        return [int(matches[0])]
+
+    def _area_index(self, area: str) -> int:
+        if area not in self.area_names:
+            raise ValueError(f"Unknown area range {area!r}, expected one of {self.area_names}")
+        return self.area_names.index(area)
+
+    def _max_dets_index(self, max_dets: Optional[int]) -> int:
+        if max_dets is None:
+            return len(self.max_dets) - 1
+        if max_dets not in self.max_dets:
+            raise ValueError(f"max_dets={max_dets} was not evaluated, expected one of {self.max_dets}")
+        return self.max_dets.index(max_dets)
+
+    def _category_index(self, category_id: Optional[int]) -> Union[slice, List[int]]:
+        if category_id is None:
+            return slice(None)
+        matches = np.flatnonzero(self.category_ids == category_id)
+        if not len(matches):
+            raise ValueError(f"Category {category_id} was not evaluated")
+        return [int(matches[0])]
+
+    @staticmethod
+    def _mean(values: np.ndarray) -> float:
+        # Entries of -1 (no GT) are left out; -1 when nothing is left
+        values = values[values > -1]
+        return float(np.mean(values)) if len(values) else -1.0
+
+    def average_precision(self, iou_threshold: Optional[float] = None, area: str = "all",
+                          max_dets: Optional[int] = None, category_id: Optional[int] = None) -> float:
+        """
+        Mean interpolated precision, averaged like COCOeval.summarize.
+
+        Args:
+            iou_threshold: One IoU threshold, or None for all (AP@[.5:.95])
+            area: Area range name
+            max_dets: Max detections per image (default: the largest)
+            category_id: One category, or None for the mean over categories
+
+        Returns:
+            AP in [0, 1], or -1 when no category has GT
+        """
+        s = self.precision[self._iou_index(iou_threshold)]
+        s = s[:, :, self._category_index(category_id), self._area_index(area), self._max_dets_index(max_dets)]
+        return self._mean(s)
+
+    def average_recall(self, iou_threshold: Optional[float] = None, area: str = "all",
+                       max_dets: Optional[int] = None, category_id: Optional[int] = None) -> float:
+        """Mean final recall, with the same arguments as ``average_precision``."""
+        s = self.recall[self._iou_index(iou_threshold)]
+        s = s[:, self._category_index(category_id), self._area_index(area), self._max_dets_index(max_dets)]
+        return self._mean(s)
+
+    def per_class_ap(self, iou_threshold: Optional[float] = None, area: str = "all",
+                     max_dets: Optional[int] = None) -> Dict[int, float]:
+        """AP of each category id (-1 for categories without GT)."""
+        return {category_id: self.average_precision(iou_threshold, area, max_dets, category_id)
+                for category_id in self.category_ids.tolist()}
+
+    def per_size_ap(self, iou_threshold: Optional[float] = None,
+                    max_dets: Optional[int] = None) -> Dict[str, float]:
+        """AP of each area range, e.g. {'all': ..., 'small': ..., ...}."""
+        return {area: self.average_precision(iou_threshold, area, max_dets) for area in self.area_names}
+
+    def pr_curve(self, category_id: Optional[int] = None, iou_threshold: float = 0.5, area: str = "all",
+                 max_dets: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Interpolated precision/recall curve.
+
+        Args:
+            category_id: One category, or None for the mean over categories
+                         with GT
+            iou_threshold: IoU threshold of the curve
+            area: Area range name
+            max_dets: Max detections per image (default: the largest)
+
+        Returns:
+            Tuple (recall_thresholds, precision), both (R,); precision is -1
+            when no selected category has GT
+        """
+        s = self.precision[self._iou_index(iou_threshold)][0]
+        s = s[:, self._category_index(category_id), self._area_index(area), self._max_dets_index(max_dets)]
+        valid = s[0] > -1
+        precision = s[:, valid].mean(axis=1) if valid.any() else -np.ones(len(s))
+        return self.recall_thresholds, precision
+
+    def _summary(self) -> List[Tuple[str, float]]:
+        """The 12 COCO bbox metrics with their COCOeval.summarize lines."""
+        line = " {:<18} {} @[ IoU={:<9} | area={:>6s} | maxDets={:>3d} ] = {:0.3f}"
+        max_dets = self.max_dets
+        specs = [
+            (True, None, "all", max_dets[-1]),
+            (True, .5, "all", max_dets[-1]),
+            (True, .75, "all", max_dets[-1]),
+            (True, None, "small", max_dets[-1]),
+            (True, None, "medium", max_dets[-1]),
+            (True, None, "large", max_dets[-1]),
+            (False, None, "all", max_dets[0]),
+            (False, None, "all", max_dets[min(1, len(max_dets) - 1)]),
+            (False, None, "all", max_dets[-1]),
+            (False, None, "small", max_dets[-1]),
+            (False, None, "medium", max_dets[-1]),
+            (False, None, "large", max_dets[-1]),
+        ]
+        summary = []
+        for ap, iou_threshold, area, dets in specs:
+            if ap:
+                value = self.average_precision(iou_threshold, area, dets)
+            else:
+                value = self.average_recall(iou_threshold, area, dets)
+            iou_str = ("{:0.2f}:{:0.2f}".format(self.iou_thresholds[0], self.iou_thresholds[-1])
+                       if iou_threshold is None else "{:0.2f}".format(iou_threshold))
+            summary.append((line.format("Average Precision" if ap else "Average Recall",
+                                        "(AP)" if ap else "(AR)", iou_str, area, dets, value), value))
+        return summary
+
+    @property
+    def stats(self) -> np.ndarray:
+        """The 12 COCO bbox metrics, in ``COCOeval.stats`` order."""
+        return np.array([value for _, value in self._summary()])
+
+    def summarize(self) -> np.ndarray:
+        """
+        Print the COCO summary table.
+
+        Like ``COCOeval.summarize``, this assumes the default area ranges.
+
+        Returns:
+            The 12 metrics of ``stats``
+        """
+        summary = self._summary()
+        for line, _ in summary:
+            print(line)
+        return np.array([value for _, value in summary])
+
+
+class CocoEvaluator:
+    """
+    COCO bbox evaluator for one ground truth dataset.
+
+    The GT side (ids, boxes, areas, crowd flags) is prepared once, so the
+    same evaluator can score several sets of detections.
+    """
+
+    def __init__(self, images: Iterable[Dict], annotations: Iterable[Dict], categories: Iterable[Dict],
+                 iou_thresholds: Sequence[float] = IOU_THRESHOLDS,
+                 recall_thresholds: Sequence[float] = RECALL_THRESHOLDS,
+                 max_dets: Sequence[int] = MAX_DETS,
+                 area_ranges: Dict[str, Tuple[float, float]] = AREA_RANGES):
+        """
+        Prepare the ground truth.
+
+        Like COCOeval, every image and category of the dataset is evaluated;
+        annotations of other images or categories are ignored.
+
+        Args:
+            images: COCO image entries
+            annotations: COCO annotations; 'area' defaults to the box area
+                         and 'iscrowd' to 0
+            categories: COCO categories
+            iou_thresholds: IoU thresholds
+            recall_thresholds: Recall thresholds of the interpolated curves
+            max_dets: Max detections per image, ascending
+            area_ranges: Area range name -> (min_area, max_area), inclusive
+        """
+        categories = list(categories)
+        self.image_ids = np.unique(np.array([img["id"] for img in images], dtype=np.int64))
+        self.category_ids = np.unique(np.array([cat["id"] for cat in categories], dtype=np.int64))
+        self.category_names = {cat["id"]: cat.get("name", str(cat["id"])) for cat in categories}
+        self.iou_thresholds = np.asarray(iou_thresholds, dtype=np.float64)
+        self.recall_thresholds = np.asarray(recall_thresholds, dtype=np.float64)
+        self.max_dets = sorted(int(m) for m in max_dets)
+        self.area_names = list(area_ranges)
+        self.area_bounds = np.array([area_ranges[name] for name in self.area_names], dtype=np.float64)
+
+        annotations = list(annotations)
+        gt_image = _lookup(self.image_ids, np.array([ann["image_id"] for ann in annotations], dtype=np.int64))
+        gt_category = _lookup(self.category_ids,
+                              np.array([ann["category_id"] for ann in annotations], dtype=np.int64))
+        keep = (gt_image >= 0) & (gt_category >= 0)
+        annotations = [ann for ann, kept in zip(annotations, keep.tolist()) if kept]
+
+        self.gt_image = gt_image[keep]
+        self.gt_category = gt_category[keep]
+        self.gt_boxes = np.array([ann["bbox"] for ann in annotations], dtype=np.float64).reshape(-1, 4)
+        self.gt_crowd = np.array([bool(ann.get("iscrowd", 0)) for ann in annotations], dtype=bool)
+        self.gt_area = np.array([ann["area"] if "area" in ann else ann["bbox"][2] * ann["bbox"][3]
+                                 for ann in annotations], dtype=np.float64)
+
+        # Crowd GT and GT outside an area range are ignored: matching them is
+        # neither a true nor a false positive. (A, num_gt)
+        self.gt_ignore = (self.gt_crowd[None, :]
+                          | (self.gt_area[None, :] < self.area_bounds[:, :1])
+                          | (self.gt_area[None, :] > self.area_bounds[:, 1:]))
+
+    @classmethod
+    def from_coco(cls, data: Dict, **kwargs) -> "CocoEvaluator":
+        """Build the evaluator of a loaded COCO dictionary."""
+        return cls(data.get("images", []), data.get("annotations", []), data.get("categories", []), **kwargs)
+
+    @classmethod
+    def from_json(cls, path: str, **kwargs) -> "CocoEvaluator":
+        """Build the evaluator of a COCO JSON file."""
+        with open(path) as f:
+            return cls.from_coco(json.load(f), **kwargs)
+
+    def evaluate(self, image_ids, category_ids, boxes, scores) -> CocoEvalResult:
+        """
+        Match detections to the ground truth and accumulate precision/recall.
+
+        Args:
+            image_ids: (N,) image id of each detection
+            category_ids: (N,) category id of each detection
+            boxes: (N, 4) COCO xywh boxes
+            scores: (N,) confidences
+
+        Returns:
+            CocoEvalResult; detections of unknown images or categories are
+            ignored, and only the max_dets[-1] best of each image and
+            category are kept
+        """
+        image_ids = np.asarray(image_ids, dtype=np.int64).reshape(-1)
+        category_ids = np.asarray(category_ids, dtype=np.int64).reshape(-1)
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+
+        det_image = _lookup(self.image_ids, image_ids)
+        det_category = _lookup(self.category_ids, category_ids)
+        keep = np.flatnonzero((det_image >= 0) & (det_category >= 0))
+
+        # Group detections by (image, category), highest score first; ties
+        # keep their input order like COCOeval's mergesort
+        num_categories = len(self.category_ids)
+        det_group = det_image[keep] * num_categories + det_category[keep]
+        order = keep[np.lexsort((-scores[keep], det_group))]
+        det_group = det_image[order] * num_categories + det_category[order]
+        det_keys, det_starts, det_counts = _group_runs(det_group)
+        det_rank = np.arange(len(order)) - np.repeat(det_starts, det_counts)
+        top = det_rank < self.max_dets[-1]
+        order, det_group, det_rank = order[top], det_group[top], det_rank[top]
+        det_keys, det_starts, det_counts = _group_runs(det_group)
+
+        det = {
+            "image": det_image[order],
+            "category": det_category[order],
+            "boxes": boxes[order],
+            "scores": scores[order],
+            "rank": det_rank,
+        }
+        matched, ignored = self._match(det, det_keys, det_starts, det_counts)
+        return self._accumulate(det, matched, ignored)
+
+    def _match(self, det: Dict[str, np.ndarray], det_keys: np.ndarray, det_starts: np.ndarray,
+               det_counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Match every (image, category) group at every area range and IoU threshold.
+
+        Returns:
+            Tuple (matched, ignored) of (A, T, num_dets) flags
+        """
+        num_areas, num_thresholds, num_dets = len(self.area_names), len(self.iou_thresholds), len(det["rank"])
+        det_area = det["boxes"][:, 2] * det["boxes"][:, 3]
+        det_outside = (det_area[None, :] < self.area_bounds[:, :1]) | (det_area[None, :] > self.area_bounds[:, 1:])
+
+        # Unmatched detections are ignored only when outside the area range
+        matched = np.zeros((num_areas, num_thresholds, num_dets), dtype=bool)
+        ignored = np.repeat(det_outside[:, None, :], num_thresholds, axis=1)
+
+        # Only groups with both detections and GT can match anything
+        gt_group = self.gt_image * len(self.category_ids) + self.gt_category
+        gt_order = np.argsort(gt_group, kind="stable")
+        gt_keys, gt_starts, gt_counts = _group_runs(gt_group[gt_order])
+        keys, det_pos, gt_pos = np.intersect1d(det_keys, gt_keys, assume_unique=True, return_indices=True)
+        if not len(keys):
+            return matched, ignored
+        det_starts, det_counts = det_starts[det_pos], det_counts[det_pos]
+        gt_starts, gt_counts = gt_starts[gt_pos], gt_counts[gt_pos]
+
+        # COCOeval caps IoU thresholds just below 1
+        thresholds = np.minimum(self.iou_thresholds, 1 - 1e-10)
+
+        buckets, bucket_of = np.unique(np.stack([_pad_width(det_counts), _pad_width(gt_counts)], axis=1),
+                                       axis=0, return_inverse=True)
+        bucket_of = bucket_of.reshape(-1)
+        for bucket, (det_width, gt_width) in enumerate(buckets.tolist()):
+            groups = np.flatnonzero(bucket_of == bucket)
+            chunk_size = max(1, MATCH_BLOCK_SIZE // (num_areas * det_width * gt_width * num_thresholds))
+            for start in range(0, len(groups), chunk_size):
+                chunk = groups[start:start + chunk_size]
+                self._match_chunk(det, det_outside, det_starts[chunk], det_counts[chunk], gt_order,
+                                  gt_starts[chunk], gt_counts[chunk], thresholds, matched, ignored)
+        return matched, ignored
+
+    def _match_chunk(self, det: Dict[str, np.ndarray], det_outside: np.ndarray, det_starts: np.ndarray,
+                     det_counts: np.ndarray, gt_order: np.ndarray, gt_starts: np.ndarray, gt_counts: np.ndarray,
+                     thresholds: np.ndarray, matched: np.ndarray, ignored: np.ndarray):
+        """Match a chunk of groups, writing into matched and ignored."""
+        num_areas, num_thresholds = len(self.area_names), len(thresholds)
+        num_groups = len(det_starts)
+        width_d, width_g = int(det_counts.max()), int(gt_counts.max())
+
+        det_valid = np.arange(width_d)[None, :] < det_counts[:, None]
+        det_index = np.where(det_valid, det_starts[:, None] + np.arange(width_d)[None, :], -1)
+        gt_valid = np.arange(width_g)[None, :] < gt_counts[:, None]
+        gt_rows = np.minimum(gt_starts[:, None] + np.arange(width_g)[None, :], len(gt_order) - 1)
+        gt_index = np.where(gt_valid, gt_order[gt_rows], -1)
+        ious = padded_iou(det["boxes"], det_index, self.gt_boxes, gt_index, XYWH, self.gt_crowd)
+
+        # Per area range, order each group's GT with ignored ones (then
+        # padding) last, keeping file order otherwise, as COCOeval does
+        gt_ignore = self.gt_ignore[:, np.maximum(gt_index, 0)]
+        perm = np.argsort(np.where(gt_valid[None], gt_ignore, 2), axis=-1, kind="stable")
+        gt_ignore = np.take_along_axis(gt_ignore, perm, axis=-1).reshape(-1, width_g)
+        gt_valid = np.take_along_axis(np.broadcast_to(gt_valid, perm.shape), perm, axis=-1).reshape(-1, width_g)
+        gt_index = np.take_along_axis(np.broadcast_to(gt_index, perm.shape), perm, axis=-1).reshape(-1, width_g)
+        gt_crowd = self.gt_crowd[np.maximum(gt_index, 0)] & gt_valid
+        ious = np.take_along_axis(ious[None], perm[:, :, None, :], axis=-1).reshape(-1, width_d, width_g)
+        det_valid = np.tile(det_valid, (num_areas, 1))
+
+        # Rows are (area, group) pairs; every row is matched at all thresholds
+        num_rows = num_areas * num_groups
+        gt_taken = np.zeros((num_rows, num_thresholds, width_g), dtype=bool)
+        det_matched = np.zeros((num_rows, num_thresholds, width_d), dtype=bool)
+        det_ignored = np.zeros((num_rows, num_thresholds, width_d), dtype=bool)
+        rows = np.arange(num_rows)[:, None]
+        for d in range(width_d):
+            iou = ious[:, d, None, :]
+            candidates = ((iou >= thresholds[None, :, None]) & gt_valid[:, None, :]
+                          & (~gt_taken | gt_crowd[:, None, :]) & det_valid[:, d, None, None])
+            # A regular GT always beats an ignored one, whatever their IoU
+            best, found = _best_match(iou, candidates & ~gt_ignore[:, None, :])
+            candidates &= gt_ignore[:, None, :]
+            if candidates.any():
+                best_ignored, found_ignored = _best_match(iou, candidates)
+                best = np.where(found, best, best_ignored)
+                found |= found_ignored
+
+            gt_taken[rows, np.arange(num_thresholds)[None, :], best] |= found
+            det_matched[:, :, d] = found
+            det_ignored[:, :, d] = found & np.take_along_axis(gt_ignore, best, axis=1)
+
+        # Scatter back to the flat detection order, (A, T, G, D) -> (A, T, n)
+        flat = det_index[det_valid[:num_groups]]
+        shape = (num_areas, num_groups, num_thresholds, width_d)
+        det_matched = det_matched.reshape(shape).transpose(0, 2, 1, 3)[:, :, det_valid[:num_groups]]
+        det_ignored = det_ignored.reshape(shape).transpose(0, 2, 1, 3)[:, :, det_valid[:num_groups]]
+        matched[:, :, flat] = det_matched
+        ignored[:, :, flat] = np.where(det_matched, det_ignored, det_outside[:, None, flat])
+
+    def _accumulate(self, det: Dict[str, np.ndarray], matched: np.ndarray, ignored: np.ndarray) -> CocoEvalResult:
+        """Build the per-category precision/recall curves, like COCOeval.accumulate."""
+        num_thresholds, num_recalls = len(self.iou_thresholds), len(self.recall_thresholds)
+        num_categories, num_areas, num_max_dets = len(self.category_ids), len(self.area_names), len(self.max_dets)
+        precision = -np.ones((num_thresholds, num_recalls, num_categories, num_areas, num_max_dets))
+        recall = -np.ones((num_thresholds, num_categories, num_areas, num_max_dets))
+        scores = -np.ones((num_thresholds, num_recalls, num_categories, num_areas, num_max_dets))
+
+        # Regular GT per (area, category)
+        num_positives = np.stack([np.bincount(self.gt_category[~ignore], minlength=num_categories)
+                                  for ignore in self.gt_ignore])
+
+        # COCOeval concatenates each image's best detections in image id
+        # order, then stably sorts them by score
+        order = np.lexsort((det["rank"], det["image"], -det["scores"], det["category"]))
+        true_positives = matched & ~ignored
+        false_positives = ~matched & ~ignored
+
+        for m, max_dets in enumerate(self.max_dets):
+            selected = order[det["rank"][order] < max_dets]
+            bounds = np.searchsorted(det["category"][selected], np.arange(num_categories + 1))
+            for k in range(num_categories):
+                positives = num_positives[:, k]
+                if not positives.any():
+                    continue
+                dets = selected[bounds[k]:bounds[k + 1]]
+                tp = np.cumsum(true_positives[:, :, dets], axis=-1).astype(dtype=float)
+                fp = np.cumsum(false_positives[:, :, dets], axis=-1).astype(dtype=float)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    rc = tp / positives[:, None, None]
+                pr = tp / (fp + tp + np.spacing(1))
+                # Precision envelope: the best precision at any higher recall
+                pr = np.maximum.accumulate(pr[..., ::-1], axis=-1)[..., ::-1]
+                det_scores = det["scores"][dets]
+
+                for a in np.flatnonzero(positives):
+                    recall[:, k, a, m] = rc[a, :, -1] if len(dets) else 0
+                    for t in range(num_thresholds):
+                        inds = np.searchsorted(rc[a, t], self.recall_thresholds, side="left")
+                        reached = inds < len(dets)
+                        q = np.zeros(num_recalls)
+                        ss = np.zeros(num_recalls)
+                        q[reached] = pr[a, t, inds[reached]]
+                        ss[reached] = det_scores[inds[reached]]
+                        precision[t, :, k, a, m] = q
+                        scores[t, :, k, a, m] = ss
+
+        return CocoEvalResult(precision, recall, scores, self.iou_thresholds, self.recall_thresholds,
+                              self.category_ids, self.category_names, self.area_names, self.max_dets)
@@ -0,0 +1,378 @@
+"""
+Incremental reading and writing of large COCO JSON files.
+
+``json.load`` materializes the whole document, which peaks memory at several
+times the file size for multi-GB exports. The helpers here walk the file in
+fixed-size chunks and yield the entries of top-level arrays (``images``,
+``annotations``, ...) one at a time. ``iter_coco_entries`` reads several
+arrays in a single pass over the file; ``iter_coco_array`` reads one and stops
+at its end. ``ijson`` is used when installed, otherwise a small built-in
+scanner over ``json.JSONDecoder.raw_decode`` does the work. The built-in
+scanner still decodes the values it skips (entry by entry, so they are never
+held whole), so a pass costs a full parse up to the last array it needs.
+
+On the output side, ``CocoJsonWriter`` writes a document one array entry at a
+time, byte-identical to ``json.dump`` with the same indent, and
+``JsonArraySpool`` parks formatted entries in a temporary file when an array
+has to be produced before the keys that precede it in the output.
+"""
+
+import itertools
+import json
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import ijson
+except ImportError:  # optional dependency
+    ijson = None
+
+
+CHUNK_SIZE = 1 << 20
+
+_NUMBER_CHARS = '0123456789.eE+-'
+_NON_WHITESPACE = re.compile(r'[^ \t\n\r]')
+
+
+class _ChunkReader:
+    """Sliding text buffer over a file, refilled on demand."""
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk, dropping consumed text. Returns False at EOF."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            match = _NON_WHITESPACE.search(self.buf, self.pos)
+            if match is not None:
+                self.pos = match.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def expect(self, char: str):
+        """Consume the next non-whitespace character, which must be ``char``."""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {found!r}")
+        self.pos += 1
+
+    def decode(self, decoder: json.JSONDecoder):
+        """Decode one complete JSON value starting at the next non-whitespace character."""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+                # A number cut by the buffer edge decodes as a shorter number, so
+                # only accept it once a non-number character follows it
+                if self.eof or (end < len(self.buf) and self.buf[end] not in _NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+    def iter_array(self, decoder: json.JSONDecoder) -> Iterator:
+        """Decode the JSON array starting at the next non-whitespace character, one entry at a time."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode(decoder)
+            if self.peek() == ']':
+                self.pos += 1
+                return
+            self.expect(',')
+
+
+def _iter_arrays_builtin(f, keys: Sequence[str], chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Dict]]:
+    """Yield (key, entry) for the top-level arrays in keys using the built-in scanner."""
+    reader = _ChunkReader(f, chunk_size)
+    decoder = json.JSONDecoder()
+    remaining = set(keys)
+
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+
+    while remaining:
+        name = reader.decode(decoder)
+        reader.expect(':')
+
+        if reader.peek() == '[':
+            if name in remaining:
+                remaining.discard(name)
+                for entry in reader.iter_array(decoder):
+                    yield name, entry
+            else:
+                # Skip other arrays entry by entry so they are never held whole
+                for _ in reader.iter_array(decoder):
+                    pass
+        else:
+            reader.decode(decoder)
+
+        if reader.peek() == '}':
+            return
+        reader.expect(',')
+
+
+def _iter_arrays_ijson(f, keys: Sequence[str]) -> Iterator[Tuple[str, Dict]]:
+    """Yield (key, entry) for the top-level arrays in keys from ijson parse events."""
+    item_prefixes = {f'{key}.item': key for key in keys}
+    # use_float keeps numbers as float like json.load instead of Decimal
+    events = ijson.parse(f, use_float=True)
+    for prefix, event, value in events:
+        key = item_prefixes.get(prefix)
+        if key is None:
+            continue
+        if event not in ('start_map', 'start_array'):
+            yield key, value
+            continue
+        # Build the entry from its events, up to the end event at the same prefix
+        builder = ijson.ObjectBuilder()
+        builder.event(event, value)
+        end_event = 'end_map' if event == 'start_map' else 'end_array'
+        for inner_prefix, inner_event, inner_value in events:
+            builder.event(inner_event, inner_value)
+            if inner_prefix == prefix and inner_event == end_event:
+                break
+        yield key, builder.value
+
+
+def iter_coco_entries(path: Union[str, Path], keys: Sequence[str],
+                      chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Dict]]:
+    """
+    Iterate over the entries of several top-level arrays in one pass.
+
+    Entries come in file order, tagged with their array's key, so a consumer
+    can dispatch on it (e.g. images to one builder, annotations to another).
+    Only one entry is held in memory at a time.
+
+    Args:
+        path: Path to the COCO JSON file
+        keys: Top-level keys of the arrays, e.g. ('images', 'annotations')
+        chunk_size: Characters read per chunk by the built-in scanner
+
+    Yields:
+        Tuples (key, entry); keys missing from the file yield nothing
+    """
+    if ijson is not None:
+        with open(path, 'rb') as f:
+            yield from _iter_arrays_ijson(f, keys)
+        return
+
+    with open(path, 'r') as f:
+        # Stops as soon as the last requested array has been read
+        yield from _iter_arrays_builtin(f, keys, chunk_size)
+
+
+def iter_coco_array(path: Union[str, Path], key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Iterate over the entries of a top-level array in a COCO JSON file.
+
+    Only one entry is held in memory at a time.
+
+    Args:
+        path: Path to the COCO JSON file
+        key: Top-level key of the array, e.g. 'images' or 'annotations'
+        chunk_size: Characters read per chunk by the built-in scanner
+
+    Yields:
+        Array entries in file order (nothing if the key is missing)
+    """
+    if ijson is not None:
+        with open(path, 'rb') as f:
+            # use_float keeps numbers as float like json.load instead of Decimal
+            yield from ijson.items(f, f'{key}.item', use_float=True)
+        return
+
+    with open(path, 'r') as f:
+        for _, entry in _iter_arrays_builtin(f, (key,), chunk_size):
+            yield entry
+
+
+def iter_images(path: Union[str, Path]) -> Iterator[Dict]:
+    """Iterate over the ``images`` entries of a COCO JSON file."""
+    return iter_coco_array(path, 'images')
+
+
+def iter_annotations(path: Union[str, Path]) -> Iterator[Dict]:
+    """Iterate over the ``annotations`` entries of a COCO JSON file."""
+    return iter_coco_array(path, 'annotations')
+
+
+def load_categories(path: Union[str, Path]) -> List[Dict]:
+    """Load the (small) ``categories`` list of a COCO JSON file."""
+    return list(iter_coco_array(path, 'categories'))
+
+
+def iter_chunks(entries: Iterable, chunk_size: int) -> Iterator[List]:
+    """
+    Group a stream of entries into lists of at most chunk_size entries.
+
+    Args:
+        entries: Any iterable, e.g. ``iter_annotations(path)``
+        chunk_size: Maximum entries per chunk
+
+    Yields:
+        Lists of consecutive entries
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    iterator = iter(entries)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _dump(value, indent: Optional[int], level: int) -> str:
+    """Format a value as ``json.dump`` does when it is nested ``level`` deep."""
+    text = json.dumps(value, indent=indent)
+    if indent is None:
+        return text
+    # JSON strings never contain raw newlines, so every newline is layout
+    return text.replace("\n", "\n" + " " * (indent * level))
+
+
+class JsonArraySpool:
+    """
+    Array entries formatted ahead of time into a temporary file.
+
+    Lets a streaming pipeline emit an array (e.g. cleaned annotations) before
+    the arrays written ahead of it in the output are known, without keeping
+    the entries in memory. Use as a context manager, or call ``close``.
+    """
+
+    def __init__(self, indent: Optional[int] = 2, dir: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            indent: Indent of the document the spool is copied into
+            dir: Directory for the temporary file
+        """
+        self.indent = indent
+        self.count = 0
+        self._separator = ",\n" + " " * (2 * indent) if indent is not None else ", "
+        self._file = tempfile.TemporaryFile("w+", encoding="utf-8", dir=dir)
+
+    def extend(self, entries: Iterable):
+        """Append entries to the spool."""
+        for entry in entries:
+            if self.count:
+                self._file.write(self._separator)
+            self._file.write(_dump(entry, self.indent, 2))
+            self.count += 1
+
+    def copy_to(self, f):
+        """Copy the formatted entries, without brackets, to a text file object."""
+        self._file.seek(0)
+        shutil.copyfileobj(self._file, f)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> 'JsonArraySpool':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CocoJsonWriter:
+    """
+    Write a JSON object one top-level key at a time, streaming array entries.
+
+    Output matches ``json.dump(document, f, indent=indent)`` for a document
+    with the same keys in the same order.
+    """
+
+    def __init__(self, f, indent: Optional[int] = 2):
+        """
+        Args:
+            f: Text file object opened for writing
+            indent: Same meaning as json.dump's indent
+        """
+        self.f = f
+        self.indent = indent
+        self._num_keys = 0
+        if indent is None:
+            self._open, self._separator, self._close = "[", ", ", "]"
+        else:
+            self._open = "[\n" + " " * (2 * indent)
+            self._separator = ",\n" + " " * (2 * indent)
+            self._close = "\n" + " " * indent + "]"
+
+    def _write_key(self, key: str):
+        if self.indent is None:
+            self.f.write(("{" if not self._num_keys else ", ") + json.dumps(key) + ": ")
+        else:
+            prefix = "{\n" if not self._num_keys else ",\n"
+            self.f.write(prefix + " " * self.indent + json.dumps(key) + ": ")
+        self._num_keys += 1
+
+    def write_value(self, key: str, value):
+        """Write one key with a value held in memory (e.g. the categories)."""
+        self._write_key(key)
+        self.f.write(_dump(value, self.indent, 1))
+
+    def write_array(self, key: str, entries: Union[Iterable, JsonArraySpool]) -> int:
+        """
+        Write one key whose value is an array, consuming entries lazily.
+
+        Args:
+            key: Top-level key
+            entries: Iterable of JSON-serializable entries, or a spool whose
+                     indent matches this writer's
+
+        Returns:
+            Number of entries written
+        """
+        self._write_key(key)
+        if isinstance(entries, JsonArraySpool):
+            if entries.indent != self.indent:
+                raise ValueError("Spool and writer were created with different indents")
+            if not entries.count:
+                self.f.write("[]")
+                return 0
+            self.f.write(self._open)
+            entries.copy_to(self.f)
+            self.f.write(self._close)
+            return entries.count
+
+        count = 0
+        for entry in entries:
+            self.f.write(self._separator if count else self._open)
+            self.f.write(_dump(entry, self.indent, 2))
+            count += 1
+        self.f.write(self._close if count else "[]")
+        return count
+
+    def close(self):
+        """Finish the object. Does not close the underlying file."""
+        if not self._num_keys:
+            self.f.write("{}")
+        else:
+            self.f.write("}" if self.indent is None else "\n}")
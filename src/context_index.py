@@ -0,0 +1,155 @@
+"""
+Inverted context index for BTT datasets.
+
+Maps every (context type, value) pair found in the images' ``contexts`` metadata
+(scene, lighting conditions, blur effect, occlusion, ...) to the sorted rows of
+the images carrying it, so context filters become set operations over sorted
+integer arrays instead of a scan over every image.
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from annotation_store import csr_index
+
+
+class ContextIndex:
+    """
+    Posting lists from (context type, value) to image rows.
+
+    Image rows are positions in the dataset's ``images`` list. The rows for
+    ``keys[code]`` are ``image_rows[offsets[code]:offsets[code + 1]]``, sorted
+    ascending and without duplicates. ``types`` lists every context type seen
+    in the images, including types whose value lists were always empty.
+    """
+
+    def __init__(self, keys: List[Tuple[str, str]], offsets: np.ndarray,
+                 image_rows: np.ndarray, num_images: int,
+                 types: Optional[List[str]] = None):
+        """
+        Initialize the index from already built posting lists.
+
+        Args:
+            keys: (context type, value) pair for every code
+            offsets: (K + 1,) posting list offsets
+            image_rows: Concatenated posting lists
+            num_images: Number of images the index was built over
+            types: Context types seen, in first-seen order; defaults to the
+                   types of keys
+        """
+        self.keys = keys
+        self.offsets = offsets
+        self.image_rows = image_rows
+        self.num_images = num_images
+        if types is None:
+            types = list(dict.fromkeys(context_type for context_type, _ in keys))
+        self.types = types
+        self.codes = {key: code for code, key in enumerate(keys)}
+
+    @classmethod
+    def from_images(cls, images: Iterable[Dict]) -> "ContextIndex":
+        """
+        Build the index from COCO image entries.
+
+        Args:
+            images: Image entries with an optional ``contexts`` dictionary
+
+        Returns:
+            ContextIndex over the images
+        """
+        builder = ContextIndexBuilder()
+        for img in images:
+            builder.add(img)
+        return builder.build()
+
+    def postings(self, context_type: str, value: str) -> np.ndarray:
+        """
+        Get the image rows carrying a context value.
+
+        Args:
+            context_type: Context type, e.g. 'scene'
+            value: Context value, e.g. 'indoor living room'
+
+        Returns:
+            Sorted array of image rows (empty if the value never occurs)
+        """
+        code = self.codes.get((context_type, value))
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self.image_rows[self.offsets[code]:self.offsets[code + 1]]
+
+    def values(self, context_type: str) -> List[str]:
+        """Get all values seen for a context type."""
+        return [value for key_type, value in self.keys if key_type == context_type]
+
+    def counts(self) -> Dict[Tuple[str, str], int]:
+        """Number of images carrying each (context type, value) pair."""
+        return dict(zip(self.keys, np.diff(self.offsets).tolist()))
+
+    def query(self, context_filters: Dict[str, List[str]]) -> np.ndarray:
+        """
+        Find images matching context filters.
+
+        Values within a context type are OR-ed, context types are AND-ed.
+
+        Args:
+            context_filters: Dictionary specifying context filters
+                           e.g., {'scene': ['indoor living room'], 'lighting conditions': ['bright lighting']}
+
+        Returns:
+            Sorted array of matching image rows
+        """
+        result = None
+        for context_type, required_values in context_filters.items():
+            lists = [self.postings(context_type, value) for value in required_values]
+            if len(lists) == 1:
+                matches = lists[0]
+            else:
+                matches = np.unique(np.concatenate(lists)) if lists else np.empty(0, dtype=np.int64)
+
+            if result is None:
+                result = matches
+            else:
+                result = np.intersect1d(result, matches, assume_unique=True)
+
+            if len(result) == 0:
+                break
+
+        if result is None:
+            return np.arange(self.num_images, dtype=np.int64)
+        return result
+
+
+class ContextIndexBuilder:
+    """Incrementally build a ContextIndex, one image entry at a time."""
+
+    def __init__(self):
+        self.codes: Dict[Tuple[str, str], int] = {}
+        self.types: Dict[str, None] = {}
+        self.pair_codes = array('q')
+        self.pair_rows = array('q')
+        self.num_images = 0
+
+    def add(self, img: Dict):
+        """Add the next image entry; rows are assigned in call order."""
+        row = self.num_images
+        self.num_images += 1
+        for context_type, values in img.get('contexts', {}).items():
+            self.types.setdefault(context_type)
+            for value in set(values):
+                code = self.codes.setdefault((context_type, value), len(self.codes))
+                self.pair_codes.append(code)
+                self.pair_rows.append(row)
+
+    def build(self) -> ContextIndex:
+        """Finish the index."""
+        keys = list(self.codes)
+        pair_codes = np.frombuffer(self.pair_codes, dtype=np.int64)
+        pair_rows = np.frombuffer(self.pair_rows, dtype=np.int64)
+
+        # Pairs are added in row order, so the stable grouping keeps every
+        # posting list sorted
+        offsets, order = csr_index(pair_codes, len(keys))
+        return ContextIndex(keys, offsets, pair_rows[order], self.num_images, list(self.types))
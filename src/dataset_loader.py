@@ -7,11 +7,24 @@ that include COCO-format annotations with rich contextual information.
 
 import json
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional, Union
 import numpy as np
 from PIL import Image
 
+import annotation_cache
+import coco_stream
+import dataset_stats
+from annotation_store import AnnotationStore, AnnotationStoreBuilder
+from context_index import ContextIndex, ContextIndexBuilder
+from image_utils import DecodedImageCache, read_image_size
+from label_index import LabelIndex, LabelIndexBuilder
+
+
+# Optional list of dataset IDs read by lazy loaders instead of scanning base_path
+MANIFEST_FILE = "datasets_manifest.json"
 
 class BTTDatasetLoader:
     """
@@ -21,16 +34,64 @@ class BTTDatasetLoader:
     information including scene type, lighting conditions, blur effects, and occlusion.
     """
     
-    def __init__(self, base_path: str = "BTT_Data"):
+    def __init__(self, base_path: str = "BTT_Data", streaming: bool = False,
+                 cache: bool = False, cache_dir: Optional[str] = None,
+                 cache_hash: bool = False, lazy: bool = False,
+                 image_cache_bytes: int = 0):
         """
         Initialize the dataset loader.
         
         Args:
             base_path: Path to the directory containing the dataset folders
+            streaming: If True, indexes and statistics are built by parsing
+                       coco.json incrementally instead of loading it whole,
+                       keeping memory bounded for very large exports
+            cache: If True, dataset indexes are written to a binary cache on
+                   first build and memory-mapped from it on later loads
+            cache_dir: Directory for the caches; defaults to a ``.coco_cache``
+                       folder next to each coco.json
+            cache_hash: Key the cache on a content hash of coco.json (plus its
+                        size) instead of its mtime, so copies still hit it
+            lazy: If True, dataset folders are not scanned up front. A dataset
+                  is registered and validated when first accessed, and the
+                  full list is read from the manifest file (or one directory
+                  scan) only when ``list_datasets`` is called
+            image_cache_bytes: If positive, ``load_image`` keeps up to this
+                               many bytes of decoded images in an LRU cache
         """
         self.base_path = Path(base_path)
+        self.streaming = streaming
+        self.cache = cache
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.cache_hash = cache_hash
+        self.lazy = lazy
+        self.image_cache = DecodedImageCache(image_cache_bytes) if image_cache_bytes > 0 else None
         self.datasets = {}
-        self._load_available_datasets()
+        self._discovered = False
+        
+        if lazy:
+            if not self.base_path.exists():
+                raise FileNotFoundError(f"Dataset directory not found: {self.base_path}")
+        else:
+            self._load_available_datasets()
+    
+    def _new_entry(self, dataset_dir: Path, validated: bool = True) -> Dict:
+        """Create the bookkeeping entry of a dataset folder."""
+        return {
+            'annotations_path': dataset_dir / "coco.json",
+            'images_path': dataset_dir / "images",
+            'validated': validated,
+            'loaded': False,
+            'data': None,
+            'store': None,
+            'context_index': None,
+            'label_index': None
+        }
+    
+    @staticmethod
+    def _is_valid_dataset(entry: Dict) -> bool:
+        """Check that a dataset folder has its coco.json and images directory."""
+        return entry['annotations_path'].exists() and entry['images_path'].exists()
     
     def _load_available_datasets(self):
         """Discover and load metadata for available datasets."""
@@ -39,21 +100,92 @@ class BTTDatasetLoader:
         
         for dataset_dir in self.base_path.iterdir():
             if dataset_dir.is_dir() and not dataset_dir.name.startswith('.'):
-                coco_file = dataset_dir / "coco.json"
-                images_dir = dataset_dir / "images"
-                
-                if coco_file.exists() and images_dir.exists():
-                    self.datasets[dataset_dir.name] = {
-                        'annotations_path': coco_file,
-                        'images_path': images_dir,
-                        'loaded': False,
-                        'data': None
-                    }
+                entry = self._new_entry(dataset_dir)
+                if self._is_valid_dataset(entry):
+                    self.datasets[dataset_dir.name] = entry
+        
+        self._discovered = True
+    
+    def _discover_lazily(self):
+        """Register every dataset folder without validating it."""
+        manifest_path = self.base_path / MANIFEST_FILE
+        if manifest_path.exists():
+            with open(manifest_path, 'r') as f:
+                names = json.load(f)['datasets']
+        else:
+            # A single scandir pass; entry types come from the directory listing
+            with os.scandir(self.base_path) as it:
+                names = [entry.name for entry in it
+                         if entry.is_dir() and not entry.name.startswith('.')]
+        
+        for name in names:
+            if name not in self.datasets:
+                self.datasets[name] = self._new_entry(self.base_path / name, validated=False)
+        
+        self._discovered = True
+    
+    def register_dataset(self, dataset_id: str):
+        """
+        Register a single dataset folder without scanning the others.
+        
+        Args:
+            dataset_id: Name of the folder under base_path
+        """
+        if dataset_id.startswith('.') or Path(dataset_id).name != dataset_id:
+            raise ValueError(f"Invalid dataset ID: {dataset_id}")
+        
+        entry = self._new_entry(self.base_path / dataset_id)
+        if not self._is_valid_dataset(entry):
+            raise ValueError(f"Dataset {dataset_id} not found in {self.base_path}")
+        self.datasets[dataset_id] = entry
+    
+    def write_manifest(self) -> Path:
+        """
+        Validate every dataset and save their IDs to the manifest file.
+        
+        Lazy loaders read the manifest instead of scanning base_path.
+        
+        Returns:
+            Path to the written manifest
+        """
+        valid_ids = []
+        for dataset_id in self.list_datasets():
+            try:
+                self._get_entry(dataset_id)
+                valid_ids.append(dataset_id)
+            except ValueError:
+                continue
+        
+        manifest_path = self.base_path / MANIFEST_FILE
+        with open(manifest_path, 'w') as f:
+            json.dump({'datasets': sorted(valid_ids)}, f, indent=2)
+        return manifest_path
     
     def list_datasets(self) -> List[str]:
         """Get list of available dataset IDs."""
+        if not self._discovered:
+            self._discover_lazily()
         return list(self.datasets.keys())
     
+    def _get_entry(self, dataset_id: str) -> Dict:
+        """Get the bookkeeping entry of a dataset, validating it on first access."""
+        if dataset_id not in self.datasets and self.lazy:
+            try:
+                self.register_dataset(dataset_id)
+            except ValueError:
+                pass
+        
+        if dataset_id not in self.datasets:
+            raise ValueError(f"Dataset {dataset_id} not found. Available: {self.list_datasets()}")
+        
+        entry = self.datasets[dataset_id]
+        if not entry['validated']:
+            if not self._is_valid_dataset(entry):
+                del self.datasets[dataset_id]
+                raise ValueError(f"Dataset {dataset_id} is missing coco.json or images/")
+            entry['validated'] = True
+        return entry
+    
     def load_dataset(self, dataset_id: str) -> Dict:
         """
         Load a specific dataset.
@@ -64,15 +196,177 @@ class BTTDatasetLoader:
         Returns:
             Dictionary containing the loaded COCO annotations
         """
-        if dataset_id not in self.datasets:
-            raise ValueError(f"Dataset {dataset_id} not found. Available: {self.list_datasets()}")
+        entry = self._get_entry(dataset_id)
+        
+        if not entry['loaded']:
+            with open(entry['annotations_path'], 'r') as f:
+                entry['data'] = json.load(f)
+            if entry['context_index'] is None:
+                images = entry['data'].get('images', [])
+                entry['context_index'] = ContextIndex.from_images(images)
+                entry['label_index'] = LabelIndex.from_images(images)
+            entry['loaded'] = True
+        
+        return entry['data']
+    
+    def iter_images(self, dataset_id: str) -> Iterator[Dict]:
+        """
+        Iterate over the image entries of a dataset.
+        
+        Uses the loaded data when available and otherwise parses coco.json
+        incrementally, holding one entry in memory at a time.
+        
+        Args:
+            dataset_id: ID of the dataset
+            
+        Yields:
+            Image entries in file order
+        """
+        entry = self._get_entry(dataset_id)
+        if entry['loaded']:
+            yield from entry['data'].get('images', [])
+        else:
+            yield from coco_stream.iter_images(entry['annotations_path'])
+    
+    def iter_annotations(self, dataset_id: str) -> Iterator[Dict]:
+        """
+        Iterate over the annotation entries of a dataset.
+        
+        Uses the loaded data when available and otherwise parses coco.json
+        incrementally, holding one entry in memory at a time.
+        
+        Args:
+            dataset_id: ID of the dataset
+            
+        Yields:
+            Annotation entries in file order
+        """
+        entry = self._get_entry(dataset_id)
+        if entry['loaded']:
+            yield from entry['data'].get('annotations', [])
+        else:
+            yield from coco_stream.iter_annotations(entry['annotations_path'])
+    
+    def _cache_path(self, dataset_id: str) -> Path:
+        """Get the cache directory for the current version of a dataset's coco.json."""
+        coco_path = self._get_entry(dataset_id)['annotations_path']
+        if self.cache_dir is not None:
+            root = self.cache_dir / dataset_id
+        else:
+            root = annotation_cache.default_cache_root(coco_path)
+        return root / annotation_cache.cache_key(coco_path, self.cache_hash)
+    
+    def _build_indexes(self, dataset_id: str):
+        """Build the store and the context/label indexes for a dataset."""
+        entry = self._get_entry(dataset_id)
+        
+        if not self.cache:
+            self._parse_indexes(dataset_id)
+            return
+        
+        cache_path = self._cache_path(dataset_id)
+        cached = annotation_cache.load_indexes(cache_path)
+        if cached is not None:
+            entry['store'], entry['context_index'], entry['label_index'] = cached
+            return
+        
+        self._parse_indexes(dataset_id)
+        annotation_cache.save_indexes(cache_path, entry['store'],
+                                      entry['context_index'], entry['label_index'])
+    
+    def _parse_indexes(self, dataset_id: str):
+        """Build the store and the context/label indexes from coco.json."""
+        entry = self._get_entry(dataset_id)
+        
+        if not self.streaming or entry['loaded']:
+            data = self.load_dataset(dataset_id)
+            if entry['store'] is None:
+                entry['store'] = AnnotationStore.from_coco(data)
+            return
+        
+        # One streaming pass over coco.json feeds all three structures; the
+        # arrays are dispatched on their top-level key as they are read
+        store_builder = AnnotationStoreBuilder()
+        context_builder = ContextIndexBuilder()
+        label_builder = LabelIndexBuilder()
+        
+        for key, item in coco_stream.iter_coco_entries(entry['annotations_path'],
+                                                      ('images', 'annotations', 'categories')):
+            if key == 'images':
+                store_builder.add_image(item)
+                context_builder.add(item)
+                label_builder.add(item)
+            elif key == 'annotations':
+                store_builder.add_annotation(item)
+            else:
+                store_builder.add_category(item)
+        
+        entry['store'] = store_builder.build()
+        entry['context_index'] = context_builder.build()
+        entry['label_index'] = label_builder.build()
+    
+    def get_annotation_store(self, dataset_id: str) -> AnnotationStore:
+        """
+        Get the columnar annotation store for a dataset, building it on first use.
+        
+        Args:
+            dataset_id: ID of the dataset
+            
+        Returns:
+            AnnotationStore with image, annotation and category arrays
+        """
+        entry = self._get_entry(dataset_id)
+        if entry['store'] is None:
+            self._build_indexes(dataset_id)
+        return entry['store']
+    
+    def get_context_index(self, dataset_id: str) -> ContextIndex:
+        """
+        Get the inverted (context type, value) -> image index for a dataset.
+        
+        Args:
+            dataset_id: ID of the dataset
+            
+        Returns:
+            ContextIndex built when the dataset was loaded
+        """
+        entry = self._get_entry(dataset_id)
+        if entry['context_index'] is None:
+            self._build_indexes(dataset_id)
+        return entry['context_index']
+    
+    def get_label_index(self, dataset_id: str) -> LabelIndex:
+        """
+        Get the label x image membership index for a dataset.
         
-        if not self.datasets[dataset_id]['loaded']:
-            with open(self.datasets[dataset_id]['annotations_path'], 'r') as f:
-                self.datasets[dataset_id]['data'] = json.load(f)
-            self.datasets[dataset_id]['loaded'] = True
+        Args:
+            dataset_id: ID of the dataset
+            
+        Returns:
+            LabelIndex built when the dataset was loaded
+        """
+        entry = self._get_entry(dataset_id)
+        if entry['label_index'] is None:
+            self._build_indexes(dataset_id)
+        return entry['label_index']
+    
+    def _images_at_rows(self, dataset_id: str, rows: np.ndarray) -> List[Dict]:
+        """Get image entries by row, streaming over coco.json if the dataset is not loaded."""
+        entry = self._get_entry(dataset_id)
+        if entry['loaded']:
+            images = entry['data'].get('images', [])
+            return [images[row] for row in rows]
         
-        return self.datasets[dataset_id]['data']
+        wanted = iter(rows.tolist())
+        next_row = next(wanted, None)
+        selected = []
+        for row, img in enumerate(self.iter_images(dataset_id)):
+            if next_row is None:
+                break
+            if row == next_row:
+                selected.append(img)
+                next_row = next(wanted, None)
+        return selected
     
     def get_image_path(self, dataset_id: str, filename: str) -> Path:
         """
@@ -85,10 +379,7 @@ class BTTDatasetLoader:
         Returns:
             Full path to the image file
         """
-        if dataset_id not in self.datasets:
-            raise ValueError(f"Dataset {dataset_id} not found")
-        
-        return self.datasets[dataset_id]['images_path'] / filename
+        return self._get_entry(dataset_id)['images_path'] / filename
     
     def load_image(self, dataset_id: str, filename: str) -> Image.Image:
         """
@@ -99,59 +390,140 @@ class BTTDatasetLoader:
             filename: Image filename
             
         Returns:
-            PIL Image object
+            PIL Image object; with the decode cache enabled the image is
+            already decoded and shared, so copy it before modifying it
         """
         image_path = self.get_image_path(dataset_id, filename)
-        return Image.open(image_path)
+        if self.image_cache is None:
+            return Image.open(image_path)
+        
+        key = (dataset_id, filename)
+        image = self.image_cache.get(key)
+        if image is None:
+            image = Image.open(image_path)
+            # Decoding a single-frame file also releases its file handle
+            image.load()
+            self.image_cache.put(key, image)
+        return image
+    
+    def get_image_size(self, dataset_id: str, filename: str) -> Tuple[int, int]:
+        """
+        Get the size of an image from its PNG/JPEG header, without decoding it.
+        
+        Args:
+            dataset_id: ID of the dataset
+            filename: Image filename
+            
+        Returns:
+            Tuple (width, height)
+        """
+        return read_image_size(self.get_image_path(dataset_id, filename))
+    
+    def _decode_image(self, dataset_id: str, filename: str, mode: Optional[str]) -> np.ndarray:
+        """Decode one image to an array, converting it to mode if given."""
+        with Image.open(self.get_image_path(dataset_id, filename)) as im:
+            if mode is not None and im.mode != mode:
+                return np.asarray(im.convert(mode))
+            return np.asarray(im)
+    
+    def iter_images_decoded(self, dataset_id: str, ids: Optional[List[int]] = None,
+                            workers: int = 4, prefetch: int = 8,
+                            mode: Optional[str] = 'RGB') -> Iterator[Tuple[Dict, np.ndarray]]:
+        """
+        Iterate over decoded images, decoding ahead of the consumer in a thread pool.
+        
+        PIL releases the GIL while reading and decoding, so the threads run in
+        parallel with each other and with the caller.
+        
+        Args:
+            dataset_id: ID of the dataset
+            ids: Image ids to decode, in the order they should be yielded;
+                 None decodes every image in dataset order
+            workers: Number of decoding threads
+            prefetch: Maximum number of images decoded ahead of the consumer
+            mode: PIL mode to convert to before decoding to an array, or None
+                  to keep each image's own mode
+            
+        Yields:
+            Tuples (image_entry, ndarray) in the requested order
+        """
+        if ids is None:
+            entries = self.iter_images(dataset_id)
+        else:
+            rows = self.get_annotation_store(dataset_id).image_rows(ids)
+            if (rows < 0).any():
+                missing = np.asarray(ids)[rows < 0].tolist()
+                raise ValueError(f"Images not found in dataset {dataset_id}: {missing}")
+            unique_rows = np.unique(rows)
+            by_row = dict(zip(unique_rows.tolist(), self._images_at_rows(dataset_id, unique_rows)))
+            entries = (by_row[row] for row in rows.tolist())
+        
+        prefetch = max(prefetch, 1)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            try:
+                for img in entries:
+                    pending.append((img, executor.submit(
+                        self._decode_image, dataset_id, img['file_name'], mode)))
+                    if len(pending) >= prefetch:
+                        img, future = pending.popleft()
+                        yield img, future.result()
+                
+                while pending:
+                    img, future = pending.popleft()
+                    yield img, future.result()
+            finally:
+                # Don't decode images nobody will consume if the caller stops early
+                for _, future in pending:
+                    future.cancel()
     
     def get_dataset_stats(self, dataset_id: str) -> Dict:
         """
         Get statistics for a dataset.
         
+        All counts come from the dataset's precomputed indexes, so this is a
+        handful of array reductions rather than a pass over the images.
+        
         Args:
             dataset_id: ID of the dataset
             
         Returns:
-            Dictionary with dataset statistics
+            Dictionary with dataset statistics. Besides the unique values per
+            context type and 'label_distribution' (entries per label over all
+            ``labels`` lists, repeats included) it holds 'label_image_counts'
+            ({label: images}), 'context_histograms' ({type: {value: images}}),
+            'label_context_crosstab' ({type: {value: {label: images}}}),
+            'annotation_distribution' ({category: annotations}) and
+            'bbox_distributions' (area/aspect histograms and COCO size buckets)
         """
-        data = self.load_dataset(dataset_id)
+        store = self.get_annotation_store(dataset_id)
+        context_index = self.get_context_index(dataset_id)
+        label_index = self.get_label_index(dataset_id)
         
         # Count categories
-        categories = {cat['name']: cat['id'] for cat in data.get('categories', [])}
+        categories = dict(zip(store.category_names, store.category_ids.tolist()))
         
         # Analyze contexts
-        context_types = set()
-        scene_types = set()
-        lighting_conditions = set()
-        blur_effects = set()
-        occlusion_types = set()
-        
-        label_counts = {}
-        
-        for img in data.get('images', []):
-            # Count labels
-            for label in img.get('labels', []):
-                label_counts[label] = label_counts.get(label, 0) + 1
-            
-            # Collect context information
-            contexts = img.get('contexts', {})
-            context_types.update(contexts.keys())
-            
-            scene_types.update(contexts.get('scene', []))
-            lighting_conditions.update(contexts.get('lighting conditions', []))
-            blur_effects.update(contexts.get('blur effect', []))
-            occlusion_types.update(contexts.get('occlusion', []))
+        histograms = dataset_stats.context_histograms(context_index)
+        
+        def values(context_type):
+            return list(histograms.get(context_type, {}))
         
         return {
-            'num_images': len(data.get('images', [])),
+            'num_images': store.num_images,
             'num_categories': len(categories),
             'categories': categories,
-            'context_types': list(context_types),
-            'scene_types': list(scene_types),
-            'lighting_conditions': list(lighting_conditions),
-            'blur_effects': list(blur_effects),
-            'occlusion_types': list(occlusion_types),
-            'label_distribution': label_counts
+            'context_types': list(context_index.types),
+            'scene_types': values('scene'),
+            'lighting_conditions': values('lighting conditions'),
+            'blur_effects': values('blur effect'),
+            'occlusion_types': values('occlusion'),
+            'label_distribution': label_index.occurrence_counts(),
+            'label_image_counts': label_index.counts(),
+            'context_histograms': histograms,
+            'label_context_crosstab': dataset_stats.label_context_crosstab(label_index, context_index),
+            'annotation_distribution': store.annotation_counts_per_category(),
+            'bbox_distributions': dataset_stats.bbox_distributions(store)
         }
     
     def filter_images_by_context(self, dataset_id: str, context_filters: Dict[str, List[str]]) -> List[Dict]:
@@ -166,75 +538,125 @@ class BTTDatasetLoader:
         Returns:
             List of image entries matching the criteria
         """
-        data = self.load_dataset(dataset_id)
-        filtered_images = []
+        rows = self.get_context_index(dataset_id).query(context_filters)
+        return self._images_at_rows(dataset_id, rows)
+    
+    def get_image_ids_with_labels(self, dataset_id: str, labels: List[str],
+                                  match: str = 'all') -> np.ndarray:
+        """
+        Get ids of images containing specific object labels.
         
-        for img in data.get('images', []):
-            contexts = img.get('contexts', {})
-            match = True
-            
-            for context_type, required_values in context_filters.items():
-                img_context_values = contexts.get(context_type, [])
-                if not any(val in img_context_values for val in required_values):
-                    match = False
-                    break
+        Args:
+            dataset_id: ID of the dataset
+            labels: List of labels to match
+            match: 'all' to require every label, 'any' to require at least one
             
-            if match:
-                filtered_images.append(img)
-        
-        return filtered_images
+        Returns:
+            Array of matching image ids, in dataset order
+        """
+        rows = self._label_rows(dataset_id, labels, match)
+        return self.get_annotation_store(dataset_id).image_ids[rows]
     
-    def get_images_with_labels(self, dataset_id: str, labels: List[str]) -> List[Dict]:
+    def _label_rows(self, dataset_id: str, labels: List[str], match: str) -> np.ndarray:
+        """Resolve a label query to image rows."""
+        label_index = self.get_label_index(dataset_id)
+        if match == 'all':
+            return label_index.rows_with_all(labels)
+        if match == 'any':
+            return label_index.rows_with_any(labels)
+        raise ValueError(f"Unknown match mode {match!r}, expected 'all' or 'any'")
+    
+    def get_images_with_labels(self, dataset_id: str, labels: List[str],
+                               match: str = 'all') -> List[Dict]:
         """
         Get images containing specific object labels.
         
         Args:
             dataset_id: ID of the dataset
             labels: List of required labels
+            match: 'all' to require every label, 'any' to require at least one
             
         Returns:
             List of image entries containing the specified labels
         """
-        data = self.load_dataset(dataset_id)
-        matching_images = []
-        
-        for img in data.get('images', []):
-            img_labels = set(img.get('labels', []))
-            if set(labels).issubset(img_labels):
-                matching_images.append(img)
-        
-        return matching_images
+        rows = self._label_rows(dataset_id, labels, match)
+        return self._images_at_rows(dataset_id, rows)
 
 
 # Example usage and utility functions
-def load_all_datasets(base_path: str = "BTT_Data") -> Dict[str, Dict]:
+def _parse_dataset(coco_path: Path, compact: bool):
+    """Parse one coco.json in a worker process, optionally as an AnnotationStore."""
+    with open(coco_path, 'r') as f:
+        data = json.load(f)
+    return AnnotationStore.from_coco(data) if compact else data
+
+
+def _dataset_stats(base_path: str, dataset_id: str) -> Dict:
+    """Compute the statistics of one dataset in a worker process."""
+    return BTTDatasetLoader(base_path, lazy=True).get_dataset_stats(dataset_id)
+
+
+def _map_datasets(func, args: List[tuple], max_workers: Optional[int]) -> List:
+    """Apply func to every argument tuple, in a bounded process pool when max_workers > 1."""
+    if not max_workers or max_workers <= 1 or len(args) <= 1:
+        return [func(*arg) for arg in args]
+    
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(args))) as executor:
+        # map() yields results in submission order, keeping the output deterministic
+        return list(executor.map(func, *zip(*args)))
+
+
+def load_all_datasets(base_path: str = "BTT_Data", max_workers: Optional[int] = None,
+                      compact: bool = False) -> Dict[str, Union[Dict, AnnotationStore]]:
     """
     Load all available datasets.
     
     Args:
         base_path: Path to datasets directory
+        max_workers: Number of processes parsing coco.json files concurrently;
+                     None or 1 loads them sequentially
+        compact: Return an AnnotationStore per dataset instead of the raw
+                 COCO dictionary, which is much cheaper to send between processes
         
     Returns:
-        Dictionary mapping dataset IDs to their data
+        Dictionary mapping dataset IDs, sorted, to the loaded COCO dictionary
+        or, when compact is True, to an AnnotationStore
     """
     loader = BTTDatasetLoader(base_path)
-    datasets = {}
+    dataset_ids = sorted(loader.list_datasets())
     
-    for dataset_id in loader.list_datasets():
-        datasets[dataset_id] = loader.load_dataset(dataset_id)
-        print(f"Loaded dataset {dataset_id} with {len(datasets[dataset_id]['images'])} images")
+    results = _map_datasets(
+        _parse_dataset,
+        [(loader._get_entry(dataset_id)['annotations_path'], compact) for dataset_id in dataset_ids],
+        max_workers)
+    
+    datasets = {}
+    for dataset_id, data in zip(dataset_ids, results):
+        datasets[dataset_id] = data
+        num_images = data.num_images if compact else len(data['images'])
+        print(f"Loaded dataset {dataset_id} with {num_images} images")
     
     return datasets
 
 
-def print_dataset_summary(base_path: str = "BTT_Data"):
-    """Print a summary of all available datasets."""
+def print_dataset_summary(base_path: str = "BTT_Data", max_workers: Optional[int] = None):
+    """
+    Print a summary of all available datasets.
+    
+    Args:
+        base_path: Path to datasets directory
+        max_workers: Number of processes computing dataset statistics
+                     concurrently; None or 1 computes them sequentially
+    """
     loader = BTTDatasetLoader(base_path)
+    dataset_ids = sorted(loader.list_datasets())
+    
+    all_stats = _map_datasets(
+        _dataset_stats, [(base_path, dataset_id) for dataset_id in dataset_ids], max_workers)
     
     print("=== BTT Dataset Summary ===")
-    for dataset_id in loader.list_datasets():
+    for dataset_id, stats in zip(dataset_ids, all_stats):
         print(f"\nDataset: {dataset_id}")
-        stats = loader.get_dataset_stats(dataset_id)
         
         print(f"  Images: {stats['num_images']}")
         print(f"  Categories: {stats['num_categories']}")
@@ -0,0 +1,202 @@
+"""
+Stratified, seeded train/val splits that do not move any files.
+
+Every image gets a stratum key made of its rarest present class and its
+scene / lighting / occlusion context. Strata too small to split are folded
+into coarser keys (dropping trailing context types) until they are big
+enough. Images are shuffled with a fixed seed inside their stratum, and each
+stratum contributes its share of validation images. The result is written as
+split list files (one image path per line), which YOLO accepts in place of
+image folders, so re-splitting only rewrites two small text files.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+
+
+DEFAULT_CONTEXT_TYPES = ("scene", "lighting conditions", "occlusion")
+
+
+def _encode(values: List[str]) -> np.ndarray:
+    """Integer code per value, in sorted value order so codes are stable across runs."""
+    codes = {value: code for code, value in enumerate(sorted(set(values)))}
+    return np.array([codes[value] for value in values], dtype=np.int64)
+
+
+def stratum_columns(images: Iterable[Dict], annotations: Iterable[Dict],
+                    context_types: Sequence[str] = DEFAULT_CONTEXT_TYPES) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build the per-image stratification columns in one pass over images and annotations.
+
+    Args:
+        images: COCO image entries (any iterable, e.g. a stream)
+        annotations: COCO annotations (any iterable)
+        context_types: Context types to stratify by, most important first
+
+    Returns:
+        Tuple (image_ids, columns): image ids in input order and an
+        (N, 1 + len(context_types)) int array of [rarest class, context codes...]
+        where -1 marks an image without annotations
+    """
+    image_ids = []
+    contexts = [[] for _ in context_types]
+    for img in images:
+        image_ids.append(img["id"])
+        img_contexts = img.get("contexts") or {}
+        for values, context_type in zip(contexts, context_types):
+            # Multi-valued contexts are keyed by their first value
+            type_values = img_contexts.get(context_type) or [""]
+            values.append(type_values[0])
+    image_ids = np.array(image_ids, dtype=np.int64)
+
+    ann_image_ids, ann_category_ids = [], []
+    for ann in annotations:
+        ann_image_ids.append(ann["image_id"])
+        ann_category_ids.append(ann["category_id"])
+    ann_image_ids = np.array(ann_image_ids, dtype=np.int64)
+    categories, ann_classes = np.unique(np.array(ann_category_ids, dtype=np.int64), return_inverse=True)
+
+    # Image row of every annotation
+    order = np.argsort(image_ids, kind='stable')
+    pos = np.searchsorted(image_ids[order], ann_image_ids)
+    found = pos < len(image_ids)
+    found[found] = image_ids[order][pos[found]] == ann_image_ids[found]
+    ann_rows = order[pos[found]]
+
+    present = np.zeros((len(image_ids), len(categories)), dtype=bool)
+    present[ann_rows, ann_classes.reshape(-1)[found]] = True
+
+    # Rarest class present in each image, so rare classes are spread over
+    # both splits instead of being drowned by common co-occurring ones
+    class_frequency = present.sum(axis=0)
+    score = np.where(present, class_frequency, np.iinfo(np.int64).max)
+    rarest = np.where(present.any(axis=1), score.argmin(axis=1) if len(categories) else -1, -1)
+
+    columns = np.column_stack([rarest] + [_encode(values) for values in contexts]) \
+        if len(image_ids) else np.zeros((0, 1 + len(context_types)), dtype=np.int64)
+    return image_ids, columns
+
+
+def assign_strata(columns: np.ndarray, min_stratum_size: int = 5) -> np.ndarray:
+    """
+    Group images into strata, folding small strata into coarser keys.
+
+    Args:
+        columns: (N, K) stratification columns, most important first
+        min_stratum_size: Smallest stratum kept at a given key depth
+
+    Returns:
+        (N,) int stratum id per image
+    """
+    strata = np.full(len(columns), -1, dtype=np.int64)
+    pending = np.ones(len(columns), dtype=bool)
+    next_stratum = 0
+
+    for depth in range(columns.shape[1], 0, -1):
+        rows = np.flatnonzero(pending)
+        if len(rows) == 0:
+            break
+        _, inverse, counts = np.unique(columns[rows, :depth], axis=0,
+                                       return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+        large = counts[inverse] >= min_stratum_size
+        strata[rows[large]] = next_stratum + inverse[large]
+        pending[rows[large]] = False
+        next_stratum += len(counts)
+
+    # Whatever is still too small at the class level shares one stratum
+    strata[pending] = next_stratum
+    return strata
+
+
+def stratified_split(images: Iterable[Dict], annotations: Iterable[Dict], val_fraction: float = 0.2,
+                     seed: int = 42, context_types: Sequence[str] = DEFAULT_CONTEXT_TYPES,
+                     min_stratum_size: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split images into train and val, stratified by class and context.
+
+    The split depends only on the image ids, classes, contexts and seed, not
+    on the input order.
+
+    Args:
+        images: COCO image entries (any iterable, e.g. a stream)
+        annotations: COCO annotations (any iterable)
+        val_fraction: Share of images assigned to val
+        seed: Random seed
+        context_types: Context types to stratify by, most important first
+        min_stratum_size: Smallest stratum kept before folding into a coarser key
+
+    Returns:
+        Tuple (train_ids, val_ids) of image ids, each in input order
+    """
+    image_ids, columns = stratum_columns(images, annotations, context_types)
+    strata = assign_strata(columns, min_stratum_size)
+
+    # Shuffle in id order with the seed, then group by stratum keeping that order
+    by_id = np.argsort(image_ids, kind='stable')
+    shuffled = by_id[np.random.default_rng(seed).permutation(len(image_ids))]
+    shuffled = shuffled[np.argsort(strata[shuffled], kind='stable')]
+
+    # Val images per stratum from the rounded cumulative target, so the
+    # overall fraction stays exact even when every stratum is small
+    sizes = np.bincount(strata, minlength=strata.max() + 1 if len(strata) else 0)
+    val_cumulative = np.round(np.cumsum(sizes) * val_fraction).astype(np.int64)
+    val_sizes = np.diff(val_cumulative, prepend=0)
+
+    starts = np.cumsum(sizes) - sizes
+    sorted_strata = strata[shuffled]
+    rank = np.arange(len(shuffled)) - starts[sorted_strata]
+    is_val = np.zeros(len(image_ids), dtype=bool)
+    is_val[shuffled] = rank < val_sizes[sorted_strata]
+
+    return image_ids[~is_val], image_ids[is_val]
+
+
+def write_split_list(list_path: Union[str, Path], image_paths: Iterable[Union[str, Path]]) -> int:
+    """
+    Write a YOLO split list file, one image path per line.
+
+    Paths inside the list's directory are written as './relative/path', which
+    Ultralytics resolves against the list file's location; others are absolute.
+
+    Args:
+        list_path: Output .txt file
+        image_paths: Image file paths
+
+    Returns:
+        Number of images listed
+    """
+    list_dir = os.path.dirname(os.path.abspath(list_path))
+    lines = []
+    for path in image_paths:
+        path = os.path.abspath(path)
+        relative = os.path.relpath(path, list_dir)
+        if relative.startswith(os.pardir):
+            lines.append(Path(path).as_posix())
+        else:
+            lines.append("./" + Path(relative).as_posix())
+
+    tmp_path = f"{list_path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.writelines(line + "\n" for line in lines)
+    os.replace(tmp_path, list_path)
+    return len(lines)
+
+
+def read_split_list(list_path: Union[str, Path]) -> List[str]:
+    """
+    Read a split list file back into image paths.
+
+    Args:
+        list_path: Split list .txt file
+
+    Returns:
+        Image paths, with './' entries resolved against the list's directory
+    """
+    list_dir = os.path.dirname(os.path.abspath(list_path))
+    with open(list_path) as f:
+        return [os.path.join(list_dir, line[2:]) if line.startswith("./") else line
+                for line in (line.strip() for line in f) if line]
@@ -0,0 +1,109 @@
+"""
+Vectorized dataset statistics for BTT datasets.
+
+Every statistic here is computed from the precomputed indexes (ContextIndex,
+LabelIndex, AnnotationStore) with array reductions, so refreshing the stats of
+a large corpus never walks the image entries in Python.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from annotation_store import AnnotationStore
+from context_index import ContextIndex
+from label_index import LabelIndex
+
+
+# COCO object size buckets, in squared pixels
+SMALL_AREA = 32 ** 2
+MEDIUM_AREA = 96 ** 2
+
+DEFAULT_AREA_BINS = [0, 16 ** 2, SMALL_AREA, 64 ** 2, MEDIUM_AREA, 128 ** 2, 256 ** 2, 512 ** 2, np.inf]
+DEFAULT_ASPECT_BINS = [0, 0.25, 0.5, 0.75, 1.0, 1.333, 2.0, 4.0, np.inf]
+
+
+def context_histograms(context_index: ContextIndex) -> Dict[str, Dict[str, int]]:
+    """
+    Count images per value of every context type.
+
+    Args:
+        context_index: Context index of the dataset
+
+    Returns:
+        Dictionary {context type: {value: number of images}}, with an empty
+        histogram for context types whose value lists were always empty
+    """
+    histograms: Dict[str, Dict[str, int]] = {context_type: {} for context_type in context_index.types}
+    counts = np.diff(context_index.offsets).tolist()
+    for (context_type, value), count in zip(context_index.keys, counts):
+        histograms.setdefault(context_type, {})[value] = count
+    return histograms
+
+
+def label_context_crosstab(label_index: LabelIndex,
+                           context_index: ContextIndex) -> Dict[str, Dict[str, Dict[str, int]]]:
+    """
+    Count images per (context value, label) pair.
+
+    Args:
+        label_index: Label index of the dataset
+        context_index: Context index of the dataset
+
+    Returns:
+        Dictionary {context type: {value: {label: number of images}}}
+    """
+    offsets = context_index.offsets
+    table = np.zeros((len(label_index.labels), len(context_index.keys)), dtype=np.int64)
+
+    for code in range(len(label_index.labels)):
+        # Prefix sums over the concatenated posting lists give every
+        # posting list's label count with two lookups
+        has_label = label_index.matrix[code][context_index.image_rows]
+        prefix = np.zeros(len(has_label) + 1, dtype=np.int64)
+        np.cumsum(has_label, out=prefix[1:])
+        table[code] = prefix[offsets[1:]] - prefix[offsets[:-1]]
+
+    crosstab: Dict[str, Dict[str, Dict[str, int]]] = {}
+    for column, (context_type, value) in enumerate(context_index.keys):
+        crosstab.setdefault(context_type, {})[value] = dict(
+            zip(label_index.labels, table[:, column].tolist()))
+    return crosstab
+
+
+def _histogram(values: np.ndarray, bins: List[float]) -> Dict[str, List]:
+    """Histogram with JSON-friendly output."""
+    counts, edges = np.histogram(values, bins=bins)
+    return {'bin_edges': [float(edge) for edge in edges], 'counts': counts.tolist()}
+
+
+def bbox_distributions(store: AnnotationStore, area_bins: Optional[List[float]] = None,
+                       aspect_bins: Optional[List[float]] = None) -> Dict:
+    """
+    Summarize bounding box sizes and aspect ratios.
+
+    Args:
+        store: Annotation store of the dataset
+        area_bins: Histogram edges for box area in squared pixels
+        aspect_bins: Histogram edges for width / height
+
+    Returns:
+        Dictionary with 'area_histogram', 'aspect_histogram' and the COCO
+        'size_buckets' (small/medium/large annotation counts)
+    """
+    widths = store.ann_bboxes[:, 2]
+    heights = store.ann_bboxes[:, 3]
+    areas = widths * heights
+
+    positive = (widths > 0) & (heights > 0)
+    aspects = widths[positive] / heights[positive]
+
+    return {
+        'area_histogram': _histogram(areas, area_bins or DEFAULT_AREA_BINS),
+        'aspect_histogram': _histogram(aspects, aspect_bins or DEFAULT_ASPECT_BINS),
+        'size_buckets': {
+            'small': int(np.count_nonzero(areas < SMALL_AREA)),
+            'medium': int(np.count_nonzero((areas >= SMALL_AREA) & (areas < MEDIUM_AREA))),
+            'large': int(np.count_nonzero(areas >= MEDIUM_AREA)),
+        },
+    }
@@ -0,0 +1,106 @@
+"""
+Hash index from image file names to COCO images and their annotations.
+
+Error analysis only knows each prediction's image path, and used to find the
+ground-truth image by scanning ``images`` once per prediction, which is
+quadratic in dataset size. ``ImageIndex`` builds the file name, stem, image id
+and per-image annotation lookups in one pass, so matching a prediction and
+exporting a subset of images are O(1) per image.
+"""
+
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+
+class ImageIndex:
+    """
+    Lookups over the images and annotations of one COCO dataset.
+
+    Attributes:
+        images: COCO image entries, in file order
+        annotations: COCO annotations, in file order
+        categories: COCO categories
+        file_name_to_id: Image file_name -> image id
+        stem_to_id: File stem (name without extension) -> image id
+        image_id_to_ann: Image id -> annotations of that image, in file order
+    """
+
+    def __init__(self, images: Iterable[Dict], annotations: Iterable[Dict],
+                 categories: Optional[List[Dict]] = None):
+        """
+        Build the index.
+
+        When several images share a file name or stem, the first one wins,
+        matching a scan over ``images``.
+
+        Args:
+            images: COCO image entries
+            annotations: COCO annotations
+            categories: COCO categories, carried over into ``subset``
+        """
+        self.images = list(images)
+        self.annotations = list(annotations)
+        self.categories = list(categories or [])
+
+        self.image_rows = {}
+        self.file_name_to_id = {}
+        self.stem_to_id = {}
+        for row, img in enumerate(self.images):
+            self.image_rows.setdefault(img["id"], row)
+            self.file_name_to_id.setdefault(img["file_name"], img["id"])
+            self.stem_to_id.setdefault(os.path.splitext(os.path.basename(img["file_name"]))[0], img["id"])
+
+        self.image_id_to_ann = defaultdict(list)
+        for ann in self.annotations:
+            self.image_id_to_ann[ann["image_id"]].append(ann)
+
+    @classmethod
+    def from_coco(cls, data: Dict) -> "ImageIndex":
+        """Build the index of a loaded COCO dictionary."""
+        return cls(data.get("images", []), data.get("annotations", []), data.get("categories", []))
+
+    def image_id(self, path: str) -> Optional[int]:
+        """
+        Find the image a file belongs to.
+
+        Args:
+            path: Image path or file name, e.g. a prediction's ``result.path``.
+                  Files with another extension (such as saved .txt
+                  predictions) are matched by stem.
+
+        Returns:
+            Image id, or None if no image matches
+        """
+        file_name = os.path.basename(path)
+        image_id = self.file_name_to_id.get(file_name)
+        if image_id is None:
+            image_id = self.stem_to_id.get(os.path.splitext(file_name)[0])
+        return image_id
+
+    def image(self, image_id: int) -> Dict:
+        """COCO image entry of an image id."""
+        return self.images[self.image_rows[image_id]]
+
+    def image_annotations(self, image_id: int) -> List[Dict]:
+        """Annotations of an image, empty if it has none."""
+        return self.image_id_to_ann.get(image_id, [])
+
+    def subset(self, image_ids: Iterable[int]) -> Dict:
+        """
+        Build a COCO dictionary holding only some images.
+
+        Args:
+            image_ids: Ids of the images to keep; unknown ids are ignored
+
+        Returns:
+            Dictionary with 'images', 'annotations' and 'categories', with
+            images and annotations in their original file order
+        """
+        image_ids = set(image_ids)
+        rows = sorted(self.image_rows[image_id] for image_id in image_ids if image_id in self.image_rows)
+        return {
+            "images": [self.images[row] for row in rows],
+            "annotations": [ann for ann in self.annotations if ann["image_id"] in image_ids],
+            "categories": self.categories,
+        }
@@ -0,0 +1,190 @@
+"""
+Image helpers shared by the dataset loader and preprocessing scripts.
+
+``read_image_size`` reads PNG/JPEG dimensions straight from the file header
+(PNG IHDR chunk, JPEG SOF segment) without going through PIL, and
+``DecodedImageCache`` is a byte-bounded LRU cache of decoded images for
+repeated access during EDA and annotation review.
+"""
+
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Hashable, Optional, Tuple, Union
+
+from PIL import Image
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# JPEG start-of-frame markers carry the image size; C4, C8 and CC share the
+# range but are DHT, JPG and DAC segments
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _png_size(f) -> Optional[Tuple[int, int]]:
+    """Read the size from a PNG IHDR chunk, the file positioned after the signature."""
+    header = f.read(16)
+    if len(header) < 16 or header[4:8] != b'IHDR':
+        return None
+    width, height = struct.unpack('>II', header[8:16])
+    return width, height
+
+
+def _jpeg_size(f) -> Optional[Tuple[int, int]]:
+    """Read the size from the first JPEG SOF segment, the file positioned after SOI."""
+    while True:
+        if f.read(1) != b'\xff':
+            return None
+        marker = f.read(1)
+        # Markers may be padded with any number of 0xFF fill bytes
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            return None
+
+        code = marker[0]
+        if code == 0xD8 or 0xD0 <= code <= 0xD7 or code == 0x01:
+            continue  # standalone markers without a length field
+        if code in (0xD9, 0xDA):
+            return None  # end of image / start of scan before any SOF
+
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        (length,) = struct.unpack('>H', length_bytes)
+
+        if code in JPEG_SOF_MARKERS:
+            segment = f.read(5)
+            if len(segment) < 5:
+                return None
+            height, width = struct.unpack('>HH', segment[1:5])
+            return width, height
+
+        f.seek(length - 2, 1)
+
+
+def read_image_header_size(path: Union[str, Path]) -> Optional[Tuple[int, int]]:
+    """
+    Read image dimensions from PNG or JPEG header bytes.
+
+    Args:
+        path: Path to the image file
+
+    Returns:
+        Tuple (width, height), or None if the file is not a PNG/JPEG whose
+        header could be parsed
+    """
+    with open(path, 'rb') as f:
+        start = f.read(8)
+        if start == PNG_SIGNATURE:
+            return _png_size(f)
+        if start[:2] == b'\xff\xd8':
+            f.seek(2)
+            return _jpeg_size(f)
+    return None
+
+
+def read_image_size(path: Union[str, Path]) -> Tuple[int, int]:
+    """
+    Get image dimensions, from the header when possible and PIL otherwise.
+
+    Args:
+        path: Path to the image file
+
+    Returns:
+        Tuple (width, height)
+
+    Raises:
+        OSError: If the file is missing or PIL cannot identify it
+    """
+    size = read_image_header_size(path)
+    if size is not None:
+        return size
+    with Image.open(path) as im:
+        return im.size
+
+
+def decoded_nbytes(image: Image.Image) -> int:
+    """Approximate memory taken by a decoded PIL image."""
+    width, height = image.size
+    bytes_per_band = 4 if image.mode in ('I', 'F') else 2 if image.mode.startswith('I;16') else 1
+    return width * height * len(image.getbands()) * bytes_per_band
+
+
+class DecodedImageCache:
+    """
+    Least-recently-used cache of decoded PIL images, bounded by total bytes.
+
+    Cached images are shared between callers and should be treated as read-only;
+    call ``.copy()`` before modifying one. The cache is safe to use from
+    several threads.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Maximum total size of the decoded images kept
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Image.Image]:
+        """
+        Get a cached image and mark it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The decoded image, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, image: Image.Image):
+        """
+        Add a decoded image, evicting least recently used ones to stay within max_bytes.
+
+        Images larger than the whole budget are not cached.
+
+        Args:
+            key: Cache key
+            image: Decoded image
+        """
+        nbytes = decoded_nbytes(image)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (image, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+
+    def clear(self):
+        """Drop every cached image."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
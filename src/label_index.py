@@ -0,0 +1,148 @@
+"""
+Label membership index for BTT datasets.
+
+Precomputes a boolean label x image matrix from the images' ``labels`` lists so
+that "all of", "any of" and co-occurrence queries over label combinations are
+vectorized reductions instead of per-image set construction.
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class LabelIndex:
+    """
+    Boolean membership matrix of labels over image rows.
+
+    ``matrix[label_code, row]`` is True when the image at ``row`` of the
+    dataset's ``images`` list carries ``labels[label_code]``. Each label's row
+    is contiguous, so combining a few labels touches only their rows.
+    ``occurrences[label_code]`` counts every entry of the label in the
+    ``labels`` lists, including repeats within one image.
+    """
+
+    def __init__(self, labels: List[str], matrix: np.ndarray,
+                 occurrences: Optional[np.ndarray] = None):
+        """
+        Initialize the index from an already built matrix.
+
+        Args:
+            labels: Label name for every matrix row
+            matrix: (L, N) boolean membership matrix
+            occurrences: (L,) number of list entries per label; defaults to
+                         the per-label image counts (no repeated labels)
+        """
+        self.labels = labels
+        self.matrix = matrix
+        if occurrences is None:
+            occurrences = matrix.sum(axis=1)
+        self.occurrences = occurrences
+        self.codes = {label: code for code, label in enumerate(labels)}
+
+    @classmethod
+    def from_images(cls, images: Iterable[Dict]) -> "LabelIndex":
+        """
+        Build the index from COCO image entries.
+
+        Args:
+            images: Image entries with an optional ``labels`` list
+
+        Returns:
+            LabelIndex over the images
+        """
+        builder = LabelIndexBuilder()
+        for img in images:
+            builder.add(img)
+        return builder.build()
+
+    @property
+    def num_images(self) -> int:
+        """Number of images the index was built over."""
+        return self.matrix.shape[1]
+
+    def _label_rows(self, labels: List[str]):
+        """Matrix rows for the given labels, None if any label is unknown."""
+        codes = [self.codes.get(label) for label in set(labels)]
+        if any(code is None for code in codes):
+            return None
+        return self.matrix[codes]
+
+    def rows_with_all(self, labels: List[str]) -> np.ndarray:
+        """
+        Find images carrying every one of the labels.
+
+        Args:
+            labels: Required labels; an empty list matches every image
+
+        Returns:
+            Sorted array of matching image rows
+        """
+        rows = self._label_rows(labels)
+        if rows is None:
+            return np.empty(0, dtype=np.int64)
+        if len(rows) == 0:
+            return np.arange(self.num_images, dtype=np.int64)
+        return np.flatnonzero(np.logical_and.reduce(rows, axis=0))
+
+    def rows_with_any(self, labels: List[str]) -> np.ndarray:
+        """
+        Find images carrying at least one of the labels.
+
+        Args:
+            labels: Candidate labels; unknown labels are ignored
+
+        Returns:
+            Sorted array of matching image rows
+        """
+        codes = [self.codes[label] for label in set(labels) if label in self.codes]
+        if not codes:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(np.logical_or.reduce(self.matrix[codes], axis=0))
+
+    def counts(self) -> Dict[str, int]:
+        """Number of images carrying each label."""
+        return dict(zip(self.labels, self.matrix.sum(axis=1).tolist()))
+
+    def occurrence_counts(self) -> Dict[str, int]:
+        """Number of entries of each label over all ``labels`` lists, repeats included."""
+        return dict(zip(self.labels, np.asarray(self.occurrences).tolist()))
+
+    def cooccurrence(self) -> np.ndarray:
+        """
+        Count images for every pair of labels.
+
+        Returns:
+            (L, L) integer matrix whose [i, j] entry is the number of images
+            carrying both ``labels[i]`` and ``labels[j]``; the diagonal holds
+            per-label image counts
+        """
+        as_int = self.matrix.astype(np.int32)
+        return as_int @ as_int.T
+
+
+class LabelIndexBuilder:
+    """Incrementally build a LabelIndex, one image entry at a time."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.pair_codes = array('q')
+        self.pair_rows = array('q')
+        self.num_images = 0
+
+    def add(self, img: Dict):
+        """Add the next image entry; rows are assigned in call order."""
+        row = self.num_images
+        self.num_images += 1
+        for label in img.get('labels', []):
+            self.pair_codes.append(self.codes.setdefault(label, len(self.codes)))
+            self.pair_rows.append(row)
+
+    def build(self) -> LabelIndex:
+        """Finish the index."""
+        pair_codes = np.frombuffer(self.pair_codes, dtype=np.int64)
+        matrix = np.zeros((len(self.codes), self.num_images), dtype=bool)
+        matrix[pair_codes, np.frombuffer(self.pair_rows, dtype=np.int64)] = True
+        occurrences = np.bincount(pair_codes, minlength=len(self.codes)).astype(np.int64)
+        return LabelIndex(list(self.codes), matrix, occurrences)
@@ -0,0 +1,349 @@
+"""
+Packed YOLO label shards.
+
+A YOLO label directory holds one small ``.txt`` per image, which is slow to
+read from a cold cache and wastes inodes on large splits. A label shard packs
+a whole split into one file::
+
+    magic (8 bytes) | header length (uint64) | JSON header (stems, counts)
+    offsets  int64   (num_images + 1)
+    classes  int16   (num_boxes)
+    boxes    float32 (num_boxes, 4)   normalized x_center, y_center, w, h
+
+Sections start on 8-byte boundaries. The labels of image ``stems[i]`` are rows
+``offsets[i]:offsets[i + 1]``, and the whole split loads with one sequential
+read (or is memory-mapped). ``shard_from_coco`` builds a shard straight from
+COCO annotations, and ``txt_to_shard`` and ``shard_to_txt`` convert between
+shards and the ``.txt`` layout, reading either a labels directory or a zip of
+one such as ``test_labels.zip``.
+"""
+
+import json
+import os
+import tempfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from annotation_store import csr_index
+from yolo_labels import (annotation_image_rows, coco_to_yolo_boxes, format_label_lines, image_sizes,
+                         write_label_files)
+
+
+SHARD_MAGIC = b"BTTLBL\x00\x01"
+SHARD_VERSION = 1
+SHARD_SUFFIX = ".lblshard"
+ALIGNMENT = 8
+
+PathLike = Union[str, Path]
+
+
+def _pad(size: int) -> int:
+    """Bytes needed to move size up to the next alignment boundary."""
+    return -size % ALIGNMENT
+
+
+class LabelShard:
+    """
+    Labels of a set of images, stored as flat arrays with per-image offsets.
+
+    Attributes:
+        stems: Image file stems, in shard order
+        offsets: (num_images + 1,) int64; image i owns rows offsets[i]:offsets[i + 1]
+        classes: (num_boxes,) int16 class ids
+        boxes: (num_boxes, 4) float32 normalized YOLO boxes
+    """
+
+    def __init__(self, stems: Sequence[str], offsets: np.ndarray, classes: np.ndarray,
+                 boxes: np.ndarray):
+        """
+        Initialize a shard from its arrays.
+
+        Args:
+            stems: Image file stems
+            offsets: Row offsets per image
+            classes: Class id of every box
+            boxes: Normalized box of every row
+
+        Raises:
+            ValueError: If the array sizes do not line up
+        """
+        self.stems = list(stems)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.classes = np.asarray(classes, dtype=np.int16)
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+        if len(self.offsets) != len(self.stems) + 1:
+            raise ValueError(f"Expected {len(self.stems) + 1} offsets, got {len(self.offsets)}")
+        if not (len(self.classes) == len(self.boxes) == self.offsets[-1]):
+            raise ValueError("classes, boxes and offsets disagree on the number of boxes")
+
+        self._stem_rows = {stem: i for i, stem in enumerate(self.stems)}
+
+    @classmethod
+    def from_labels(cls, labels: Dict[str, Tuple[Sequence[int], Sequence[Sequence[float]]]]) -> 'LabelShard':
+        """
+        Build a shard from per-image labels.
+
+        Args:
+            labels: {stem: (class_ids, boxes)}, kept in insertion order
+
+        Returns:
+            LabelShard instance
+        """
+        stems = list(labels)
+        counts = [len(labels[stem][0]) for stem in stems]
+        offsets = np.zeros(len(stems) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        classes = [c for stem in stems for c in labels[stem][0]]
+        boxes = [b for stem in stems for b in labels[stem][1]]
+        return cls(stems, offsets, np.array(classes, dtype=np.int16),
+                   np.array(boxes, dtype=np.float32).reshape(-1, 4))
+
+    def __len__(self) -> int:
+        return len(self.stems)
+
+    def __contains__(self, stem: str) -> bool:
+        return stem in self._stem_rows
+
+    @property
+    def num_boxes(self) -> int:
+        """Total number of boxes."""
+        return int(self.offsets[-1])
+
+    def labels(self, stem: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the labels of one image.
+
+        Args:
+            stem: Image file stem
+
+        Returns:
+            Tuple (classes, boxes) as views into the shard arrays
+
+        Raises:
+            KeyError: If the stem is not in the shard
+        """
+        row = self._stem_rows[stem]
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return self.classes[start:end], self.boxes[start:end]
+
+    def __iter__(self) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+        """Iterate (stem, classes, boxes) in shard order."""
+        for row, stem in enumerate(self.stems):
+            start, end = self.offsets[row], self.offsets[row + 1]
+            yield stem, self.classes[start:end], self.boxes[start:end]
+
+
+def write_label_shard(path: PathLike, shard: LabelShard):
+    """
+    Write a shard file atomically.
+
+    Args:
+        path: Output file
+        shard: Labels to write
+    """
+    header = json.dumps({
+        "version": SHARD_VERSION,
+        "num_images": len(shard),
+        "num_boxes": shard.num_boxes,
+        "stems": shard.stems,
+    }).encode("utf-8")
+    prefix_size = len(SHARD_MAGIC) + 8 + len(header)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".shard-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(SHARD_MAGIC)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header)
+            f.write(b"\x00" * _pad(prefix_size))
+            f.write(shard.offsets.astype("<i8").tobytes())
+            classes = shard.classes.astype("<i2").tobytes()
+            f.write(classes)
+            f.write(b"\x00" * _pad(len(classes)))
+            f.write(shard.boxes.astype("<f4").tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def read_label_shard(path: PathLike, mmap: bool = False) -> LabelShard:
+    """
+    Load a shard file.
+
+    Args:
+        path: Shard file
+        mmap: Memory-map the file instead of reading it in one go
+
+    Returns:
+        LabelShard instance
+
+    Raises:
+        ValueError: If the file is not a label shard of a supported version
+    """
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        with open(path, "rb") as f:
+            buffer = np.frombuffer(f.read(), dtype=np.uint8)
+
+    magic_size = len(SHARD_MAGIC)
+    if bytes(buffer[:magic_size]) != SHARD_MAGIC:
+        raise ValueError(f"{path} is not a label shard")
+    header_size = int(buffer[magic_size:magic_size + 8].view("<u8")[0])
+    position = magic_size + 8
+    header = json.loads(bytes(buffer[position:position + header_size]).decode("utf-8"))
+    if header.get("version") != SHARD_VERSION:
+        raise ValueError(f"Unsupported label shard version {header.get('version')} in {path}")
+
+    num_images, num_boxes = header["num_images"], header["num_boxes"]
+    position += header_size
+    position += _pad(position)
+
+    def take(dtype: str, count: int) -> np.ndarray:
+        nonlocal position
+        nbytes = count * np.dtype(dtype).itemsize
+        array = buffer[position:position + nbytes].view(dtype)
+        position += nbytes + _pad(nbytes)
+        return array
+
+    offsets = take("<i8", num_images + 1)
+    classes = take("<i2", num_boxes)
+    boxes = take("<f4", num_boxes * 4).reshape(-1, 4)
+    return LabelShard(header["stems"], offsets, classes, boxes)
+
+
+def shard_from_coco(images: Sequence[Dict], annotations: Sequence[Dict],
+                    sizes: Optional[np.ndarray] = None) -> LabelShard:
+    """
+    Build the label shard of a batch of images from COCO annotations.
+
+    The result equals packing the label files ``yolo_label_texts`` writes for
+    the same images with ``txt_to_shard``, without reading any label file.
+
+    Args:
+        images: COCO image entries, in shard order
+        annotations: COCO annotations with 0-based YOLO class ids; ones for
+                     images outside the batch are ignored
+        sizes: (N, 2) image (width, height); defaults to the entries' sizes
+
+    Returns:
+        LabelShard keyed by the images' file stems
+    """
+    if sizes is None:
+        sizes = image_sizes(images)
+
+    kept, rows = annotation_image_rows(images, annotations)
+    bboxes = np.array([annotations[i]["bbox"] for i in kept.tolist()], dtype=np.float64).reshape(-1, 4)
+    classes = np.array([annotations[i]["category_id"] for i in kept.tolist()], dtype=np.int64)
+    boxes = coco_to_yolo_boxes(bboxes, sizes[rows, 0], sizes[rows, 1])
+
+    # Group boxes by image, keeping annotation order within an image
+    offsets, order = csr_index(rows, len(images))
+    stems = [Path(img["file_name"]).stem for img in images]
+    return LabelShard(stems, offsets, classes[order], boxes[order])
+
+
+def _iter_txt_labels(source: PathLike, stems: Optional[Sequence[str]] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (stem, text) for .txt labels in a directory or zip archive.
+
+    All labels are yielded sorted by stem, or only the given stems in their
+    order, with an empty text for stems that have no label file.
+    """
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            members = {PurePosixPath(name).stem: name for name in archive.namelist()
+                       if name.endswith(".txt") and not name.startswith("__MACOSX/")}
+            for stem in (sorted(members) if stems is None else stems):
+                yield stem, archive.read(members[stem]).decode("utf-8") if stem in members else ""
+        return
+
+    if stems is None:
+        stems = sorted(path.stem for path in Path(source).glob("*.txt"))
+    for stem in stems:
+        path = Path(source) / f"{stem}.txt"
+        yield stem, path.read_text() if path.exists() else ""
+
+
+def txt_to_shard(source: PathLike, shard_path: PathLike,
+                 stems: Optional[Sequence[str]] = None) -> LabelShard:
+    """
+    Pack a YOLO .txt label directory (or zip of one) into a shard file.
+
+    Args:
+        source: Labels directory or .zip archive
+        shard_path: Output shard file
+        stems: Only pack these images, in this order (e.g. one split);
+               all labels sorted by stem by default
+
+    Returns:
+        The written LabelShard
+
+    Raises:
+        ValueError: If a label line does not have exactly 5 columns, or its
+                    class is not an integer that fits the int16 class column
+    """
+    shard_stems, counts, tokens = [], [], []
+    for stem, text in _iter_txt_labels(source, stems):
+        count = 0
+        for number, line in enumerate(text.splitlines(), 1):
+            columns = line.split()
+            if not columns:
+                continue
+            if len(columns) != 5:
+                raise ValueError(f"{source}: line {number} of {stem}.txt has {len(columns)} columns, "
+                                 f"expected 'class x_center y_center w h'")
+            tokens.extend(columns)
+            count += 1
+        shard_stems.append(stem)
+        counts.append(count)
+
+    # Convert every label value with one call
+    values = np.array(tokens, dtype=np.float64).reshape(-1, 5)
+    classes = values[:, 0]
+    int16 = np.iinfo(np.int16)
+    invalid = (classes != np.floor(classes)) | (classes < int16.min) | (classes > int16.max)
+    if invalid.any():
+        raise ValueError(f"{source}: class {tokens[5 * int(np.argmax(invalid))]!r} is not an int16 class id")
+
+    offsets = np.zeros(len(shard_stems) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    shard = LabelShard(shard_stems, offsets, classes.astype(np.int16), values[:, 1:])
+    write_label_shard(shard_path, shard)
+    return shard
+
+
+def shard_to_txt(shard: Union[LabelShard, PathLike], labels_dir: PathLike,
+                 float_format: str = "%.6f", max_workers: int = 8) -> List[str]:
+    """
+    Unpack a shard into a YOLO .txt label directory.
+
+    Boxes are stored as float32, so labels written with six decimals (the
+    Ultralytics default) round-trip exactly with the default float_format.
+
+    Args:
+        shard: LabelShard or path to a shard file
+        labels_dir: Output directory
+        float_format: printf-style format for coordinates
+        max_workers: Thread pool size for file writes
+
+    Returns:
+        Paths of the written label files
+    """
+    if not isinstance(shard, LabelShard):
+        shard = read_label_shard(shard)
+
+    lines = format_label_lines(shard.classes.tolist(), shard.boxes.astype(np.float64), float_format)
+    offsets = shard.offsets.tolist()
+    texts = ["".join(lines[offsets[i]:offsets[i + 1]]) for i in range(len(shard))]
+
+    os.makedirs(labels_dir, exist_ok=True)
+    paths = [os.path.join(labels_dir, f"{stem}.txt") for stem in shard.stems]
+    write_label_files(paths, texts, max_workers=max_workers)
+    return paths
@@ -0,0 +1,181 @@
+"""
+Per-image and per-split YOLO label statistics.
+
+The statistics (label count, per-class counts and a box-area histogram per
+image) are recomputed from the COCO annotations the label files were written
+from, in a separate vectorized pass rather than collected by the converter
+itself. They therefore describe every image of a split, including labels an
+incremental build left unchanged, and never re-read the label files. They
+are written as CSV, as a NumPy ``.npz`` and, when ``pyarrow`` is installed,
+as Parquet.
+"""
+
+import csv
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from dataset_stats import DEFAULT_AREA_BINS
+from yolo_labels import annotation_image_rows
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional dependency
+    pyarrow = None
+
+
+PathLike = Union[str, Path]
+
+
+def _column_name(prefix: str, name: str) -> str:
+    return f"{prefix}_{name.replace(' ', '_')}"
+
+
+def _edge_name(edge: float) -> str:
+    return "inf" if np.isinf(edge) else f"{edge:g}"
+
+
+def _area_column_names(edges: np.ndarray) -> List[str]:
+    return [f"area_{_edge_name(lo)}_{_edge_name(hi)}" for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+def label_statistics(images: Sequence[Dict], annotations: Sequence[Dict], num_classes: int,
+                     area_bins: Optional[Sequence[float]] = None) -> Dict[str, np.ndarray]:
+    """
+    Compute label statistics for every image of a batch.
+
+    Args:
+        images: COCO image entries
+        annotations: COCO annotations with 0-based YOLO class ids; ones for
+                     images outside the batch are ignored
+        num_classes: Number of YOLO classes
+        area_bins: Histogram edges for box area in squared pixels
+
+    Returns:
+        Dictionary with 'file_name' (N,), 'num_labels' (N,), 'class_counts'
+        (N, num_classes), 'area_counts' (N, bins) and 'area_bin_edges'
+    """
+    edges = np.asarray(area_bins if area_bins is not None else DEFAULT_AREA_BINS, dtype=np.float64)
+    num_bins = len(edges) - 1
+
+    kept, rows = annotation_image_rows(images, annotations)
+    class_ids = np.array([annotations[i]["category_id"] for i in kept.tolist()], dtype=np.int64)
+    bboxes = np.array([annotations[i]["bbox"] for i in kept.tolist()], dtype=np.float64).reshape(-1, 4)
+    areas = bboxes[:, 2] * bboxes[:, 3]
+
+    num_images = len(images)
+    num_labels = np.bincount(rows, minlength=num_images)
+
+    in_range = (class_ids >= 0) & (class_ids < num_classes)
+    class_counts = np.bincount(rows[in_range] * num_classes + class_ids[in_range],
+                               minlength=num_images * num_classes).reshape(num_images, num_classes)
+
+    # Same binning as np.histogram: half-open bins, the last one closed
+    area_bin = np.clip(np.searchsorted(edges, areas, side='right') - 1, 0, num_bins - 1)
+    binned = (areas >= edges[0]) & (areas <= edges[-1])
+    area_counts = np.bincount(rows[binned] * num_bins + area_bin[binned],
+                              minlength=num_images * num_bins).reshape(num_images, num_bins)
+
+    return {
+        'file_name': np.array([img["file_name"] for img in images], dtype=str),
+        'num_labels': num_labels,
+        'class_counts': class_counts,
+        'area_counts': area_counts,
+        'area_bin_edges': edges,
+    }
+
+
+def split_statistics(stats: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Sum per-image statistics over a split.
+
+    Args:
+        stats: Output of ``label_statistics``
+
+    Returns:
+        Dictionary with 'num_images', 'num_labels', 'class_counts' (num_classes,),
+        'area_counts' (bins,) and 'area_bin_edges'
+    """
+    return {
+        'num_images': np.int64(len(stats['num_labels'])),
+        'num_labels': stats['num_labels'].sum(),
+        'class_counts': stats['class_counts'].sum(axis=0),
+        'area_counts': stats['area_counts'].sum(axis=0),
+        'area_bin_edges': stats['area_bin_edges'],
+    }
+
+
+def statistics_columns(stats: Dict[str, np.ndarray], class_names: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Flatten per-image statistics into named 1-D columns.
+
+    The first two columns, 'image_id' (the file name) and 'num_labels', match
+    the earlier label count CSV.
+    """
+    columns = {'image_id': stats['file_name'], 'num_labels': stats['num_labels']}
+    for code, name in enumerate(class_names):
+        columns[_column_name("num", name)] = stats['class_counts'][:, code]
+    for b, name in enumerate(_area_column_names(stats['area_bin_edges'])):
+        columns[name] = stats['area_counts'][:, b]
+    return columns
+
+
+def write_label_statistics(stats: Dict[str, np.ndarray], class_names: Sequence[str], csv_path: PathLike,
+                           npz_path: Optional[PathLike] = None,
+                           parquet_path: Optional[PathLike] = None) -> List[str]:
+    """
+    Write per-image statistics as CSV, and optionally as .npz and Parquet.
+
+    Parquet is skipped when pyarrow is not installed.
+
+    Args:
+        stats: Output of ``label_statistics``
+        class_names: YOLO class names, in class id order
+        csv_path: Output CSV file
+        npz_path: Output NumPy archive with the raw arrays
+        parquet_path: Output Parquet file
+
+    Returns:
+        Paths of the files written
+    """
+    columns = statistics_columns(stats, class_names)
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(columns))
+        writer.writerows(zip(*(column.tolist() for column in columns.values())))
+    written = [str(csv_path)]
+
+    if npz_path is not None:
+        np.savez(npz_path, class_names=np.array(class_names, dtype=str), **stats)
+        written.append(str(npz_path))
+
+    if parquet_path is not None and pyarrow is not None:
+        table = pyarrow.table({name: column for name, column in columns.items()})
+        pyarrow.parquet.write_table(table, parquet_path)
+        written.append(str(parquet_path))
+
+    return written
+
+
+def write_split_summary(split_stats: Dict[str, Dict[str, np.ndarray]], class_names: Sequence[str],
+                        csv_path: PathLike):
+    """
+    Write one CSV row of totals per split.
+
+    Args:
+        split_stats: {split name: output of ``split_statistics``}
+        class_names: YOLO class names, in class id order
+        csv_path: Output CSV file
+    """
+    totals = list(split_stats.values())
+    edges = totals[0]['area_bin_edges'] if totals else np.asarray(DEFAULT_AREA_BINS, dtype=np.float64)
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["split", "num_images", "num_labels"]
+                        + [_column_name("num", name) for name in class_names]
+                        + _area_column_names(edges))
+        for split, split_totals in split_stats.items():
+            writer.writerow([split, int(split_totals['num_images']), int(split_totals['num_labels'])]
+                            + split_totals['class_counts'].tolist() + split_totals['area_counts'].tolist())
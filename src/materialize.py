@@ -0,0 +1,94 @@
+"""
+Materialize dataset files into output folders without copying bytes when possible.
+
+The preprocessing steps place the same images into several folders (cleaned,
+merged, YOLO train/val, misclassified). ``materialize`` puts a file at its
+destination with one of these strategies:
+
+- ``copy``: full copy with metadata (``shutil.copy2``)
+- ``hardlink``: a second directory entry for the same inode
+- ``reflink``: copy-on-write clone (``FICLONE``; Btrfs, XFS, APFS-like
+  filesystems), so the destination can later be edited safely
+- ``symlink``: a symbolic link to the absolute source path
+
+Link strategies fall back to a copy when the filesystem refuses them (other
+device, unsupported filesystem, no symlink permission). Hardlinked and
+symlinked outputs share data with the source, so they must not be edited in
+place; the pipeline only ever reads, renames or deletes them.
+"""
+
+import os
+import shutil
+from typing import Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+COPY = 'copy'
+HARDLINK = 'hardlink'
+REFLINK = 'reflink'
+SYMLINK = 'symlink'
+MODES = (COPY, HARDLINK, REFLINK, SYMLINK)
+
+# _IOW(0x94, 9, int) from linux/fs.h
+FICLONE = 0x40049409
+
+PathLike = Union[str, os.PathLike]
+
+
+def _remove_existing(dst: PathLike):
+    """Remove a file or link at dst so nothing is written through an old link."""
+    if os.path.lexists(dst):
+        os.remove(dst)
+
+
+def _reflink(src: PathLike, dst: PathLike):
+    """Clone src into dst with the FICLONE ioctl."""
+    if fcntl is None:
+        raise OSError("reflink is not supported on this platform")
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def materialize(src: PathLike, dst: PathLike, mode: str = COPY) -> str:
+    """
+    Place the file src at dst, replacing anything already at dst.
+
+    Args:
+        src: Existing source file
+        dst: Destination file path; its directory must exist
+        mode: One of 'copy', 'hardlink', 'reflink', 'symlink'
+
+    Returns:
+        The strategy actually used, which is 'copy' when a link strategy fell back
+
+    Raises:
+        ValueError: If mode is unknown
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown materialize mode '{mode}', expected one of {MODES}")
+
+    if (mode == HARDLINK and os.path.exists(dst) and not os.path.islink(dst)
+            and os.path.samefile(src, dst)):
+        return HARDLINK  # already linked by an earlier run
+    _remove_existing(dst)
+
+    try:
+        if mode == HARDLINK:
+            os.link(src, dst)
+            return HARDLINK
+        if mode == SYMLINK:
+            os.symlink(os.path.abspath(src), dst)
+            return SYMLINK
+        if mode == REFLINK:
+            _reflink(src, dst)
+            return REFLINK
+    except OSError:
+        _remove_existing(dst)
+
+    shutil.copy2(src, dst)
+    return COPY
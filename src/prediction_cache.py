@@ -0,0 +1,224 @@
+"""
+Persistent cache of YOLO predictions.
+
+Error analysis is rerun whenever the matching threshold, class mapping or
+ground truth changes, but the predictions only depend on the model weights,
+the image and the inference settings. ``PredictionCache`` stores the raw
+detections of every image under a key made of the weights' content hash and
+the settings (conf, classes, imgsz), one compact columnar ``.npz`` per key::
+
+    image_hashes  S40      (num_images,)      SHA-1 of the image bytes
+    offsets       int64    (num_images + 1,)  image i owns rows offsets[i]:offsets[i + 1]
+    xyxy          float32  (num_boxes, 4)     corner boxes in pixels
+    classes       int16    (num_boxes,)       model class ids
+    scores        float32  (num_boxes,)       confidences
+
+Model class ids are cached before any class mapping, so remapping never
+invalidates the cache. Image hashes are remembered per (file, size, mtime),
+so unchanged files are not re-read on later runs.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from annotation_cache import file_digest
+from coco_stream import iter_chunks
+from prediction_stream import PredictionRecord, make_record, result_arrays
+
+
+# Bump when the on-disk layout changes so stale caches are ignored
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = ".prediction_cache"
+IMAGE_SUFFIXES = {".bmp", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp"}
+# predict arguments whose outputs (annotated images, .txt predictions, crops)
+# only exist if the model actually runs on an image
+SAVE_ARGUMENTS = ("save", "save_txt", "save_crop")
+
+PathLike = Union[str, Path]
+Detections = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def list_images(images_dir: PathLike) -> List[str]:
+    """Image files of a directory, sorted by name like Ultralytics' directory loader."""
+    return sorted(os.path.join(images_dir, name) for name in os.listdir(images_dir)
+                  if os.path.splitext(name)[1].lower() in IMAGE_SUFFIXES)
+
+
+class PredictionCache:
+    """
+    Cached detections for one model and one set of inference settings.
+    """
+
+    def __init__(self, weights: PathLike, conf: float, classes: Optional[Sequence[int]] = None,
+                 imgsz: int = 640, cache_dir: PathLike = DEFAULT_CACHE_DIR):
+        """
+        Open (or start) the cache for a model and inference settings.
+
+        Args:
+            weights: Model weights file; its contents are part of the key
+            conf: Confidence threshold passed to predict
+            classes: Model class filter passed to predict
+            imgsz: Inference image size passed to predict
+            cache_dir: Directory holding the cache files
+        """
+        self.conf = conf
+        self.classes = None if classes is None else [int(cls) for cls in classes]
+        self.imgsz = imgsz
+        self.settings = {
+            "version": CACHE_VERSION,
+            "weights": file_digest(weights),
+            "conf": conf,
+            "classes": self.classes,
+            "imgsz": imgsz,
+        }
+        self.key = hashlib.sha1(json.dumps(self.settings, sort_keys=True).encode()).hexdigest()[:16]
+        self.path = Path(cache_dir) / f"predictions-{self.key}.npz"
+
+        self._entries: Dict[str, Detections] = {}
+        self._fingerprints: Dict[Tuple[str, int, int], str] = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        if self.path.exists():
+            self._load()
+
+    def _load(self):
+        with np.load(self.path, allow_pickle=False) as data:
+            if int(data["version"]) != CACHE_VERSION:
+                return
+            hashes = data["image_hashes"].astype(str).tolist()
+            offsets = data["offsets"].tolist()
+            xyxy, classes, scores = data["xyxy"], data["classes"], data["scores"]
+            for i, image_hash in enumerate(hashes):
+                start, end = offsets[i], offsets[i + 1]
+                self._entries[image_hash] = (xyxy[start:end], classes[start:end].astype(np.int64),
+                                             scores[start:end])
+            for name, size, mtime, image_hash in zip(data["fp_names"].tolist(), data["fp_sizes"].tolist(),
+                                                     data["fp_mtimes"].tolist(),
+                                                     data["fp_hashes"].astype(str).tolist()):
+                self._fingerprints[(name, size, mtime)] = image_hash
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def image_hash(self, path: PathLike) -> str:
+        """
+        SHA-1 of an image file, reused while its size and mtime are unchanged.
+
+        Args:
+            path: Image file
+
+        Returns:
+            Hex digest
+        """
+        stat = os.stat(path)
+        fingerprint = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        image_hash = self._fingerprints.get(fingerprint)
+        if image_hash is None:
+            image_hash = file_digest(path)
+            self._fingerprints[fingerprint] = image_hash
+            self._dirty = True
+        return image_hash
+
+    def get(self, image_hash: str) -> Optional[Detections]:
+        """Cached (xyxy, model_classes, scores) of an image, or None."""
+        return self._entries.get(image_hash)
+
+    def put(self, image_hash: str, xyxy: np.ndarray, model_classes: np.ndarray, scores: np.ndarray):
+        """Store the detections of an image."""
+        self._entries[image_hash] = (np.asarray(xyxy, dtype=np.float32).reshape(-1, 4),
+                                     np.asarray(model_classes, dtype=np.int64).reshape(-1),
+                                     np.asarray(scores, dtype=np.float32).reshape(-1))
+        self._dirty = True
+
+    def save(self):
+        """Write the cache file atomically, if anything changed since it was loaded."""
+        if not self._dirty:
+            return
+        hashes = list(self._entries)
+        # A leading empty entry keeps the concatenations typed when the cache is empty
+        empty = (np.empty((0, 4), np.float32), np.empty(0, np.int64), np.empty(0, np.float32))
+        entries = [empty] + [self._entries[image_hash] for image_hash in hashes]
+        offsets = np.zeros(len(hashes) + 1, dtype=np.int64)
+        np.cumsum([len(classes) for _, classes, _ in entries[1:]], out=offsets[1:])
+        fingerprints = list(self._fingerprints.items())
+
+        arrays = {
+            "version": np.int64(CACHE_VERSION),
+            "settings": np.array(json.dumps(self.settings, sort_keys=True)),
+            "image_hashes": np.array(hashes, dtype="S40"),
+            "offsets": offsets,
+            "xyxy": np.concatenate([xyxy for xyxy, _, _ in entries]),
+            "classes": np.concatenate([classes for _, classes, _ in entries]).astype(np.int16),
+            "scores": np.concatenate([scores for _, _, scores in entries]),
+            "fp_names": np.array([name for (name, _, _), _ in fingerprints], dtype=str),
+            "fp_sizes": np.array([size for (_, size, _), _ in fingerprints], dtype=np.int64),
+            "fp_mtimes": np.array([mtime for (_, _, mtime), _ in fingerprints], dtype=np.int64),
+            "fp_hashes": np.array([image_hash for _, image_hash in fingerprints], dtype="S40"),
+        }
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".predictions-", suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._dirty = False
+
+
+def cached_prediction_records(model, image_paths: Sequence[PathLike], cache: PredictionCache,
+                              class_map: Dict[int, int], chunk_size: int = 32,
+                              **predict_kwargs) -> Iterator[PredictionRecord]:
+    """
+    Yield prediction records, running the model only on uncached images.
+
+    Images are handled chunk_size at a time: the cache misses of a chunk go
+    through one streaming ``model.predict`` call with the cache's conf,
+    classes and imgsz, their detections are added to the cache, and the
+    chunk's records are yielded in image order. The cache is saved at the
+    end (and on interruption), so finished images are never predicted twice.
+
+    Saved outputs only come from inference, so when predict_kwargs asks for
+    any (save, save_txt or save_crop) every image is predicted and its cache
+    entry refreshed; a cache hit would otherwise silently leave it without
+    outputs.
+
+    Args:
+        model: ``ultralytics.YOLO`` model whose weights the cache was keyed on
+        image_paths: Images to predict, e.g. ``list_images(images_dir)``
+        cache: Prediction cache
+        class_map: Model class id -> dataset class id
+        chunk_size: Images per predict call
+        **predict_kwargs: Extra predict arguments, e.g. save=True
+
+    Yields:
+        One record per image, in the order of image_paths
+    """
+    refresh = any(predict_kwargs.get(name) for name in SAVE_ARGUMENTS)
+    try:
+        for chunk in iter_chunks(image_paths, chunk_size):
+            hashes = [cache.image_hash(path) for path in chunk]
+            missing = {os.path.abspath(path): image_hash for path, image_hash in zip(chunk, hashes)
+                       if refresh or cache.get(image_hash) is None}
+            cache.hits += len(chunk) - len(missing)
+            cache.misses += len(missing)
+
+            if missing:
+                results = model.predict(source=list(missing), conf=cache.conf, classes=cache.classes,
+                                        imgsz=cache.imgsz, stream=True, **predict_kwargs)
+                for result in results:
+                    cache.put(missing[os.path.abspath(result.path)], *result_arrays(result))
+
+            for path, image_hash in zip(chunk, hashes):
+                yield make_record(os.path.basename(path), *cache.get(image_hash), class_map)
+    finally:
+        cache.save()
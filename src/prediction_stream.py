@@ -0,0 +1,157 @@
+"""
+Streaming error mining over YOLO predictions.
+
+``model.predict(..., stream=True)`` yields one ``Results`` object (with its
+original image and tensors) at a time instead of returning them all in a
+list. ``prediction_records`` reduces each result to its file name, boxes,
+classes and scores as soon as it arrives, so the result can be released, and
+``iter_error_rows`` matches the records against ground truth in small
+batches, yielding report rows while inference is still running.
+"""
+
+import os
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from box_ops import batched_iou, greedy_match
+from coco_stream import iter_chunks
+from image_index import ImageIndex
+
+
+WRONG_CLASS = "Wrong Class"
+MISSED_DETECTION = "Missed Detection"
+MISSING_ANNOTATION = "Missing Annotation"
+
+# (file name, (K, 4) float64 COCO xywh boxes, (K,) class ids, (K,) scores)
+PredictionRecord = Tuple[str, np.ndarray, np.ndarray, np.ndarray]
+
+
+def result_arrays(result) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Copy the raw detections out of one Ultralytics result.
+
+    Args:
+        result: ``ultralytics.engine.results.Results``
+
+    Returns:
+        Tuple (xyxy, model_classes, scores): (K, 4) float32 corner boxes in
+        pixels, (K,) int64 model class ids and (K,) float32 confidences
+    """
+    boxes = result.boxes
+    return (boxes.xyxy.cpu().numpy().astype(np.float32).reshape(-1, 4),
+            boxes.cls.cpu().numpy().astype(np.int64).reshape(-1),
+            boxes.conf.cpu().numpy().astype(np.float32).reshape(-1))
+
+
+def make_record(file_name: str, xyxy: np.ndarray, model_classes: np.ndarray, scores: np.ndarray,
+                class_map: Dict[int, int]) -> PredictionRecord:
+    """
+    Build a prediction record from raw detections.
+
+    Args:
+        file_name: Image file name
+        xyxy: (K, 4) float32 corner boxes
+        model_classes: (K,) model class ids
+        scores: (K,) confidences
+        class_map: Model class id -> dataset class id; other classes are dropped
+
+    Returns:
+        Tuple (file_name, boxes, classes, scores)
+    """
+    keep = np.array([cls in class_map for cls in model_classes.tolist()], dtype=bool)
+
+    # Widths/heights are taken in the model's float32, like float(x2 - x1)
+    xyxy = xyxy[keep]
+    boxes = np.column_stack([xyxy[:, 0], xyxy[:, 1], xyxy[:, 2] - xyxy[:, 0],
+                             xyxy[:, 3] - xyxy[:, 1]]).astype(np.float64).reshape(-1, 4)
+    classes = np.array([class_map[cls] for cls in model_classes[keep].tolist()], dtype=np.int64)
+    return file_name, boxes, classes, scores[keep].astype(np.float64)
+
+
+def prediction_record(result, class_map: Dict[int, int]) -> PredictionRecord:
+    """
+    Extract the boxes of one Ultralytics result.
+
+    Args:
+        result: ``ultralytics.engine.results.Results``
+        class_map: Model class id -> dataset class id; other classes are dropped
+
+    Returns:
+        Tuple (file_name, boxes, classes, scores)
+    """
+    return make_record(os.path.basename(result.path), *result_arrays(result), class_map)
+
+
+def prediction_records(results: Iterable, class_map: Dict[int, int]) -> Iterator[PredictionRecord]:
+    """
+    Turn a stream of Ultralytics results into compact prediction records.
+
+    Each result is dropped as soon as its record is built, so memory does not
+    grow with the number of images when ``results`` is a generator.
+
+    Args:
+        results: Output of ``model.predict(..., stream=True)``
+        class_map: Model class id -> dataset class id
+
+    Yields:
+        One record per result, in prediction order
+    """
+    for result in results:
+        yield prediction_record(result, class_map)
+
+
+def iter_error_rows(records: Iterable[PredictionRecord], gt_index: ImageIndex, iou_threshold: float,
+                    class_names: Union[Sequence[str], Dict[int, str]], first_only: bool = True,
+                    report_missed: bool = True, chunk_size: int = 32) -> Iterator[Tuple[int, List]]:
+    """
+    Compare prediction records with ground truth and yield error report rows.
+
+    Records are matched chunk_size images at a time: the IoU matrices of a
+    chunk come from one ``batched_iou`` call, then ``greedy_match`` pairs
+    each ground truth box with predictions of IoU >= iou_threshold.
+
+    Args:
+        records: Prediction records; ones for unknown images are skipped
+        gt_index: Ground truth images and annotations
+        iou_threshold: Minimum IoU for a match
+        class_names: Class id -> name, for the report
+        first_only: Match at most one prediction per ground truth box
+        report_missed: Report ground truth boxes without a match
+        chunk_size: Images matched per batch
+
+    Yields:
+        Tuples (image_id, row) with row [file_name, reason, ground truth
+        class, predicted class, IoU], in record order
+    """
+    for chunk in iter_chunks(records, chunk_size):
+        images, gt_boxes, pred_boxes = [], [], []
+        gt_offsets, pred_offsets = [0], [0]
+        for file_name, boxes, classes, _ in chunk:
+            image_id = gt_index.image_id(file_name)
+            if image_id is None:
+                continue
+            gt_anns = gt_index.image_annotations(image_id)
+            gt_boxes.extend(ann["bbox"] for ann in gt_anns)
+            gt_offsets.append(len(gt_boxes))
+            pred_boxes.append(boxes)
+            pred_offsets.append(pred_offsets[-1] + len(boxes))
+            images.append((image_id, file_name, [ann["category_id"] for ann in gt_anns], classes.tolist()))
+
+        pred_boxes = np.concatenate(pred_boxes) if pred_boxes else np.empty((0, 4))
+        image_ious = batched_iou(gt_boxes, gt_offsets, pred_boxes, pred_offsets)
+
+        for (image_id, file_name, gt_classes, pred_classes), ious in zip(images, image_ious):
+            gt_matches, unmatched_preds = greedy_match(ious, iou_threshold, first_only)
+
+            for g, (gt_cls, matched_preds) in enumerate(zip(gt_classes, gt_matches)):
+                if report_missed and not matched_preds:
+                    yield image_id, [file_name, MISSED_DETECTION, class_names[gt_cls], "None", 0.0]
+                for i in matched_preds:
+                    if pred_classes[i] != gt_cls:
+                        yield image_id, [file_name, WRONG_CLASS, class_names[gt_cls],
+                                         class_names[pred_classes[i]], round(float(ious[g, i]), 3)]
+
+            # Predictions not matched to any GT object
+            for i in unmatched_preds:
+                yield image_id, [file_name, MISSING_ANNOTATION, "None", class_names[pred_classes[i]], 0.0]
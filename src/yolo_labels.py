@@ -0,0 +1,225 @@
+"""
+Bulk COCO -> YOLO label conversion.
+
+All annotation boxes are normalized in one array operation using the image
+sizes already known from the COCO entries, the label lines of a whole batch
+are produced by a single formatting call, and the per-image ``.txt`` files are
+written from a thread pool (or packed into one zip archive).
+"""
+
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from annotation_store import csr_index
+from image_utils import read_image_size
+
+
+# "%r" reproduces f"{value}" for floats, i.e. the shortest round-trip repr
+REPR_FORMAT = "%r"
+
+
+def coco_to_yolo_boxes(bboxes: np.ndarray, widths: np.ndarray, heights: np.ndarray) -> np.ndarray:
+    """
+    Convert COCO [x_min, y_min, w, h] pixel boxes to normalized YOLO boxes.
+
+    Args:
+        bboxes: (N, 4) COCO boxes
+        widths: (N,) width of each box's image
+        heights: (N,) height of each box's image
+
+    Returns:
+        (N, 4) float64 array of [x_center, y_center, w, h] in 0-1
+    """
+    x, y, w, h = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4).T
+    # Same operation order as the scalar conversion, so values are bit-identical
+    return np.column_stack([(x + w / 2) / widths, (y + h / 2) / heights, w / widths, h / heights])
+
+
+def format_label_lines(class_ids: Sequence[int], boxes: np.ndarray,
+                       float_format: str = REPR_FORMAT) -> List[str]:
+    """
+    Format YOLO label lines, "class x_center y_center w h\\n", for a batch of boxes.
+
+    Args:
+        class_ids: (N,) class id of each box
+        boxes: (N, 4) normalized YOLO boxes
+        float_format: printf-style format for each coordinate, e.g. "%.6f"
+
+    Returns:
+        List of N lines, each ending with a newline
+    """
+    n = len(boxes)
+    if n == 0:
+        return []
+    line_format = "%d" + (" " + float_format) * 4 + "\n"
+    values = np.empty((n, 5), dtype=object)
+    values[:, 0] = np.asarray(class_ids).tolist()
+    values[:, 1:] = np.asarray(boxes).tolist()
+    return ((line_format * n) % tuple(values.ravel().tolist())).splitlines(keepends=True)
+
+
+def image_sizes(images: Sequence[Dict], images_dir: Optional[Union[str, Path]] = None) -> np.ndarray:
+    """
+    Collect (width, height) for COCO image entries.
+
+    Sizes come from the entries' 'width'/'height'; entries without them are
+    read from the image header in images_dir.
+
+    Returns:
+        (N, 2) float64 array
+    """
+    sizes = np.empty((len(images), 2), dtype=np.float64)
+    for i, img in enumerate(images):
+        if "width" in img and "height" in img:
+            sizes[i] = img["width"], img["height"]
+        elif images_dir is not None:
+            sizes[i] = read_image_size(os.path.join(images_dir, img["file_name"]))
+        else:
+            raise KeyError(f"No size for image {img['id']} and no images_dir to read it from")
+    return sizes
+
+
+def annotation_image_rows(images: Sequence[Dict],
+                          annotations: Sequence[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Join annotations to the images of a batch by image id.
+
+    Args:
+        images: COCO image entries
+        annotations: COCO annotations
+
+    Returns:
+        Tuple (kept, rows): indices of the annotations whose image is in the
+        batch, in annotation order, and the image row of each
+    """
+    image_ids = np.array([img["id"] for img in images], dtype=np.int64)
+    ann_image_ids = np.array([ann["image_id"] for ann in annotations], dtype=np.int64)
+
+    order = np.argsort(image_ids, kind='stable')
+    pos = np.searchsorted(image_ids[order], ann_image_ids)
+    found = pos < len(images)
+    found[found] = image_ids[order][pos[found]] == ann_image_ids[found]
+    kept = np.flatnonzero(found)
+    return kept, order[pos[kept]]
+
+
+def yolo_label_texts(images: Sequence[Dict], annotations: Sequence[Dict],
+                     sizes: Optional[np.ndarray] = None,
+                     float_format: str = REPR_FORMAT) -> List[str]:
+    """
+    Build the YOLO label file contents of a batch of images.
+
+    Args:
+        images: COCO image entries
+        annotations: COCO annotations; ones for images outside the batch are ignored
+        sizes: (N, 2) image (width, height); defaults to the entries' sizes
+        float_format: printf-style format for coordinates
+
+    Returns:
+        One string per image, in the order of images; images without
+        annotations get an empty string
+    """
+    if sizes is None:
+        sizes = image_sizes(images)
+
+    kept, rows = annotation_image_rows(images, annotations)
+    bboxes = np.array([annotations[i]["bbox"] for i in kept.tolist()], dtype=np.float64).reshape(-1, 4)
+    class_ids = [annotations[i]["category_id"] for i in kept.tolist()]
+    boxes = coco_to_yolo_boxes(bboxes, sizes[rows, 0], sizes[rows, 1])
+    lines = format_label_lines(class_ids, boxes, float_format)
+
+    # Group lines by image, keeping annotation order within an image
+    offsets, line_order = csr_index(rows, len(images))
+    line_order = line_order.tolist()
+    return ["".join(lines[j] for j in line_order[offsets[i]:offsets[i + 1]])
+            for i in range(len(images))]
+
+
+def label_file_name(file_name: str) -> str:
+    """Label file name for an image file name (same stem, .txt)."""
+    return Path(file_name).stem + ".txt"
+
+
+def _write_texts(items: Sequence[Tuple[str, str]]):
+    """Write a chunk of (path, text) pairs."""
+    for path, text in items:
+        with open(path, "w") as f:
+            f.write(text)
+
+
+def write_label_files(paths: Sequence[Union[str, Path]], texts: Sequence[str],
+                      max_workers: Optional[int] = 8, chunk_size: int = 256):
+    """
+    Write label files from a thread pool.
+
+    Args:
+        paths: Output path of every label file
+        texts: Contents of every label file
+        max_workers: Pool size; 1 writes serially
+        chunk_size: Number of files written per pool task
+    """
+    items = list(zip(map(str, paths), texts))
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    if max_workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            _write_texts(chunk)
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # list() re-raises the first write error
+        list(executor.map(_write_texts, chunks))
+
+
+def write_label_archive(archive_path: Union[str, Path], names: Sequence[str], texts: Sequence[str],
+                        compression: int = zipfile.ZIP_DEFLATED):
+    """
+    Pack label files into one zip archive instead of many small files.
+
+    Args:
+        archive_path: Output .zip path
+        names: Member name of every label file, e.g. "labels/img_001.txt"
+        texts: Contents of every label file
+        compression: zipfile compression method
+    """
+    with zipfile.ZipFile(archive_path, "w", compression=compression) as archive:
+        for name, text in zip(names, texts):
+            archive.writestr(name, text)
+
+
+def convert_coco_to_yolo(images: Sequence[Dict], annotations: Sequence[Dict],
+                         labels_dir: Union[str, Path], images_dir: Optional[Union[str, Path]] = None,
+                         float_format: str = REPR_FORMAT, archive_path: Optional[Union[str, Path]] = None,
+                         max_workers: Optional[int] = 8) -> List[str]:
+    """
+    Convert COCO annotations to YOLO label files in one batch.
+
+    Args:
+        images: COCO image entries to write labels for
+        annotations: COCO annotations with 0-based YOLO class ids
+        labels_dir: Directory for the .txt files, or the member prefix inside
+                    the archive when archive_path is given
+        images_dir: Where to read sizes of entries lacking width/height
+        float_format: printf-style format for coordinates; the default keeps
+                      full precision, "%.6f" matches Ultralytics' own export
+        archive_path: Write one zip archive here instead of individual files
+        max_workers: Thread pool size for file writes
+
+    Returns:
+        Paths (or archive member names) of the label files, in the order of images
+    """
+    texts = yolo_label_texts(images, annotations, image_sizes(images, images_dir), float_format)
+    names = [label_file_name(img["file_name"]) for img in images]
+
+    if archive_path is not None:
+        members = [f"{Path(labels_dir).as_posix()}/{name}" for name in names]
+        write_label_archive(archive_path, members, texts)
+        return members
+
+    os.makedirs(labels_dir, exist_ok=True)
+    paths = [os.path.join(labels_dir, name) for name in names]
+    write_label_files(paths, texts, max_workers=max_workers)
+    return paths
@@ -0,0 +1,64 @@
+"""
+Shared pytest setup.
+
+The modules under src/ import each other as top-level modules (the scripts
+put src/ on sys.path), so the tests do the same.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+# Small real COCO export shipped with the repo
+SAMPLE_COCO = REPO_ROOT / "instances_default_first.json"
+
+
+@pytest.fixture
+def coco_data():
+    """The sample COCO dataset, freshly loaded for each test."""
+    with open(SAMPLE_COCO) as f:
+        return json.load(f)
+
+
+class _Tensor:
+    """Stands in for a torch tensor: only ``.cpu().numpy()`` is used."""
+
+    def __init__(self, array):
+        self.array = np.asarray(array)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class _Boxes:
+    def __init__(self, xyxy, cls, conf):
+        self.xyxy = _Tensor(np.asarray(xyxy, dtype=np.float32).reshape(-1, 4))
+        self.cls = _Tensor(np.asarray(cls, dtype=np.float32))
+        self.conf = _Tensor(np.asarray(conf, dtype=np.float32))
+
+    def __iter__(self):
+        # Like Ultralytics, iterating yields one single-box Boxes per detection
+        for i in range(len(self.cls.array)):
+            yield _Boxes(self.xyxy.array[i:i + 1], self.cls.array[i:i + 1], self.conf.array[i:i + 1])
+
+
+class _Result:
+    def __init__(self, path, xyxy, cls, conf):
+        self.path = path
+        self.boxes = _Boxes(xyxy, cls, conf)
+
+
+@pytest.fixture
+def make_result():
+    """Factory for minimal Ultralytics-like results: make_result(path, xyxy, cls, conf)."""
+    return _Result
@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import annotation_cache
+from annotation_cache import cache_key, load_indexes, save_indexes
+from annotation_store import AnnotationStore
+from context_index import ContextIndex
+from dataset_loader import BTTDatasetLoader
+from label_index import LabelIndex
+
+
+@pytest.fixture
+def coco_path(tmp_path, coco_data):
+    path = tmp_path / "set_a" / "coco.json"
+    (path.parent / "images").mkdir(parents=True)
+    path.write_text(json.dumps(coco_data))
+    return path
+
+
+def touch(path, offset_ns):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset_ns))
+
+
+@pytest.mark.parametrize("hash_contents", [False, True])
+def test_key_is_stable_for_unchanged_file(coco_path, hash_contents):
+    assert cache_key(coco_path, hash_contents) == cache_key(coco_path, hash_contents)
+
+
+@pytest.mark.parametrize("hash_contents", [False, True])
+def test_key_changes_with_size(coco_path, hash_contents):
+    before = cache_key(coco_path, hash_contents)
+    coco_path.write_text(coco_path.read_text() + " ")
+    assert cache_key(coco_path, hash_contents) != before
+
+
+def test_mtime_key_changes_on_touch(coco_path):
+    before = cache_key(coco_path)
+    touch(coco_path, 10 ** 9)
+    assert cache_key(coco_path) != before
+
+
+def test_content_key_survives_copies_and_touches(coco_path, tmp_path):
+    before = cache_key(coco_path, hash_contents=True)
+    copy = tmp_path / "copy.json"
+    shutil.copyfile(coco_path, copy)
+    touch(copy, 5 * 10 ** 9)
+    assert cache_key(copy, hash_contents=True) == before
+
+
+def test_content_key_catches_same_size_edits(coco_path):
+    before = cache_key(coco_path, hash_contents=True)
+    stat = os.stat(coco_path)
+    text = coco_path.read_text()
+    coco_path.write_text(text.replace('"potted plant"', '"potted_plant"', 1))
+    os.utime(coco_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(coco_path).st_size == stat.st_size
+    assert cache_key(coco_path, hash_contents=True) != before
+
+
+def test_key_changes_with_cache_version(coco_path, monkeypatch):
+    before = cache_key(coco_path)
+    monkeypatch.setattr(annotation_cache, "CACHE_VERSION", annotation_cache.CACHE_VERSION + 1)
+    assert cache_key(coco_path) != before
+
+
+def test_save_and_load_round_trip(tmp_path, coco_data):
+    store = AnnotationStore.from_coco(coco_data)
+    context_index = ContextIndex.from_images({"contexts": {"scene": ["kitchen"], "occlusion": []}}
+                                             for _ in coco_data["images"])
+    label_index = LabelIndex.from_images({"labels": ["cup", "cup"]} for _ in coco_data["images"])
+    save_indexes(tmp_path / "cache" / "key", store, context_index, label_index)
+
+    loaded_store, loaded_context, loaded_labels = load_indexes(tmp_path / "cache" / "key")
+    for name in store.ARRAY_FIELDS:
+        np.testing.assert_array_equal(getattr(loaded_store, name), getattr(store, name))
+    assert loaded_store.file_names == store.file_names
+    assert loaded_context.query({"scene": ["kitchen"]}).tolist() == context_index.query({"scene": ["kitchen"]}).tolist()
+    assert loaded_context.types == ["scene", "occlusion"]
+    np.testing.assert_array_equal(loaded_labels.matrix, label_index.matrix)
+    assert loaded_labels.occurrence_counts() == {"cup": 2 * len(coco_data["images"])}
+    assert load_indexes(tmp_path / "cache" / "missing") is None
+
+
+@pytest.mark.parametrize("cache_hash", [False, True])
+def test_loader_rebuilds_after_coco_json_changes(coco_path, coco_data, cache_hash):
+    root = coco_path.parent.parent
+    store = BTTDatasetLoader(root, cache=True, cache_hash=cache_hash).get_annotation_store("set_a")
+    assert store.num_images == len(coco_data["images"])
+    assert len(list((coco_path.parent / ".coco_cache").iterdir())) == 1
+
+    coco_data["images"] = coco_data["images"][:5]
+    coco_path.write_text(json.dumps(coco_data))
+    touch(coco_path, 10 ** 9)
+    assert BTTDatasetLoader(root, cache=True, cache_hash=cache_hash).get_annotation_store("set_a").num_images == 5
+    # The stale key was replaced, not kept next to the new one
+    assert len(list((coco_path.parent / ".coco_cache").iterdir())) == 1
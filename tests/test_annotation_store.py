@@ -0,0 +1,48 @@
+import numpy as np
+
+from annotation_store import AnnotationStore, csr_index
+
+
+def test_csr_index_groups_rows_in_order():
+    offsets, rows = csr_index(np.array([2, 0, -1, 2, 0]), 3)
+    assert offsets.tolist() == [0, 2, 2, 4]
+    assert rows.tolist() == [1, 4, 0, 3]
+
+
+def test_matches_dict_walks(coco_data):
+    store = AnnotationStore.from_coco(coco_data)
+    assert store.num_images == len(coco_data["images"])
+    assert store.num_annotations == len(coco_data["annotations"])
+
+    for img in coco_data["images"]:
+        expected = [ann["id"] for ann in coco_data["annotations"] if ann["image_id"] == img["id"]]
+        assert store.ann_ids[store.annotations_for_image(img["id"])].tolist() == expected
+
+    for cat in coco_data["categories"]:
+        expected = [ann["id"] for ann in coco_data["annotations"] if ann["category_id"] == cat["id"]]
+        assert store.ann_ids[store.annotations_for_category(cat["id"])].tolist() == expected
+
+    np.testing.assert_array_equal(store.ann_bboxes, [ann["bbox"] for ann in coco_data["annotations"]])
+    assert store.annotations_for_image(-5).size == 0
+
+
+def test_image_entry_round_trips_sizes(coco_data):
+    store = AnnotationStore.from_coco(coco_data)
+    for row, img in enumerate(coco_data["images"]):
+        entry = store.image_entry(row)
+        assert (entry["id"], entry["file_name"], entry["width"], entry["height"]) == \
+            (img["id"], img["file_name"], img["width"], img["height"])
+
+
+def test_float_sizes_and_short_bboxes():
+    store = AnnotationStore.from_records(
+        images=[{"id": 1, "width": 640.0, "height": 480.5}, {"id": 2}],
+        annotations=[{"id": 10, "image_id": 1, "category_id": 1, "bbox": [1, 2]},
+                     {"id": 11, "image_id": 2, "category_id": 1, "bbox": [5, 6, 7, 8]}],
+        categories=[{"id": 1, "name": "cup"}])
+
+    assert store.image_entry(0)["width"] == 640 and store.image_entry(0)["height"] == 480.5
+    assert store.image_entry(1)["width"] == 0
+    # The short box is padded, so the next annotation keeps its own row
+    assert store.ann_bboxes.tolist() == [[1, 2, 0, 0], [5, 6, 7, 8]]
+    assert store.annotation_counts_per_category() == {"cup": 2}
@@ -0,0 +1,97 @@
+import copy
+import random
+
+import pytest
+
+from annotation_validation import validate_annotations
+from class_mapping import ClassMapping
+
+CANONICAL_CLASSES = ["potted plant", "chair", "cup", "vase", "book"]
+BASELINE_MAPPING = {
+    "##ted": "potted plant",
+    "pot plant": "potted plant",
+    "cup vase": "vase",
+    "pot": "potted plant",
+    "vase potted plant": "potted plant"
+}
+CATEGORY_NAMES = ["potted plant", "chair", "cup", "vase", "book", "##ted", "pot plant",
+                  "cup vase", "pot", "vase potted plant", "sofa", "Chair"]
+
+
+def baseline_validate(annotations, image_id_to_info, category_id_to_name):
+    """The per-annotation cleaning loop of data-preprocessing.py Part A."""
+    name_to_new_id = {cls: i for i, cls in enumerate(CANONICAL_CLASSES)}
+    valid_annotations = []
+    valid_image_ids = set()
+    dropped_rows = []
+    for ann in annotations:
+        image_id = ann["image_id"]
+        if image_id not in image_id_to_info:
+            dropped_rows.append(["Missing image", image_id, ann["id"], ann.get("bbox", "")])
+            continue
+        info = image_id_to_info[image_id]
+        img_w, img_h = info["width"], info["height"]
+        x, y, w, h = ann["bbox"]
+        if w <= 0 or h <= 0:
+            dropped_rows.append(["Zero/negative box", image_id, ann["id"], ann["bbox"]])
+            continue
+        x = max(0, min(x, img_w))
+        y = max(0, min(y, img_h))
+        w = max(1, min(w, img_w - x))
+        h = max(1, min(h, img_h - y))
+        if w <= 0 or h <= 0:
+            dropped_rows.append(["Box outside image after clipping", image_id, ann["id"], [x, y, w, h]])
+            continue
+        class_name = category_id_to_name.get(ann["category_id"], "Unknown")
+        mapped_class = BASELINE_MAPPING.get(class_name, class_name)
+        if mapped_class not in CANONICAL_CLASSES:
+            dropped_rows.append(["Unmapped class", image_id, ann["id"], class_name])
+            continue
+        ann["category_id"] = name_to_new_id[mapped_class]
+        ann["bbox"] = [x, y, w, h]
+        valid_annotations.append(ann)
+        valid_image_ids.add(image_id)
+    return valid_annotations, valid_image_ids, dropped_rows
+
+
+def make_annotations(seed, count=2000):
+    rng = random.Random(seed)
+    values = [0, 1, 5, 100, 0.5, 37.25, 511.9, 512, 600, -3, -0.5, 1e-9]
+    return [{"id": i, "image_id": rng.randint(0, 30), "category_id": rng.randint(-1, len(CATEGORY_NAMES)),
+             "bbox": [rng.choice(values) if rng.random() < 0.5 else rng.uniform(-50, 700)
+                      for _ in range(4)]}
+            for i in range(count)]
+
+
+def typed(value):
+    """Compare values including int vs float, as json.dump writes them differently."""
+    if isinstance(value, list):
+        return [typed(v) for v in value]
+    if isinstance(value, dict):
+        return {k: typed(v) for k, v in value.items()}
+    return type(value).__name__, value
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_validate_annotations_matches_cleaning_loop(seed):
+    rng = random.Random(seed)
+    image_id_to_info = {i: {"width": rng.choice([512, 640, 300.0]), "height": rng.choice([512, 480])}
+                        for i in range(25) if i != 3}
+    category_id_to_name = dict(enumerate(CATEGORY_NAMES))
+    annotations = make_annotations(seed)
+
+    # Plain dictionary lookups, as in the loop
+    mapping = ClassMapping(CANONICAL_CLASSES, BASELINE_MAPPING, lowercase=False,
+                           collapse_whitespace=False, wordpieces=False)
+    result = validate_annotations(copy.deepcopy(annotations), image_id_to_info, category_id_to_name, mapping)
+    expected = baseline_validate(copy.deepcopy(annotations), image_id_to_info, category_id_to_name)
+
+    assert typed(result[0]) == typed(expected[0])
+    assert result[1] == expected[1]
+    assert typed(result[2]) == typed(expected[2])
+    assert {row[0] for row in result[2]} >= {"Missing image", "Zero/negative box", "Unmapped class"}
+
+
+def test_validate_annotations_without_annotations():
+    mapping = ClassMapping(CANONICAL_CLASSES)
+    assert validate_annotations([], {1: {"width": 5, "height": 5}}, {}, mapping) == ([], set(), [])
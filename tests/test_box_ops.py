@@ -0,0 +1,119 @@
+import random
+
+import numpy as np
+import pytest
+
+from box_ops import XYXY, batched_iou, greedy_match, iou_matrix, padded_iou
+
+
+def scalar_iou(boxA, boxB):
+    """The scalar helper of "yolo predictions.py" the matrices replace."""
+    xA = max(boxA[0], boxB[0])
+    yA = max(boxA[1], boxB[1])
+    xB = min(boxA[0] + boxA[2], boxB[0] + boxB[2])
+    yB = min(boxA[1] + boxA[3], boxB[1] + boxB[3])
+    interW = max(0, xB - xA)
+    interH = max(0, yB - yA)
+    inter = interW * interH
+    areaA = boxA[2] * boxA[3]
+    areaB = boxB[2] * boxB[3]
+    union = areaA + areaB - inter
+    return inter / union if union > 0 else 0
+
+
+def scalar_match(gt_boxes, pred_boxes, threshold):
+    """The GT -> prediction matching loop of "yolo predictions.py"."""
+    matched_preds = set()
+    gt_matches = []
+    for gt_box in gt_boxes:
+        match = []
+        for i, pred_box in enumerate(pred_boxes):
+            if i in matched_preds:
+                continue
+            if scalar_iou(gt_box, pred_box) >= threshold:
+                matched_preds.add(i)
+                match = [i]
+                break
+        gt_matches.append(match)
+    return gt_matches, [i for i in range(len(pred_boxes)) if i not in matched_preds]
+
+
+def random_boxes(rng, n):
+    boxes = []
+    for _ in range(n):
+        x, y = rng.uniform(0, 100), rng.uniform(0, 100)
+        # Include degenerate and duplicate boxes
+        w = rng.choice([0.0, rng.uniform(1, 60)])
+        h = rng.uniform(1, 60)
+        boxes.append([x, y, w, h])
+    if boxes:
+        boxes.append(list(boxes[0]))
+    return boxes
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_iou_matrix_is_bit_identical_to_scalar_iou(seed):
+    rng = random.Random(seed)
+    a, b = random_boxes(rng, 15), random_boxes(rng, 25)
+    ious = iou_matrix(a, b)
+    expected = np.array([[scalar_iou(box_a, box_b) for box_b in b] for box_a in a], dtype=np.float64)
+    assert np.array_equal(ious, expected)
+
+    def to_xyxy(boxes):
+        return [[x, y, x + w, y + h] for x, y, w, h in boxes]
+
+    np.testing.assert_allclose(iou_matrix(to_xyxy(a), to_xyxy(b), XYXY), ious, atol=1e-12)
+
+
+def test_iou_matrix_empty_and_crowd():
+    assert iou_matrix([], [[0, 0, 1, 1]]).shape == (0, 1)
+    # A crowd box scores the share of the other box it covers
+    ious = iou_matrix([[0, 0, 10, 10]], [[0, 0, 5, 10], [0, 0, 5, 10]], crowd_b=[False, True])
+    np.testing.assert_allclose(ious, [[0.5, 0.5]])
+    ious = iou_matrix([[0, 0, 5, 10]], [[0, 0, 10, 10]], crowd_b=[True])
+    np.testing.assert_allclose(ious, [[1.0]])
+
+
+def test_batched_and_padded_iou_match_per_image_matrices():
+    rng = random.Random(7)
+    groups_a = [random_boxes(rng, rng.randint(0, 6)) for _ in range(8)]
+    groups_b = [random_boxes(rng, rng.randint(0, 6)) for _ in range(8)]
+    offsets_a = np.cumsum([0] + [len(g) for g in groups_a])
+    offsets_b = np.cumsum([0] + [len(g) for g in groups_b])
+    flat_a = [box for g in groups_a for box in g]
+    flat_b = [box for g in groups_b for box in g]
+
+    per_image = batched_iou(flat_a, offsets_a, flat_b, offsets_b)
+    for matrix, a, b in zip(per_image, groups_a, groups_b):
+        assert np.array_equal(matrix, iou_matrix(a, b).reshape(len(a), len(b)))
+
+    width_a, width_b = max(map(len, groups_a)), max(map(len, groups_b))
+    index_a = np.full((8, width_a), -1)
+    index_b = np.full((8, width_b), -1)
+    for g in range(8):
+        index_a[g, :len(groups_a[g])] = np.arange(offsets_a[g], offsets_a[g + 1])
+        index_b[g, :len(groups_b[g])] = np.arange(offsets_b[g], offsets_b[g + 1])
+    padded = padded_iou(flat_a, index_a, flat_b, index_b)
+    for g, matrix in enumerate(per_image):
+        n, m = matrix.shape
+        assert np.array_equal(padded[g, :n, :m], matrix)
+        assert not padded[g, n:].any() and not padded[g, :, m:].any()
+
+    with pytest.raises(ValueError):
+        batched_iou(flat_a, offsets_a, flat_b, offsets_b[:-1])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_greedy_match_replays_scalar_loop(seed):
+    rng = random.Random(seed)
+    gt, preds = random_boxes(rng, 10), random_boxes(rng, 12)
+    for threshold in (0.0, 0.1, 0.5):
+        assert greedy_match(iou_matrix(gt, preds), threshold) == scalar_match(gt, preds, threshold)
+
+
+def test_greedy_match_options():
+    ious = np.array([[0.9, 0.8, 0.1],
+                     [0.9, 0.7, 0.6]])
+    assert greedy_match(ious, 0.5, first_only=False) == ([[0, 1], [2]], [])
+    assert greedy_match(ious, 0.5, pred_order=[1, 0, 2]) == ([[1], [0]], [2])
+    assert greedy_match(np.zeros((2, 0)), 0.5) == ([[], []], [])
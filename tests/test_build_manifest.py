@@ -0,0 +1,57 @@
+import os
+
+from build_manifest import MANIFEST_FILE, BuildManifest, file_fingerprint, input_digest
+
+
+def build(root, outputs):
+    """One incremental run: rebuild outputs whose digest changed, like the preprocessing script."""
+    manifest = BuildManifest(root)
+    rebuilt = []
+    for name, content in outputs.items():
+        path = root / "images" / name
+        digest = input_digest({"content": content}, "copy")
+        if not manifest.is_current(path, digest):
+            path.write_text(content)
+            manifest.record(path, digest)
+            rebuilt.append(name)
+    removed = manifest.remove_stale([root / "images"])
+    manifest.save()
+    return rebuilt, removed
+
+
+def test_incremental_rebuild(tmp_path):
+    (tmp_path / "images").mkdir()
+    (tmp_path / "images" / "legacy.png").write_text("left by an old build")
+
+    rebuilt, removed = build(tmp_path, {"a.png": "a", "b.png": "b"})
+    assert rebuilt == ["a.png", "b.png"] and removed == ["images/legacy.png"]
+    assert (tmp_path / MANIFEST_FILE).exists()
+
+    assert build(tmp_path, {"a.png": "a", "b.png": "b"}) == ([], [])
+
+    rebuilt, removed = build(tmp_path, {"a.png": "a2", "c.png": "c"})
+    assert rebuilt == ["a.png", "c.png"] and removed == ["images/b.png"]
+    assert sorted(os.listdir(tmp_path / "images")) == ["a.png", "c.png"]
+    assert (tmp_path / "images" / "a.png").read_text() == "a2"
+
+    # A deleted output is rebuilt even though its digest is recorded
+    (tmp_path / "images" / "c.png").unlink()
+    assert build(tmp_path, {"a.png": "a2", "c.png": "c"}) == (["c.png"], [])
+
+
+def test_unreadable_manifest_rebuilds_everything(tmp_path):
+    (tmp_path / "images").mkdir()
+    build(tmp_path, {"a.png": "a"})
+    (tmp_path / MANIFEST_FILE).write_text("{truncated")
+    assert build(tmp_path, {"a.png": "a"}) == (["a.png"], [])
+
+
+def test_input_digest_and_fingerprint(tmp_path):
+    assert input_digest({"b": 1, "a": [1, 2]}) == input_digest({"a": [1, 2], "b": 1})
+    assert input_digest({"a": 1}) != input_digest({"a": 1.5})
+
+    path = tmp_path / "img.png"
+    path.write_bytes(b"12345")
+    size, mtime_ns = file_fingerprint(path)
+    assert size == 5 and mtime_ns == os.stat(path).st_mtime_ns
+    assert len(file_fingerprint(path, hash_contents=True)) == 3
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from class_mapping import ClassMapping
+
+CANONICAL_CLASSES = ["potted plant", "chair", "cup", "vase", "book"]
+BASELINE_MAPPING = {
+    "##ted": "potted plant",
+    "pot plant": "potted plant",
+    "cup vase": "vase",
+    "pot": "potted plant",
+    "vase potted plant": "potted plant"
+}
+
+
+def baseline_resolve(name):
+    """class_mapping.get(name, name), kept only if canonical, as in the old cleaning loop."""
+    mapped = BASELINE_MAPPING.get(name, name)
+    return mapped if mapped in CANONICAL_CLASSES else None
+
+
+@pytest.fixture
+def mapping():
+    return ClassMapping.from_config()
+
+
+def test_shipped_config_reproduces_baseline_mapping(mapping):
+    assert mapping.canonical_classes == CANONICAL_CLASSES
+    assert mapping.fuzzy_cutoff is None
+    for name in list(BASELINE_MAPPING) + CANONICAL_CLASSES + ["sofa", "chairs", "ted", "plant pot"]:
+        assert mapping.resolve(name) == baseline_resolve(name), name
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("##ted", ("potted plant", "exact")),
+    ("ted", (None, "unmapped")),
+    ("##TED", ("potted plant", "normalized")),
+    (" Potted   Plant ", ("potted plant", "normalized")),
+    ("##ant", ("potted plant", "wordpiece")),
+    ("##air", ("chair", "wordpiece")),
+    ("##", (None, "unmapped")),
+    ("chairs", (None, "unmapped")),
+])
+def test_rules(mapping, name, expected):
+    assert mapping.resolve_with_rule(name) == expected
+
+
+def test_fuzzy_matching_is_opt_in():
+    config = ClassMapping.from_config().to_dict()
+    config["fuzzy"] = {"enabled": True, "cutoff": 0.9}
+    fuzzy = ClassMapping.from_dict(config)
+    assert fuzzy.resolve_with_rule("chairs") == ("chair", "fuzzy")
+    assert fuzzy.resolve_with_rule("ted") == (None, "unmapped")
+
+
+def test_without_normalization_rules_matches_plain_lookup():
+    mapping = ClassMapping(CANONICAL_CLASSES, BASELINE_MAPPING, lowercase=False,
+                           collapse_whitespace=False, wordpieces=False)
+    for name in ["##TED", "Chair", " cup", "##ant", "chair"]:
+        assert mapping.resolve(name) == baseline_resolve(name), name
+
+
+def test_compile_remaps_category_ids(mapping):
+    lookup = mapping.compile({1: "pot", 3: "Chair", 4: "sofa", 7: "book"})
+    assert lookup.remap([1, 3, 4, 7, 2, 99, -1]).tolist() == [0, 1, -1, 4, -1, -1, -1]
+    assert lookup.rules[4] == ("sofa", None, "unmapped")
+    assert isinstance(lookup.remap(np.array([], dtype=np.int64)), np.ndarray)
+
+
+def test_exact_rules_must_target_canonical_classes():
+    with pytest.raises(ValueError):
+        ClassMapping(CANONICAL_CLASSES, {"pot": "plant"})
@@ -0,0 +1,136 @@
+import contextlib
+import copy
+import io
+
+import numpy as np
+import pytest
+
+from coco_eval import CocoEvaluator, detections_from_records, detections_from_results, detections_to_results
+from image_index import ImageIndex
+
+
+def synthetic_case(seed, num_images, num_categories, crowd_p=0.05, quant=None, cat_offset=1):
+    """
+    Random GT plus jittered, wrong-class and spurious detections.
+
+    quant rounds boxes and scores to a coarse grid so IoU and score ties are
+    common; the first image gets more than 100 detections.
+    """
+    rng = np.random.default_rng(seed)
+
+    def grid(values):
+        return [round(v / quant) * quant for v in values] if quant else [float(v) for v in values]
+
+    def score():
+        return float(rng.choice([0.5, 0.7, 0.9])) if quant else float(rng.random())
+
+    images = [{"id": i * 3 + 7, "file_name": f"{i}.jpg", "width": 640, "height": 480} for i in range(num_images)]
+    categories = [{"id": c + cat_offset, "name": f"c{c}"} for c in range(num_categories)]
+    annotations, results = [], []
+    for img in images:
+        for _ in range(rng.integers(0, 15)):
+            w, h = rng.uniform(2, 300, 2)
+            x, y = rng.uniform(0, 400, 2)
+            x, y, w, h = grid((x, y, w, h))
+            category = int(rng.integers(num_categories)) + cat_offset
+            annotations.append({"id": len(annotations) + 1, "image_id": img["id"], "category_id": category,
+                                "bbox": [x, y, w, h], "area": float(w * h * rng.uniform(0.5, 1.0)),
+                                "iscrowd": int(rng.random() < crowd_p)})
+            for _ in range(rng.integers(0, 4)):
+                jitter = rng.normal(0, 0.15 * min(w, h) + 1, 4) if rng.random() < 0.8 else np.zeros(4)
+                bbox = grid((x + jitter[0], y + jitter[1], max(w + jitter[2], 1), max(h + jitter[3], 1)))
+                detected = category if rng.random() < 0.85 else int(rng.integers(num_categories)) + cat_offset
+                results.append({"image_id": img["id"], "category_id": detected, "bbox": bbox, "score": score()})
+        for _ in range(rng.integers(0, 8)):
+            w, h = rng.uniform(2, 200, 2)
+            x, y = rng.uniform(0, 400, 2)
+            results.append({"image_id": img["id"], "category_id": int(rng.integers(num_categories)) + cat_offset,
+                            "bbox": grid((x, y, w, h)), "score": score()})
+    for _ in range(150):
+        results.append({"image_id": images[0]["id"], "category_id": cat_offset,
+                        "bbox": [float(rng.uniform(0, 100)), 10, 50, 50], "score": float(rng.random())})
+    return {"images": images, "annotations": annotations, "categories": categories}, results
+
+
+def pycocotools_eval(gt, results):
+    from pycocotools.coco import COCO
+    from pycocotools.cocoeval import COCOeval
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        coco_gt = COCO()
+        coco_gt.dataset = copy.deepcopy(gt)
+        coco_gt.createIndex()
+        coco_eval = COCOeval(coco_gt, coco_gt.loadRes(copy.deepcopy(results)), "bbox")
+        coco_eval.evaluate()
+        coco_eval.accumulate()
+        coco_eval.summarize()
+    return coco_eval
+
+
+@pytest.mark.parametrize("case", [
+    dict(seed=1, num_images=30, num_categories=3),
+    dict(seed=2, num_images=120, num_categories=5, quant=4),
+    dict(seed=3, num_images=150, num_categories=10, crowd_p=0.2, quant=8),
+    dict(seed=4, num_images=60, num_categories=2, quant=16, cat_offset=0),
+])
+def test_matches_pycocotools_exactly(case):
+    pytest.importorskip("pycocotools.cocoeval")
+    gt, results = synthetic_case(**case)
+    reference = pycocotools_eval(gt, results)
+    result = CocoEvaluator.from_coco(gt).evaluate(*detections_from_results(results))
+
+    assert np.array_equal(result.precision, reference.eval["precision"])
+    assert np.array_equal(result.recall, reference.eval["recall"])
+    assert np.array_equal(result.scores, reference.eval["scores"])
+    assert np.array_equal(result.stats, reference.stats)
+
+
+def test_sample_dataset_matches_pycocotools(coco_data):
+    pytest.importorskip("pycocotools.cocoeval")
+    rng = np.random.default_rng(5)
+    results = [{"image_id": ann["image_id"], "category_id": ann["category_id"],
+                "bbox": [ann["bbox"][0] + rng.uniform(0, 8)] + ann["bbox"][1:], "score": float(rng.random())}
+               for ann in coco_data["annotations"]]
+    reference = pycocotools_eval(coco_data, results)
+    result = CocoEvaluator.from_coco(coco_data).evaluate(*detections_from_results(results))
+    assert np.array_equal(result.stats, reference.stats)
+
+
+def perfect_results(coco_data):
+    return [{"image_id": ann["image_id"], "category_id": ann["category_id"], "bbox": ann["bbox"], "score": 1.0}
+            for ann in coco_data["annotations"]]
+
+
+def test_perfect_and_empty_detections(coco_data):
+    evaluator = CocoEvaluator.from_coco(coco_data)
+    perfect = evaluator.evaluate(*detections_from_results(perfect_results(coco_data)))
+    assert perfect.average_precision() == 1.0
+    assert perfect.average_precision(iou_threshold=0.5) == 1.0
+    assert set(perfect.per_class_ap().values()) == {1.0}
+    assert set(perfect.per_class_ap()) == {cat["id"] for cat in coco_data["categories"]}
+
+    empty = evaluator.evaluate(*detections_from_results([]))
+    assert empty.average_precision() == 0.0
+    assert not np.any(empty.stats > 0)
+
+
+def test_results_round_trip_and_records(coco_data):
+    results = perfect_results(coco_data)[:50]
+    detections = detections_from_results(results)
+    assert detections_to_results(*detections) == results
+
+    index = ImageIndex.from_coco(coco_data)
+    records = [(index.image(result["image_id"])["file_name"], np.array([result["bbox"]], dtype=np.float64),
+                np.array([result["category_id"]]), np.array([result["score"]]))
+               for result in results] + [("unknown.png", np.zeros((1, 4)), np.array([1]), np.array([0.5]))]
+    from_records = detections_from_records(records, index)
+    for a, b in zip(from_records, detections):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_summarize_prints_coco_table(coco_data, capsys):
+    result = CocoEvaluator.from_coco(coco_data).evaluate(*detections_from_results(perfect_results(coco_data)))
+    result.summarize()
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 12
+    assert lines[0].startswith(" Average Precision  (AP) @[ IoU=0.50:0.95 | area=   all | maxDets=100 ]")
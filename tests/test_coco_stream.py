@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import coco_stream
+
+# Covers nesting, escapes, unicode, numbers split across chunk edges and
+# arrays that are skipped before and after the requested ones
+DOCUMENT = {
+    "info": {"description": "tést \"quoted\" \\ [not, an, array]", "year": 2024},
+    "licenses": [{"id": 1, "name": "a, b"}, {"id": 2, "name": "{}"}],
+    "images": [{"id": i, "file_name": f"img-{i}.png", "width": 640.0, "height": 480,
+                "contexts": {"scene": ["kitchen"]}, "labels": ["cup", "chair"]} for i in range(12)],
+    "empty": [],
+    "annotations": [{"id": 100 + i, "image_id": i % 12, "category_id": i % 3,
+                     "bbox": [1.25e2, -3.5, 123456789.125, 0.0001], "area": 1e-7, "iscrowd": 0}
+                    for i in range(30)],
+    "categories": [{"id": 0, "name": "potted plant"}, {"id": 1, "name": "chair"}, {"id": 2, "name": "cup"}],
+    "trailing": 12345.678,
+}
+
+
+@pytest.fixture
+def builtin_scanner(monkeypatch):
+    """Force the built-in scanner even when ijson is installed."""
+    monkeypatch.setattr(coco_stream, "ijson", None)
+
+
+@pytest.fixture
+def coco_file(tmp_path):
+    path = tmp_path / "coco.json"
+    path.write_text(json.dumps(DOCUMENT, indent=2, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, coco_stream.CHUNK_SIZE])
+@pytest.mark.parametrize("key", ["images", "annotations", "categories", "licenses", "empty", "missing"])
+def test_builtin_scanner_matches_json_load(builtin_scanner, coco_file, chunk_size, key):
+    assert list(coco_stream.iter_coco_array(coco_file, key, chunk_size)) == DOCUMENT.get(key, [])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64])
+def test_iter_coco_entries_reads_arrays_in_one_pass(builtin_scanner, coco_file, chunk_size):
+    keys = ("images", "annotations", "categories")
+    entries = list(coco_stream.iter_coco_entries(coco_file, keys, chunk_size))
+    expected = [(key, entry) for key in keys for entry in DOCUMENT[key]]
+    assert entries == expected
+
+
+def test_ijson_backend_matches_json_load(coco_file):
+    if coco_stream.ijson is None:
+        pytest.skip("ijson is not installed")
+    assert list(coco_stream.iter_images(coco_file)) == DOCUMENT["images"]
+    keys = ("images", "annotations", "categories")
+    assert list(coco_stream.iter_coco_entries(coco_file, keys)) == \
+        [(key, entry) for key in keys for entry in DOCUMENT[key]]
+
+
+def test_builtin_scanner_rejects_truncated_input(builtin_scanner, tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text(json.dumps(DOCUMENT)[:-40])
+    with pytest.raises(ValueError):
+        list(coco_stream.iter_coco_array(path, "categories", 16))
+
@@ -0,0 +1,61 @@
+import io
+import json
+
+import pytest
+
+from coco_stream import CocoJsonWriter, JsonArraySpool, iter_chunks
+
+# Nested values, escapes, unicode and float formatting that json.dump must reproduce
+DOCUMENT = {
+    "info": {"description": "tést \"quoted\" \\ [not, an, array]", "year": 2024},
+    "licenses": [{"id": 1, "name": "a, b"}, {"id": 2, "name": "{}"}],
+    "images": [{"id": i, "file_name": f"img-{i}.png", "width": 640.0, "height": 480,
+                "contexts": {"scene": ["kitchen"]}, "labels": ["cup", "chair"]} for i in range(12)],
+    "empty": [],
+    "annotations": [{"id": 100 + i, "image_id": i % 12, "category_id": i % 3,
+                     "bbox": [1.25e2, -3.5, 123456789.125, 0.0001], "area": 1e-7, "iscrowd": 0}
+                    for i in range(30)],
+    "categories": [{"id": 0, "name": "potted plant"}, {"id": 1, "name": "chair"}, {"id": 2, "name": "cup"}],
+    "trailing": 12345.678,
+}
+
+
+def test_iter_chunks():
+    assert list(iter_chunks(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(iter_chunks([], 3)) == []
+    with pytest.raises(ValueError):
+        list(iter_chunks(range(3), 0))
+
+
+@pytest.mark.parametrize("indent", [2, 4, None])
+def test_writer_matches_json_dump(indent):
+    f = io.StringIO()
+    writer = CocoJsonWriter(f, indent=indent)
+    writer.write_value("info", DOCUMENT["info"])
+    assert writer.write_array("images", iter(DOCUMENT["images"])) == len(DOCUMENT["images"])
+    assert writer.write_array("empty", iter([])) == 0
+    with JsonArraySpool(indent=indent) as spool:
+        spool.extend(DOCUMENT["annotations"][:10])
+        spool.extend(DOCUMENT["annotations"][10:])
+        assert writer.write_array("annotations", spool) == len(DOCUMENT["annotations"])
+    with JsonArraySpool(indent=indent) as spool:
+        writer.write_array("spooled_empty", spool)
+    writer.write_value("categories", DOCUMENT["categories"])
+    writer.close()
+
+    expected = {"info": DOCUMENT["info"], "images": DOCUMENT["images"], "empty": [],
+                "annotations": DOCUMENT["annotations"], "spooled_empty": [],
+                "categories": DOCUMENT["categories"]}
+    assert f.getvalue() == json.dumps(expected, indent=indent)
+
+
+def test_writer_empty_document():
+    f = io.StringIO()
+    CocoJsonWriter(f).close()
+    assert f.getvalue() == json.dumps({}, indent=2)
+
+
+def test_spool_indent_must_match_writer():
+    with JsonArraySpool(indent=4) as spool:
+        with pytest.raises(ValueError):
+            CocoJsonWriter(io.StringIO(), indent=2).write_array("images", spool)
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from context_index import ContextIndex
+
+CONTEXTS = {
+    "scene": ["kitchen", "living room", "office"],
+    "lighting conditions": ["bright lighting", "dim lighting"],
+    "blur effect": ["motion blur", "none"],
+}
+
+
+def make_images(seed, count=200):
+    rng = random.Random(seed)
+    images = []
+    for i in range(count):
+        contexts = {context_type: rng.sample(values, rng.randint(0, len(values)))
+                    for context_type, values in CONTEXTS.items() if rng.random() < 0.8}
+        images.append({"id": i, "contexts": contexts})
+    return images
+
+
+def baseline_filter(images, context_filters):
+    """The scan filter_images_by_context used before the index."""
+    rows = []
+    for row, img in enumerate(images):
+        contexts = img.get("contexts", {})
+        if all(any(val in contexts.get(context_type, []) for val in required)
+               for context_type, required in context_filters.items()):
+            rows.append(row)
+    return rows
+
+
+@pytest.mark.parametrize("context_filters", [
+    {},
+    {"scene": ["kitchen"]},
+    {"scene": ["kitchen", "office"]},
+    {"scene": ["office"], "lighting conditions": ["dim lighting"]},
+    {"scene": ["kitchen", "living room"], "blur effect": ["none", "motion blur"],
+     "lighting conditions": ["bright lighting"]},
+    {"scene": ["garden"]},
+    {"weather": ["rain"]},
+    {"scene": []},
+])
+def test_query_matches_baseline_scan(context_filters):
+    images = make_images(0)
+    index = ContextIndex.from_images(images)
+    assert index.query(context_filters).tolist() == baseline_filter(images, context_filters)
+
+
+def test_postings_and_counts():
+    images = make_images(1)
+    index = ContextIndex.from_images(images)
+    for (context_type, value), count in index.counts().items():
+        rows = index.postings(context_type, value).tolist()
+        assert rows == baseline_filter(images, {context_type: [value]})
+        assert count == len(rows)
+    assert sorted(index.values("scene")) == sorted(
+        {value for img in images for value in img["contexts"].get("scene", [])})
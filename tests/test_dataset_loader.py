@@ -0,0 +1,136 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from dataset_loader import BTTDatasetLoader
+
+SCENES = ["kitchen", "office", "living room"]
+LABELS = ["chair", "cup", "vase"]
+
+
+@pytest.fixture
+def btt_root(tmp_path, coco_data):
+    """A BTT_Data folder with two datasets built from the sample COCO export."""
+    rng = random.Random(0)
+    for dataset_id in ("set_a", "set_b"):
+        for img in coco_data["images"]:
+            img["contexts"] = {"scene": rng.sample(SCENES, rng.randint(1, 2))}
+            img["labels"] = rng.sample(LABELS, rng.randint(0, 2))
+        dataset_dir = tmp_path / dataset_id
+        (dataset_dir / "images").mkdir(parents=True)
+        (dataset_dir / "coco.json").write_text(json.dumps(coco_data))
+    return tmp_path
+
+
+def test_streaming_parse_matches_full_load(btt_root):
+    full = BTTDatasetLoader(btt_root)
+    streamed = BTTDatasetLoader(btt_root, streaming=True)
+
+    full_store = full.get_annotation_store("set_a")
+    streamed_store = streamed.get_annotation_store("set_a")
+    for name in full_store.ARRAY_FIELDS:
+        np.testing.assert_array_equal(getattr(streamed_store, name), getattr(full_store, name))
+    assert streamed_store.file_names == full_store.file_names
+    assert streamed_store.category_names == full_store.category_names
+
+    for filters in ({"scene": ["kitchen"]}, {"scene": ["office", "living room"]}):
+        assert streamed.filter_images_by_context("set_a", filters) == full.filter_images_by_context("set_a", filters)
+    for labels in (["chair"], ["chair", "cup"]):
+        assert streamed.get_images_with_labels("set_a", labels) == full.get_images_with_labels("set_a", labels)
+    assert not streamed._get_entry("set_a")["loaded"]
+
+
+@pytest.mark.parametrize("max_workers", [None, 2])
+def test_load_all_datasets_modes(btt_root, max_workers):
+    from annotation_store import AnnotationStore
+    from dataset_loader import load_all_datasets
+
+    datasets = load_all_datasets(btt_root, max_workers=max_workers)
+    assert list(datasets) == ["set_a", "set_b"]
+    assert all(isinstance(data, dict) for data in datasets.values())
+
+    compact = load_all_datasets(btt_root, max_workers=max_workers, compact=True)
+    assert list(compact) == ["set_a", "set_b"]
+    for dataset_id, store in compact.items():
+        assert isinstance(store, AnnotationStore)
+        assert store.num_images == len(datasets[dataset_id]["images"])
+        assert store.ann_ids.tolist() == [ann["id"] for ann in datasets[dataset_id]["annotations"]]
+
+
+def test_lazy_discovery_matches_eager_scan(btt_root):
+    (btt_root / "broken").mkdir()
+    (btt_root / ".hidden").mkdir()
+    eager = BTTDatasetLoader(btt_root)
+
+    lazy = BTTDatasetLoader(btt_root, lazy=True)
+    assert lazy.datasets == {}
+    assert lazy.load_dataset("set_b") == eager.load_dataset("set_b")
+    assert list(lazy.datasets) == ["set_b"]
+
+    lazy.write_manifest()
+    from_manifest = BTTDatasetLoader(btt_root, lazy=True)
+    assert sorted(from_manifest.list_datasets()) == sorted(eager.list_datasets()) == ["set_a", "set_b"]
+    with pytest.raises(ValueError):
+        from_manifest.load_dataset("broken")
+
+
+def test_iter_images_decoded_keeps_requested_order(btt_root, coco_data):
+    from PIL import Image
+
+    images = coco_data["images"][:12]
+    for i, img in enumerate(images):
+        # Tiny images whose pixel value identifies them
+        Image.new("L", (4, 3), i).save(btt_root / "set_a" / "images" / img["file_name"])
+
+    loader = BTTDatasetLoader(btt_root)
+    ids = [img["id"] for img in images]
+    requested = ids[::-1] + ids[:3]
+    decoded = list(loader.iter_images_decoded("set_a", requested, workers=3, prefetch=2, mode=None))
+
+    assert [img["id"] for img, _ in decoded] == requested
+    for img, array in decoded:
+        assert array.shape == (3, 4)
+        assert array[0, 0] == ids.index(img["id"])
+
+    first = next(loader.iter_images_decoded("set_a", requested, mode="RGB"))
+    assert first[0]["id"] == requested[0] and first[1].shape == (3, 4, 3)
+    with pytest.raises(ValueError):
+        next(loader.iter_images_decoded("set_a", [ids[0], -1]))
+
+
+def baseline_stats(data):
+    """The image scan get_dataset_stats did before the indexes."""
+    context_types, scene_types, occlusion_types = set(), set(), set()
+    label_counts = {}
+    for img in data.get("images", []):
+        for label in img.get("labels", []):
+            label_counts[label] = label_counts.get(label, 0) + 1
+        contexts = img.get("contexts", {})
+        context_types.update(contexts.keys())
+        scene_types.update(contexts.get("scene", []))
+        occlusion_types.update(contexts.get("occlusion", []))
+    return context_types, scene_types, occlusion_types, label_counts
+
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_dataset_stats_match_image_scan(tmp_path, coco_data, cache):
+    rng = random.Random(3)
+    for img in coco_data["images"]:
+        # Repeated labels and a context type that never has a value
+        img["labels"] = [rng.choice(LABELS) for _ in range(rng.randint(0, 3))]
+        img["contexts"] = {"scene": rng.sample(SCENES, rng.randint(0, 2)), "occlusion": []}
+    (tmp_path / "set_a" / "images").mkdir(parents=True)
+    (tmp_path / "set_a" / "coco.json").write_text(json.dumps(coco_data))
+
+    for _ in range(2 if cache else 1):  # the second load comes from the cache
+        stats = BTTDatasetLoader(tmp_path, cache=cache).get_dataset_stats("set_a")
+    context_types, scene_types, occlusion_types, label_counts = baseline_stats(coco_data)
+    assert set(stats["context_types"]) == context_types == {"scene", "occlusion"}
+    assert set(stats["scene_types"]) == scene_types
+    assert set(stats["occlusion_types"]) == occlusion_types == set()
+    assert stats["label_distribution"] == label_counts
+    assert stats["label_image_counts"] == {label: sum(label in img["labels"] for img in coco_data["images"])
+                                           for label in label_counts}
+    assert stats["label_image_counts"] != stats["label_distribution"]
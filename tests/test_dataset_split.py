@@ -0,0 +1,70 @@
+import random
+
+import numpy as np
+import pytest
+
+from dataset_split import read_split_list, stratified_split, write_split_list
+
+SCENES = ["kitchen", "office", "living room", "garden"]
+LIGHTING = ["bright lighting", "dim lighting"]
+
+
+def make_dataset(seed, num_images=500):
+    rng = random.Random(seed)
+    images = [{"id": 1000 + i, "file_name": f"img_{i}.png",
+               "contexts": {"scene": [rng.choice(SCENES)], "lighting conditions": [rng.choice(LIGHTING)]}}
+              for i in range(num_images)]
+    annotations = []
+    for img in images:
+        for _ in range(rng.randint(0, 4)):
+            # Class 4 is rare
+            category = 4 if rng.random() < 0.03 else rng.randint(0, 3)
+            annotations.append({"id": len(annotations), "image_id": img["id"], "category_id": category})
+    return images, annotations
+
+
+def test_split_is_deterministic_and_order_independent():
+    images, annotations = make_dataset(0)
+    train, val = stratified_split(images, annotations, seed=7)
+    again = stratified_split(images, annotations, seed=7)
+    np.testing.assert_array_equal(train, again[0])
+    np.testing.assert_array_equal(val, again[1])
+
+    shuffled = images[:]
+    random.Random(1).shuffle(shuffled)
+    train_s, val_s = stratified_split(shuffled, annotations[::-1], seed=7)
+    assert set(train_s.tolist()) == set(train.tolist()) and set(val_s.tolist()) == set(val.tolist())
+    # Each side keeps the input order
+    order = {img["id"]: i for i, img in enumerate(shuffled)}
+    assert [order[i] for i in val_s.tolist()] == sorted(order[i] for i in val_s.tolist())
+
+    other_train, _ = stratified_split(images, annotations, seed=8)
+    assert set(other_train.tolist()) != set(train.tolist())
+
+
+@pytest.mark.parametrize("val_fraction", [0.1, 0.2, 0.5])
+def test_split_ratios(val_fraction):
+    images, annotations = make_dataset(2)
+    train, val = stratified_split(images, annotations, val_fraction=val_fraction, seed=3)
+    assert len(val) == round(len(images) * val_fraction)
+    assert sorted(train.tolist() + val.tolist()) == [img["id"] for img in images]
+
+    # The rare class and every scene land on both sides in about the right share
+    val_set = set(val.tolist())
+    rare_images = {ann["image_id"] for ann in annotations if ann["category_id"] == 4}
+    assert 0 < len(rare_images & val_set) < len(rare_images)
+    for scene in SCENES:
+        scene_ids = [img["id"] for img in images if img["contexts"]["scene"] == [scene]]
+        share = sum(i in val_set for i in scene_ids) / len(scene_ids)
+        assert abs(share - val_fraction) < 0.1
+
+
+def test_split_list_round_trip(tmp_path):
+    inside = [tmp_path / "images" / f"img_{i}.png" for i in range(3)]
+    outside = tmp_path.parent / "elsewhere.png"
+    list_path = tmp_path / "train.txt"
+
+    assert write_split_list(list_path, inside + [outside]) == 4
+    lines = list_path.read_text().splitlines()
+    assert lines[0] == "./images/img_0.png" and lines[-1] == outside.as_posix()
+    assert read_split_list(list_path) == [str(path) for path in inside + [outside]]
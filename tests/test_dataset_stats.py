@@ -0,0 +1,57 @@
+import random
+from collections import Counter
+
+import numpy as np
+
+from annotation_store import AnnotationStore
+from context_index import ContextIndex
+from dataset_stats import (SMALL_AREA, MEDIUM_AREA, bbox_distributions, context_histograms,
+                           label_context_crosstab)
+from label_index import LabelIndex
+
+CONTEXTS = {"scene": ["kitchen", "office"], "lighting conditions": ["bright lighting", "dim lighting"]}
+LABELS = ["chair", "cup", "vase"]
+
+
+def make_images(seed, count=150):
+    rng = random.Random(seed)
+    return [{"id": i,
+             "contexts": {context_type: rng.sample(values, rng.randint(0, len(values)))
+                          for context_type, values in CONTEXTS.items()},
+             "labels": rng.sample(LABELS, rng.randint(0, 2))}
+            for i in range(count)]
+
+
+def test_context_histograms_match_naive_counts():
+    images = make_images(0)
+    expected = {}
+    for img in images:
+        for context_type, values in img["contexts"].items():
+            for value in values:
+                counts = expected.setdefault(context_type, {})
+                counts[value] = counts.get(value, 0) + 1
+    assert context_histograms(ContextIndex.from_images(images)) == expected
+
+
+def test_label_context_crosstab_matches_naive_counts():
+    images = make_images(1)
+    crosstab = label_context_crosstab(LabelIndex.from_images(images), ContextIndex.from_images(images))
+    for context_type, values in crosstab.items():
+        for value, label_counts in values.items():
+            with_value = [img for img in images if value in img["contexts"].get(context_type, [])]
+            for label, count in label_counts.items():
+                assert count == sum(label in img["labels"] for img in with_value)
+    assert set(crosstab) == set(CONTEXTS)
+
+
+def test_bbox_distributions_match_naive_counts(coco_data):
+    stats = bbox_distributions(AnnotationStore.from_coco(coco_data))
+    areas = [w * h for _, _, w, h in (ann["bbox"] for ann in coco_data["annotations"])]
+
+    buckets = Counter("small" if area < SMALL_AREA else "medium" if area < MEDIUM_AREA else "large"
+                      for area in areas)
+    assert stats["size_buckets"] == {name: buckets[name] for name in ("small", "medium", "large")}
+    assert sum(stats["area_histogram"]["counts"]) == len(areas)
+
+    edges = stats["area_histogram"]["bin_edges"]
+    assert stats["area_histogram"]["counts"] == np.histogram(areas, bins=edges)[0].tolist()
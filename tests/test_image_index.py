@@ -0,0 +1,53 @@
+import os
+import random
+
+from image_index import ImageIndex
+
+
+def baseline_image_id(images, path):
+    """The per-prediction scan of "yolo predictions.py" before the index."""
+    file_name = os.path.basename(path)
+    for img in images:
+        if img["file_name"] == file_name:
+            return img["id"]
+    return None
+
+
+def test_image_id_matches_scan(coco_data):
+    images = coco_data["images"]
+    # A duplicate file name resolves to the first image, like the scan
+    images.append(dict(images[0], id=10 ** 6))
+    index = ImageIndex.from_coco(coco_data)
+
+    rng = random.Random(0)
+    paths = [f"/content/runs/predict/{img['file_name']}" for img in rng.sample(images, 50)]
+    paths += ["missing.png", images[0]["file_name"], ""]
+    for path in paths:
+        assert index.image_id(path) == baseline_image_id(images, path)
+
+
+def test_image_id_falls_back_to_stem(coco_data):
+    index = ImageIndex.from_coco(coco_data)
+    img = coco_data["images"][3]
+    stem = os.path.splitext(img["file_name"])[0]
+    assert index.image_id(f"labels/{stem}.txt") == img["id"]
+    assert index.image(img["id"]) is img
+
+
+def test_annotations_and_subset_match_scans(coco_data):
+    index = ImageIndex.from_coco(coco_data)
+    images, annotations = coco_data["images"], coco_data["annotations"]
+    for img in images[:20]:
+        assert index.image_annotations(img["id"]) == [ann for ann in annotations if ann["image_id"] == img["id"]]
+    assert index.image_annotations(-1) == []
+
+    # The misclassified export of the old script
+    chosen = {img["file_name"] for img in random.Random(1).sample(images, 30)}
+    image_id_to_name = {img["id"]: img["file_name"] for img in images}
+    expected = {
+        "images": [img for img in images if img["file_name"] in chosen],
+        "annotations": [ann for ann in annotations if image_id_to_name[ann["image_id"]] in chosen],
+        "categories": coco_data["categories"],
+    }
+    ids = [index.image_id(name) for name in sorted(chosen)] + [-5]
+    assert index.subset(ids) == expected
@@ -0,0 +1,55 @@
+import pytest
+from PIL import Image
+
+from image_utils import DecodedImageCache, decoded_nbytes, read_image_header_size, read_image_size
+
+
+@pytest.mark.parametrize("fmt, kwargs", [
+    ("PNG", {}),
+    ("JPEG", {}),
+    ("JPEG", {"progressive": True}),
+    ("JPEG", {"exif": Image.Exif().tobytes()}),
+])
+@pytest.mark.parametrize("size", [(1, 1), (37, 19), (640, 480)])
+def test_header_size_matches_pil(tmp_path, fmt, kwargs, size):
+    path = tmp_path / f"image.{fmt.lower()}"
+    Image.new("RGB", size, (10, 20, 30)).save(path, fmt, **kwargs)
+    assert read_image_header_size(path) == size
+    with Image.open(path) as im:
+        assert read_image_size(path) == im.size
+
+
+def test_other_formats_fall_back_to_pil(tmp_path):
+    path = tmp_path / "image.bmp"
+    Image.new("L", (13, 7)).save(path)
+    assert read_image_header_size(path) is None
+    assert read_image_size(path) == (13, 7)
+
+
+def test_truncated_header_is_not_trusted(tmp_path):
+    path = tmp_path / "image.png"
+    Image.new("RGB", (20, 10)).save(path)
+    path.write_bytes(path.read_bytes()[:12])
+    assert read_image_header_size(path) is None
+
+
+def test_cache_evicts_least_recently_used():
+    images = {name: Image.new("RGB", (10, 10)) for name in "abc"}
+    per_image = decoded_nbytes(images["a"])
+    assert per_image == 300
+
+    cache = DecodedImageCache(max_bytes=2 * per_image)
+    cache.put("a", images["a"])
+    cache.put("b", images["b"])
+    assert cache.get("a") is images["a"]
+    cache.put("c", images["c"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is images["a"] and cache.get("c") is images["c"]
+    assert cache.current_bytes == 2 * per_image and len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    cache.put("huge", Image.new("RGB", (100, 100)))
+    assert cache.get("huge") is None
+    cache.clear()
+    assert len(cache) == 0 and cache.current_bytes == 0
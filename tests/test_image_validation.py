@@ -0,0 +1,66 @@
+import os
+
+import pytest
+from PIL import Image
+
+from image_validation import probe_image, validate_images
+
+
+def baseline_validate(images, images_dir):
+    """The serial loop of data-preprocessing.py Part A before validate_images."""
+    image_id_to_info = {}
+    messages = []
+    for img in images:
+        file_name = img["file_name"]
+        file_path = os.path.join(images_dir, file_name)
+        if not os.path.exists(file_path):
+            messages.append(f"Missing file: {file_name}")
+            continue
+        try:
+            with Image.open(file_path) as im:
+                width, height = im.size
+        except Exception as e:
+            messages.append(f"Cannot open {file_name}: {e}")
+            continue
+        image_id_to_info[img["id"]] = {"file_name": file_name, "path": file_path,
+                                       "width": width, "height": height}
+    return image_id_to_info, messages
+
+
+@pytest.fixture
+def images_dir(tmp_path):
+    """Valid PNG/JPEG/BMP images, one missing file and one that is not an image."""
+    images = []
+    for i in range(40):
+        file_name = f"img_{i:03d}.{['png', 'jpg', 'bmp'][i % 3]}"
+        images.append({"id": 100 + i, "file_name": file_name})
+        if i == 7:
+            continue  # missing
+        if i == 11:
+            (tmp_path / file_name).write_bytes(b"not an image")
+            continue
+        Image.new("RGB", (10 + i, 20 + 2 * i)).save(tmp_path / file_name)
+    return tmp_path, images
+
+
+@pytest.mark.parametrize("max_workers, chunk_size", [(1, 256), (4, 3), (None, 1)])
+def test_validate_images_matches_serial_loop(images_dir, max_workers, chunk_size):
+    directory, images = images_dir
+    info, messages = validate_images(images, str(directory), max_workers=max_workers, chunk_size=chunk_size)
+    expected_info, expected_messages = baseline_validate(images, str(directory))
+
+    assert list(info.items()) == list(expected_info.items())
+    assert messages[0] == expected_messages[0] == "Missing file: img_007.jpg"
+    assert messages[1].startswith("Cannot open img_011.bmp: ")
+    assert len(messages) == len(expected_messages) == 2
+
+
+def test_verify_catches_truncated_pixel_data(tmp_path):
+    path = tmp_path / "truncated.png"
+    Image.effect_noise((64, 64), 50).save(path)
+    path.write_bytes(path.read_bytes()[:200])
+
+    assert probe_image(str(path)) == ("ok", (64, 64))
+    status, _ = probe_image(str(path), verify=True)
+    assert status == "error"
+    assert probe_image(str(tmp_path / "absent.png")) == ("missing", None)
@@ -0,0 +1,47 @@
+import random
+
+import numpy as np
+import pytest
+
+from label_index import LabelIndex
+
+LABELS = ["chair", "cup", "vase", "book", "potted plant"]
+
+
+def make_images(seed, count=200):
+    rng = random.Random(seed)
+    return [{"id": i, "labels": rng.sample(LABELS, rng.randint(0, 3))} for i in range(count)]
+
+
+def baseline_with_all(images, labels):
+    """The scan get_images_with_labels used before the index."""
+    return [row for row, img in enumerate(images) if set(labels).issubset(set(img.get("labels", [])))]
+
+
+def baseline_with_any(images, labels):
+    return [row for row, img in enumerate(images) if set(labels) & set(img.get("labels", []))]
+
+
+QUERIES = [[], ["chair"], ["chair", "cup"], ["cup", "cup"], ["vase", "book", "potted plant"],
+           ["sofa"], ["chair", "sofa"]]
+
+
+@pytest.mark.parametrize("labels", QUERIES)
+def test_rows_with_all_matches_baseline(labels):
+    images = make_images(0)
+    assert LabelIndex.from_images(images).rows_with_all(labels).tolist() == baseline_with_all(images, labels)
+
+
+@pytest.mark.parametrize("labels", QUERIES)
+def test_rows_with_any_matches_baseline(labels):
+    images = make_images(0)
+    assert LabelIndex.from_images(images).rows_with_any(labels).tolist() == baseline_with_any(images, labels)
+
+
+def test_counts_and_cooccurrence():
+    images = make_images(2)
+    index = LabelIndex.from_images(images)
+    assert index.counts() == {label: len(baseline_with_all(images, [label])) for label in index.labels}
+
+    expected = np.array([[len(baseline_with_all(images, [a, b])) for b in index.labels] for a in index.labels])
+    np.testing.assert_array_equal(index.cooccurrence(), expected)
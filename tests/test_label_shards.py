@@ -0,0 +1,98 @@
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from label_shards import LabelShard, read_label_shard, shard_to_txt, txt_to_shard, write_label_shard
+
+TEST_LABELS = Path(__file__).resolve().parent.parent / "test_labels.zip"
+
+
+def zip_label_texts(path):
+    with zipfile.ZipFile(path) as archive:
+        return {name.split("/")[-1][:-4]: archive.read(name).decode()
+                for name in archive.namelist()
+                if name.endswith(".txt") and not name.startswith("__MACOSX/")}
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_round_trip_of_test_labels(tmp_path, mmap):
+    texts = zip_label_texts(TEST_LABELS)
+    shard = txt_to_shard(TEST_LABELS, tmp_path / "labels.lblshard")
+    assert shard.stems == sorted(texts)
+    assert shard.num_boxes == sum(len(text.splitlines()) for text in texts.values())
+
+    loaded = read_label_shard(tmp_path / "labels.lblshard", mmap=mmap)
+    assert loaded.stems == shard.stems
+    np.testing.assert_array_equal(loaded.offsets, shard.offsets)
+    np.testing.assert_array_equal(loaded.classes, shard.classes)
+    np.testing.assert_array_equal(loaded.boxes, shard.boxes)
+
+    # Six-decimal labels survive the float32 boxes exactly
+    paths = shard_to_txt(loaded, tmp_path / "labels")
+    for stem, path in zip(loaded.stems, paths):
+        with open(path) as f:
+            assert f.read() == texts[stem]
+
+    # A directory packs like the archive it came from, and stems select a split
+    split = shard.stems[::3] + ["no_labels"]
+    subset = txt_to_shard(tmp_path / "labels", tmp_path / "split.lblshard", split)
+    assert subset.stems == split
+    classes, boxes = subset.labels("no_labels")
+    assert len(classes) == len(boxes) == 0
+    for stem in split[:-1]:
+        np.testing.assert_array_equal(subset.labels(stem)[1], shard.labels(stem)[1])
+
+
+@pytest.mark.parametrize("text", [
+    "0 0.5 0.5 0.1 0.1 0.9\n1 0.5 0.5 0.1\n",  # counts add up to 10 values, lines do not
+    "0 0.5 0.5 0.1\n",
+    "0 0.5 0.5 0.1 0.1 1\n",
+])
+def test_rejects_lines_without_five_columns(tmp_path, text):
+    (tmp_path / "img.txt").write_text(text)
+    with pytest.raises(ValueError, match="columns"):
+        txt_to_shard(tmp_path, tmp_path / "out.lblshard")
+
+
+@pytest.mark.parametrize("class_value", ["1.5", "70000", "nan"])
+def test_rejects_non_integer_classes(tmp_path, class_value):
+    (tmp_path / "img.txt").write_text(f"0 0.5 0.5 0.1 0.1\n{class_value} 0.5 0.5 0.1 0.1\n")
+    with pytest.raises(ValueError, match="class"):
+        txt_to_shard(tmp_path, tmp_path / "out.lblshard")
+
+
+def test_integral_float_classes_and_blank_lines(tmp_path):
+    (tmp_path / "img.txt").write_text("3.0 0.5 0.5 0.1 0.1\n\n  \n1 0.25 0.5 0.1 0.2\n")
+    shard = txt_to_shard(tmp_path, tmp_path / "out.lblshard")
+    assert shard.classes.tolist() == [3, 1] and shard.offsets.tolist() == [0, 2]
+
+
+def test_invalid_shards(tmp_path):
+    with pytest.raises(ValueError):
+        LabelShard(["a"], [0, 2], [1], [[0, 0, 0, 0]])
+    path = tmp_path / "bad.lblshard"
+    path.write_bytes(b"not a shard at all")
+    with pytest.raises(ValueError):
+        read_label_shard(path)
+    write_label_shard(path, LabelShard.from_labels({"a": ([1], [[0.5, 0.5, 0.1, 0.1]]), "b": ([], [])}))
+    assert read_label_shard(path).offsets.tolist() == [0, 1, 1]
+
+
+def test_shard_from_coco_matches_packed_label_files(tmp_path, coco_data):
+    from label_shards import shard_from_coco
+    from yolo_labels import convert_coco_to_yolo
+
+    for i, ann in enumerate(coco_data["annotations"]):
+        ann["category_id"] = i % 5
+    images = coco_data["images"][::2]
+    convert_coco_to_yolo(images, coco_data["annotations"], tmp_path / "labels")
+    stems = [img["file_name"].rsplit(".", 1)[0] for img in images]
+    packed = txt_to_shard(tmp_path / "labels", tmp_path / "packed.lblshard", stems)
+
+    shard = shard_from_coco(images, coco_data["annotations"])
+    assert shard.stems == packed.stems
+    np.testing.assert_array_equal(shard.offsets, packed.offsets)
+    np.testing.assert_array_equal(shard.classes, packed.classes)
+    np.testing.assert_array_equal(shard.boxes, packed.boxes)
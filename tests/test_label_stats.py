@@ -0,0 +1,62 @@
+import csv
+import random
+
+import numpy as np
+import pytest
+
+from label_stats import label_statistics, split_statistics, write_label_statistics, write_split_summary
+from yolo_labels import yolo_label_texts
+
+CLASS_NAMES = ["potted plant", "chair", "cup", "vase", "book"]
+
+
+@pytest.fixture
+def yolo_coco(coco_data):
+    rng = random.Random(0)
+    for ann in coco_data["annotations"]:
+        ann["category_id"] = rng.randint(0, 4)
+    return coco_data
+
+
+def test_label_counts_match_written_label_files(yolo_coco):
+    """The old CSV counted the non-empty lines of every label file."""
+    images, annotations = yolo_coco["images"], yolo_coco["annotations"]
+    stats = label_statistics(images, annotations, num_classes=len(CLASS_NAMES))
+    texts = yolo_label_texts(images, annotations)
+
+    assert stats["num_labels"].tolist() == [sum(1 for line in text.splitlines() if line.strip())
+                                            for text in texts]
+    for row, text in enumerate(texts):
+        classes = [int(line.split()[0]) for line in text.splitlines()]
+        assert stats["class_counts"][row].tolist() == np.bincount(classes, minlength=5).tolist()
+
+
+def test_area_counts_match_histogram(yolo_coco):
+    images, annotations = yolo_coco["images"], yolo_coco["annotations"]
+    stats = label_statistics(images, annotations, num_classes=len(CLASS_NAMES))
+    for row, img in enumerate(images):
+        areas = [ann["bbox"][2] * ann["bbox"][3] for ann in annotations if ann["image_id"] == img["id"]]
+        expected = np.histogram(areas, bins=stats["area_bin_edges"])[0]
+        assert stats["area_counts"][row].tolist() == expected.tolist()
+
+
+def test_written_statistics(tmp_path, yolo_coco):
+    images, annotations = yolo_coco["images"], yolo_coco["annotations"]
+    stats = label_statistics(images[:10], annotations, num_classes=len(CLASS_NAMES))
+    written = write_label_statistics(stats, CLASS_NAMES, tmp_path / "train.csv", npz_path=tmp_path / "train.npz")
+    assert written[:2] == [str(tmp_path / "train.csv"), str(tmp_path / "train.npz")]
+
+    with open(tmp_path / "train.csv") as f:
+        rows = list(csv.reader(f))
+    assert rows[0][:3] == ["image_id", "num_labels", "num_potted_plant"]
+    assert [row[:2] for row in rows[1:]] == [[img["file_name"], str(n)]
+                                             for img, n in zip(images[:10], stats["num_labels"].tolist())]
+    with np.load(tmp_path / "train.npz") as archive:
+        np.testing.assert_array_equal(archive["class_counts"], stats["class_counts"])
+
+    totals = split_statistics(stats)
+    assert totals["num_images"] == 10 and totals["num_labels"] == stats["num_labels"].sum()
+    write_split_summary({"train": totals}, CLASS_NAMES, tmp_path / "summary.csv")
+    with open(tmp_path / "summary.csv") as f:
+        summary = list(csv.reader(f))
+    assert summary[1][:3] == ["train", "10", str(totals["num_labels"])]
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from materialize import COPY, HARDLINK, MODES, REFLINK, SYMLINK, materialize
+
+
+@pytest.fixture
+def src(tmp_path):
+    path = tmp_path / "src.png"
+    path.write_bytes(b"image bytes")
+    return path
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_materialize_places_identical_file(tmp_path, src, mode):
+    dst = tmp_path / "out" / "dst.png"
+    dst.parent.mkdir()
+    dst.write_bytes(b"stale output")
+
+    used = materialize(src, dst, mode)
+    assert used in (mode, COPY)
+    assert dst.read_bytes() == src.read_bytes()
+    if used == HARDLINK:
+        assert os.path.samefile(src, dst)
+    if used == SYMLINK:
+        assert os.readlink(dst) == str(src.resolve())
+    if used in (COPY, REFLINK):
+        assert not dst.is_symlink() and not os.path.samefile(src, dst)
+
+
+def test_materialize_replaces_links_instead_of_writing_through(tmp_path, src):
+    other = tmp_path / "other.png"
+    other.write_bytes(b"other bytes")
+    dst = tmp_path / "dst.png"
+    os.symlink(other, dst)
+
+    assert materialize(src, dst, COPY) == COPY
+    assert other.read_bytes() == b"other bytes"
+    assert dst.read_bytes() == b"image bytes" and not dst.is_symlink()
+
+
+def test_hardlink_rerun_keeps_existing_link(tmp_path, src):
+    dst = tmp_path / "dst.png"
+    if materialize(src, dst, HARDLINK) != HARDLINK:
+        pytest.skip("filesystem does not support hardlinks")
+    inode = os.stat(dst).st_ino
+    assert materialize(src, dst, HARDLINK) == HARDLINK
+    assert os.stat(dst).st_ino == inode
+
+
+def test_unknown_mode(tmp_path, src):
+    with pytest.raises(ValueError):
+        materialize(src, tmp_path / "dst.png", "move")
@@ -0,0 +1,115 @@
+import os
+
+import numpy as np
+import pytest
+
+from prediction_cache import PredictionCache, cached_prediction_records, list_images
+
+CLASS_MAP = {58: 0, 56: 1}
+
+
+class FakeModel:
+    """Records every predict call and returns fixed detections per image."""
+
+    def __init__(self, make_result):
+        self.make_result = make_result
+        self.calls = []
+
+    def detections(self, path):
+        seed = sum(map(ord, os.path.basename(path)))
+        xyxy = [[seed % 50, 10, seed % 50 + 20, 40], [0, 0, 5, 5]]
+        return xyxy, [58, 56 if seed % 2 else 62], [0.9, 0.6]
+
+    def predict(self, source, stream, **kwargs):
+        assert stream
+        self.calls.append((list(source), kwargs))
+        return (self.make_result(path, *self.detections(path)) for path in source)
+
+
+@pytest.fixture
+def setup(tmp_path, make_result):
+    images_dir = tmp_path / "images"
+    images_dir.mkdir()
+    for i in range(10):
+        (images_dir / f"img_{i:02d}.png").write_bytes(f"image {i}".encode())
+    (images_dir / "notes.txt").write_text("not an image")
+    weights = tmp_path / "model.pt"
+    weights.write_bytes(b"weights v1")
+    return images_dir, weights, FakeModel(make_result)
+
+
+def open_cache(tmp_path, weights, **settings):
+    return PredictionCache(weights, conf=settings.pop("conf", 0.25), classes=[58, 56],
+                           cache_dir=tmp_path / "cache", **settings)
+
+
+def predicted_paths(model):
+    return [path for source, _ in model.calls for path in source]
+
+
+def test_second_run_is_served_from_cache(tmp_path, setup):
+    images_dir, weights, model = setup
+    paths = list_images(images_dir)
+    assert [os.path.basename(p) for p in paths] == [f"img_{i:02d}.png" for i in range(10)]
+
+    cache = open_cache(tmp_path, weights)
+    first = list(cached_prediction_records(model, paths, cache, CLASS_MAP, chunk_size=3))
+    assert (cache.hits, cache.misses) == (0, 10) and len(model.calls) == 4
+    assert model.calls[0][1] == {"conf": 0.25, "classes": [58, 56], "imgsz": 640}
+
+    model.calls.clear()
+    cache = open_cache(tmp_path, weights)
+    second = list(cached_prediction_records(model, paths, cache, CLASS_MAP, chunk_size=3))
+    assert model.calls == [] and (cache.hits, cache.misses) == (10, 0)
+    for a, b in zip(first, second):
+        assert a[0] == b[0]
+        for x, y in zip(a[1:], b[1:]):
+            np.testing.assert_array_equal(x, y)
+    assert [record[0] for record in second] == [os.path.basename(p) for p in paths]
+
+
+def test_changed_images_weights_and_settings_miss(tmp_path, setup):
+    images_dir, weights, model = setup
+    paths = list_images(images_dir)
+    list(cached_prediction_records(model, paths, open_cache(tmp_path, weights), CLASS_MAP))
+
+    model.calls.clear()
+    (images_dir / "img_03.png").write_bytes(b"edited")
+    list(cached_prediction_records(model, paths, open_cache(tmp_path, weights), CLASS_MAP))
+    assert predicted_paths(model) == [os.path.abspath(images_dir / "img_03.png")]
+
+    for cache in (open_cache(tmp_path, weights, conf=0.5), open_cache(tmp_path, weights, imgsz=320)):
+        assert len(cache) == 0
+    weights.write_bytes(b"weights v2")
+    assert len(open_cache(tmp_path, weights)) == 0
+
+
+@pytest.mark.parametrize("save_kwargs", [{"save": True}, {"save_txt": True}, {"save": True, "save_txt": True}])
+def test_saving_outputs_predicts_every_image(tmp_path, setup, save_kwargs):
+    images_dir, weights, model = setup
+    paths = list_images(images_dir)
+    list(cached_prediction_records(model, paths, open_cache(tmp_path, weights), CLASS_MAP))
+
+    model.calls.clear()
+    cache = open_cache(tmp_path, weights)
+    records = list(cached_prediction_records(model, paths, cache, CLASS_MAP, **save_kwargs))
+    assert predicted_paths(model) == [os.path.abspath(p) for p in paths]
+    assert all(kwargs.items() >= save_kwargs.items() for _, kwargs in model.calls)
+    assert (cache.hits, cache.misses) == (0, 10) and len(records) == 10
+
+    model.calls.clear()
+    list(cached_prediction_records(model, paths, open_cache(tmp_path, weights), CLASS_MAP, save=False))
+    assert model.calls == []
+
+
+def test_interrupted_run_keeps_finished_images(tmp_path, setup):
+    images_dir, weights, model = setup
+    paths = list_images(images_dir)
+    records = cached_prediction_records(model, paths, open_cache(tmp_path, weights), CLASS_MAP, chunk_size=4)
+    for _ in range(5):
+        next(records)
+    records.close()
+
+    model.calls.clear()
+    list(cached_prediction_records(model, paths, open_cache(tmp_path, weights), CLASS_MAP, chunk_size=4))
+    assert predicted_paths(model) == [os.path.abspath(p) for p in paths[8:]]
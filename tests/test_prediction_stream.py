@@ -0,0 +1,131 @@
+import os
+import random
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from image_index import ImageIndex
+from prediction_stream import iter_error_rows, prediction_records
+
+COCO_TO_CANONICAL = {58: 0, 56: 1, 41: 2, 75: 3, 73: 4}
+CANONICAL_NAMES = ["potted plant", "chair", "cup", "vase", "book"]
+
+
+def iou(boxA, boxB):
+    xA = max(boxA[0], boxB[0])
+    yA = max(boxA[1], boxB[1])
+    xB = min(boxA[0] + boxA[2], boxB[0] + boxB[2])
+    yB = min(boxA[1] + boxA[3], boxB[1] + boxB[3])
+    interW = max(0, xB - xA)
+    interH = max(0, yB - yA)
+    inter = interW * interH
+    areaA = boxA[2] * boxA[3]
+    areaB = boxB[2] * boxB[3]
+    union = areaA + areaB - inter
+    return inter / union if union > 0 else 0
+
+
+def baseline_report(results, gt, iou_threshold=0.5):
+    """Step 5 of "yolo predictions.py" before streaming."""
+    image_id_to_ann = defaultdict(list)
+    for ann in gt["annotations"]:
+        image_id_to_ann[ann["image_id"]].append(ann)
+
+    report_rows = []
+    for result in results:
+        file_name = os.path.basename(result.path)
+        image_id = None
+        for img in gt["images"]:
+            if img["file_name"] == file_name:
+                image_id = img["id"]
+                break
+        if image_id is None:
+            continue
+
+        gt_boxes = [(ann["bbox"], ann["category_id"]) for ann in image_id_to_ann[image_id]]
+        preds = []
+        for box in result.boxes:
+            coco_id = int(box.cls.cpu().numpy()[0])
+            if coco_id in COCO_TO_CANONICAL:
+                pred_class = COCO_TO_CANONICAL[coco_id]
+                xyxy = box.xyxy.cpu().numpy()[0]
+                w, h = xyxy[2] - xyxy[0], xyxy[3] - xyxy[1]
+                preds.append(([float(xyxy[0]), float(xyxy[1]), float(w), float(h)], pred_class))
+
+        matched_preds = set()
+        for gt_box, gt_cls in gt_boxes:
+            found = False
+            for i, (pred_box, pred_cls) in enumerate(preds):
+                if i in matched_preds:
+                    continue
+                if iou(gt_box, pred_box) >= iou_threshold:
+                    found = True
+                    matched_preds.add(i)
+                    if pred_cls != gt_cls:
+                        report_rows.append([file_name, "Wrong Class", CANONICAL_NAMES[gt_cls],
+                                            CANONICAL_NAMES[pred_cls], round(iou(gt_box, pred_box), 3)])
+                    break
+            if not found:
+                report_rows.append([file_name, "Missed Detection", CANONICAL_NAMES[gt_cls], "None", 0.0])
+        for i, (pred_box, pred_cls) in enumerate(preds):
+            if i not in matched_preds:
+                report_rows.append([file_name, "Missing Annotation", "None", CANONICAL_NAMES[pred_cls], 0.0])
+    return report_rows
+
+
+@pytest.fixture
+def gt(coco_data):
+    rng = random.Random(0)
+    for ann in coco_data["annotations"]:
+        ann["category_id"] = rng.randint(0, 4)
+    return coco_data
+
+
+def fake_results(gt, make_result, seed):
+    """Jittered copies of the GT boxes plus spurious and unmapped detections."""
+    rng = random.Random(seed)
+    by_image = defaultdict(list)
+    for ann in gt["annotations"]:
+        by_image[ann["image_id"]].append(ann)
+    results = []
+    for img in gt["images"] + [{"id": -1, "file_name": "not_in_gt.png"}]:
+        xyxy, cls, conf = [], [], []
+        for ann in by_image[img["id"]]:
+            if rng.random() < 0.2:
+                continue  # missed
+            x, y, w, h = (v + rng.uniform(-0.2, 0.2) * ann["bbox"][2 + i % 2] for i, v in enumerate(ann["bbox"]))
+            xyxy.append([x, y, x + w, y + h])
+            canonical = ann["category_id"] if rng.random() < 0.8 else rng.randint(0, 4)
+            cls.append([k for k, v in COCO_TO_CANONICAL.items() if v == canonical][0])
+            conf.append(rng.random())
+        for _ in range(rng.randint(0, 2)):
+            x, y = rng.uniform(0, 400), rng.uniform(0, 400)
+            xyxy.append([x, y, x + rng.uniform(5, 100), y + rng.uniform(5, 100)])
+            cls.append(rng.choice(list(COCO_TO_CANONICAL) + [0, 62]))
+            conf.append(rng.random())
+        results.append(make_result(f"/content/runs/{img['file_name']}", xyxy, cls, conf))
+    return results
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 32])
+def test_error_rows_match_baseline_loop(gt, make_result, chunk_size):
+    results = fake_results(gt, make_result, seed=chunk_size)
+    expected = baseline_report(results, gt)
+
+    records = prediction_records(iter(results), COCO_TO_CANONICAL)
+    rows = list(iter_error_rows(records, ImageIndex.from_coco(gt), 0.5, CANONICAL_NAMES, chunk_size=chunk_size))
+    assert [row for _, row in rows] == expected
+    assert {reason for _, reason, *_ in expected} == {"Wrong Class", "Missed Detection", "Missing Annotation"}
+
+    index = ImageIndex.from_coco(gt)
+    assert all(image_id == index.image_id(row[0]) for image_id, row in rows)
+
+
+def test_prediction_records_drop_unmapped_classes(make_result):
+    result = make_result("a/b/img.png", [[1, 2, 11, 7], [0, 0, 5, 5]], [56, 62], [0.9, 0.8])
+    file_name, boxes, classes, scores = next(prediction_records([result], COCO_TO_CANONICAL))
+    assert file_name == "img.png"
+    np.testing.assert_array_equal(boxes, [[1, 2, 10, 5]])
+    assert classes.tolist() == [1]
+    np.testing.assert_allclose(scores, [0.9], rtol=1e-6)
@@ -0,0 +1,83 @@
+import os
+import random
+import zipfile
+
+import pytest
+from PIL import Image
+
+from yolo_labels import convert_coco_to_yolo, yolo_label_texts
+
+
+def coco_to_yolo_bbox(bbox, img_w, img_h):
+    """The scalar conversion of data-preprocessing.py Part B."""
+    x, y, w, h = bbox
+    x_center = (x + w / 2) / img_w
+    y_center = (y + h / 2) / img_h
+    w_norm = w / img_w
+    h_norm = h / img_h
+    return [x_center, y_center, w_norm, h_norm]
+
+
+def baseline_label_text(img, annotations, img_w, img_h):
+    """What the old f-string writer put in one label file."""
+    text = ""
+    for ann in annotations:
+        if ann["image_id"] == img["id"]:
+            x_c, y_c, w_n, h_n = coco_to_yolo_bbox(ann["bbox"], img_w, img_h)
+            text += f"{ann['category_id']} {x_c} {y_c} {w_n} {h_n}\n"
+    return text
+
+
+@pytest.fixture
+def yolo_coco(coco_data):
+    """The sample export with 0-4 class ids and some integer boxes."""
+    rng = random.Random(0)
+    for ann in coco_data["annotations"]:
+        ann["category_id"] = rng.randint(0, 4)
+        if rng.random() < 0.3:
+            ann["bbox"] = [rng.randint(0, 400) for _ in range(4)]
+    return coco_data
+
+
+def test_label_texts_match_fstring_writer(yolo_coco):
+    images, annotations = yolo_coco["images"], yolo_coco["annotations"]
+    texts = yolo_label_texts(images, annotations)
+    assert len(texts) == len(images)
+    for img, text in zip(images, texts):
+        assert text == baseline_label_text(img, annotations, img["width"], img["height"])
+
+
+def test_written_files_are_byte_identical(tmp_path, yolo_coco):
+    images = yolo_coco["images"][:20]
+    annotations = yolo_coco["annotations"]
+    images_dir = tmp_path / "images"
+    images_dir.mkdir()
+    for img in images[::2]:
+        # Entries without a size are read from the image header
+        Image.new("RGB", (img["width"] + 7, img["height"] + 3)).save(images_dir / img["file_name"])
+        del img["width"], img["height"]
+
+    paths = convert_coco_to_yolo(images, annotations, tmp_path / "labels", images_dir, max_workers=4)
+    for img, path in zip(images, paths):
+        if "width" in img:
+            size = img["width"], img["height"]
+        else:
+            with Image.open(images_dir / img["file_name"]) as im:
+                size = im.size
+        with open(path, "rb") as f:
+            assert f.read() == baseline_label_text(img, annotations, *size).encode()
+        assert os.path.basename(path) == os.path.splitext(img["file_name"])[0] + ".txt"
+
+    archive = tmp_path / "labels.zip"
+    members = convert_coco_to_yolo(images, annotations, "labels", images_dir, archive_path=archive)
+    with zipfile.ZipFile(archive) as zf:
+        for member, path in zip(members, paths):
+            with open(path, "rb") as f:
+                assert zf.read(member) == f.read()
+
+
+def test_fixed_precision_format(yolo_coco):
+    img = yolo_coco["images"][0]
+    text = yolo_label_texts([img], yolo_coco["annotations"], float_format="%.6f")[0]
+    for line in text.splitlines():
+        assert all(len(value.split(".")[1]) == 6 for value in line.split()[1:])